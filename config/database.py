@@ -0,0 +1,47 @@
+from django.core.exceptions import ImproperlyConfigured
+
+
+CONNECTION_MODES = ("persistent", "pool", "pgbouncer")
+
+
+def connection_settings(
+    mode: str,
+    *,
+    conn_max_age: int = 600,
+    pool_min_size: int = 2,
+    pool_max_size: int = 10,
+    pool_timeout: float = 10,
+) -> dict:
+    """
+    Returns the DATABASES entry settings for a Postgres connection strategy.
+
+    - persistent: each worker thread keeps its connection for `conn_max_age` seconds
+      and checks it is still usable before reusing it after a request.
+    - pool: a psycopg 3 pool per worker process, shared by its threads, holding
+      `pool_min_size` to `pool_max_size` connections, checked before being handed out.
+      Requests wait up to `pool_timeout` seconds for a free connection.
+    - pgbouncer: persistent connections to PgBouncer in transaction mode, where
+      consecutive transactions may run on different server connections. Server-side
+      cursors and prepared statements would not survive that, so both are disabled;
+      `.iterator()` then fetches its rows client-side.
+    """
+    if mode == "persistent":
+        return {"CONN_MAX_AGE": conn_max_age, "CONN_HEALTH_CHECKS": True}
+
+    if mode == "pool":
+        return {
+            # Connections go back to the pool after each request instead of being kept by the thread
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"pool": {"min_size": pool_min_size, "max_size": pool_max_size, "timeout": pool_timeout}},
+        }
+
+    if mode == "pgbouncer":
+        return {
+            "CONN_MAX_AGE": conn_max_age,
+            "CONN_HEALTH_CHECKS": True,
+            "DISABLE_SERVER_SIDE_CURSORS": True,
+            "OPTIONS": {"prepare_threshold": None},
+        }
+
+    raise ImproperlyConfigured(f"DB_CONNECTION_MODE must be one of {', '.join(CONNECTION_MODES)}, not {mode!r}")
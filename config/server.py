@@ -0,0 +1,145 @@
+import math
+import os
+from pathlib import Path
+
+from django.db import connections
+from gunicorn.app.base import BaseApplication
+from gunicorn.util import import_app
+from gunicorn.workers.gthread import ThreadWorker as GunicornThreadWorker
+
+
+# Worker class -> (gunicorn worker class, application)
+WORKER_CLASSES = {
+    "sync": ("sync", "config.wsgi:application"),
+    "gthread": ("config.server.ThreadWorker", "config.wsgi:application"),
+    "uvicorn": ("uvicorn_worker.UvicornWorker", "config.asgi:application"),
+}
+
+CGROUP = Path("/sys/fs/cgroup")
+
+
+def available_cpus() -> int:
+    """
+    Returns the CPUs this process may use: the container's CPU quota (cgroup v2)
+    when there is one, otherwise the CPUs it is allowed to run on.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    try:
+        quota, period = (CGROUP / "cpu.max").read_text().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+def available_memory() -> int:
+    """Returns the memory in bytes: the container's limit (cgroup v2) or the machine's RAM."""
+    try:
+        limit = (CGROUP / "memory.max").read_text().strip()
+    except OSError:
+        limit = "max"
+    if limit != "max":
+        return int(limit)
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def tune(worker_class: str, *, cpus: int, memory: int, worker_memory: int) -> dict:
+    """
+    Returns the gunicorn worker and thread counts for the machine.
+
+    - sync: one request per worker, 2 x CPUs + 1 workers so a CPU always has a worker
+      that is not waiting on the database.
+    - gthread: CPUs + 1 workers with 4 threads each; threads share a worker's memory.
+    - uvicorn: one event loop per CPU.
+
+    Workers are capped so that `worker_memory` bytes each fit in `memory`.
+    """
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f"Worker class must be one of {', '.join(WORKER_CLASSES)}, not {worker_class!r}")
+
+    workers, threads = {
+        "sync": (2 * cpus + 1, 1),
+        "gthread": (cpus + 1, 4),
+        "uvicorn": (cpus, 1),
+    }[worker_class]
+
+    return {"workers": max(1, min(workers, memory // worker_memory)), "threads": threads}
+
+
+def gunicorn_options(
+    worker_class: str,
+    *,
+    bind: str,
+    workers: int | None = None,
+    threads: int | None = None,
+    worker_memory: int,
+    max_requests: int,
+    timeout: int,
+    graceful_timeout: int,
+    keepalive: int,
+    reload: bool = False,
+) -> dict:
+    """
+    Returns the gunicorn settings for a production server.
+
+    Worker and thread counts not given are tuned for the CPUs and memory available.
+    The app is loaded once in the master before forking (preload), so workers share
+    its memory pages; they are replaced after about `max_requests` requests (with
+    jitter, so they do not restart together) to cap memory growth. On SIGTERM workers
+    get `graceful_timeout` seconds to finish their requests.
+
+    `reload` is for development: code changes restart the workers, which needs the
+    app to be loaded by each worker instead of the master.
+    """
+    tuned = tune(worker_class, cpus=available_cpus(), memory=available_memory(), worker_memory=worker_memory)
+
+    return {
+        "bind": bind,
+        "worker_class": WORKER_CLASSES[worker_class][0],
+        "workers": workers or tuned["workers"],
+        "threads": threads or tuned["threads"],
+        "preload_app": not reload,
+        "reload": reload,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests // 10,
+        "timeout": timeout,
+        "graceful_timeout": graceful_timeout,
+        "keepalive": keepalive,
+        "accesslog": "-",
+        "pre_fork": close_connections,
+    }
+
+
+def close_connections(server, worker) -> None:
+    """Before forking, drops any database connection the master opened so workers never share one."""
+    connections.close_all()
+
+
+class ThreadWorker(GunicornThreadWorker):
+    """
+    gunicorn's gthread worker, except that a worker about to be recycled (max_requests
+    reached) stops accepting connections. Gunicorn's own would accept one more and exit
+    without answering it; left in the listen queue, the next worker serves it.
+    """
+
+    def accept(self, server, listener) -> None:
+        if self.alive:
+            super().accept(server, listener)
+
+
+class Application(BaseApplication):
+    """Gunicorn serving the Django app of a worker class with the given settings."""
+
+    def __init__(self, worker_class: str, options: dict):
+        self.app_uri = WORKER_CLASSES[worker_class][1]
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return import_app(self.app_uri)
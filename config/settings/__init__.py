@@ -0,0 +1,26 @@
+"""
+Settings profile picked by the DJANGO_ENV environment variable:
+
+- dev (default): DEBUG and the debug toolbar
+- test: fast password hashing, no debug apps (`manage.py test` defaults to it)
+- prod: no debug apps, no network I/O at import, cached templates and bounded logging
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+DJANGO_ENV = os.getenv("DJANGO_ENV", "dev")
+
+if DJANGO_ENV == "dev":
+    from config.settings.dev import *  # noqa: F403
+elif DJANGO_ENV == "test":
+    from config.settings.test import *  # noqa: F403
+elif DJANGO_ENV == "prod":
+    from config.settings.prod import *  # noqa: F403
+else:
+    raise ImproperlyConfigured(f"DJANGO_ENV must be one of dev, test, prod, not {DJANGO_ENV!r}")
@@ -0,0 +1,428 @@
+"""
+Settings shared by the dev, test and prod profiles (see config.settings).
+"""
+
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from celery.schedules import crontab
+
+from config.database import connection_settings
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "django-insecure-default-key")
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
+
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    # third party apps
+    "rest_framework",
+    "rest_framework_simplejwt",
+    "drf_spectacular",
+    "django_filters",
+    "storages",
+    # apps
+    "core",
+    "user",
+    "car",
+    "rental",
+    "payment",
+    "notifications",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.WhiteNoiseMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
+    # Session, debug toolbar (dev), CSRF, authentication and messages are skipped for /api/ requests
+    "core.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "core.middleware.CsrfViewMiddleware",
+    "core.middleware.AuthenticationMiddleware",
+    "core.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.RateLimitHeadersMiddleware",
+]
+
+ROOT_URLCONF = "config.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [BASE_DIR / "templates"],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "config.wsgi.application"
+
+# Production web server (python manage.py serve, see config.server): "sync", "gthread" or "uvicorn"
+WEB_WORKER_CLASS = os.getenv("WEB_WORKER_CLASS", "uvicorn")
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:8000")
+# Worker processes and threads per worker; 0 tunes them for the CPUs and memory available
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 0))
+WEB_THREADS = int(os.getenv("WEB_THREADS", 0))
+# Expected memory per worker, caps the tuned worker count
+WEB_WORKER_MEMORY_MB = int(os.getenv("WEB_WORKER_MEMORY_MB", 256))
+# Workers are replaced after about this many requests to cap memory growth
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", 1000))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", 30))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", 5))
+
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("POSTGRES_DB"),
+        "USER": os.getenv("POSTGRES_USER"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+        "HOST": os.getenv("POSTGRES_HOST"),
+        "PORT": os.getenv("POSTGRES_PORT"),
+        # Connection strategy, see config.database: "persistent", "pool" or "pgbouncer"
+        **connection_settings(
+            os.getenv("DB_CONNECTION_MODE", "persistent"),
+            conn_max_age=int(os.getenv("DB_CONN_MAX_AGE", 600)),
+            pool_min_size=int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            pool_max_size=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        ),
+    }
+}
+
+# Read replicas: comma-separated host[:port] list, same database and credentials as the primary.
+# Safe requests and reporting jobs read from them, see core.replicas.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+    host, _, port = replica.strip().partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+# Replicas further behind than this many seconds are skipped (checked every REPLICA_LAG_CHECK_INTERVAL)
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 5))
+# After a write, the client reads from the primary for this long
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 15))
+
+
+# Redis: database 0 is the Celery broker, the caches below use their own logical databases
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+
+# Bump to invalidate every cached entry at once, e.g. after changing what is cached
+CACHE_VERSION = int(os.getenv("CACHE_VERSION", 1))
+CACHE_OPTIONS = {"socket_connect_timeout": 1, "socket_timeout": 1}
+
+CACHES = {
+    # Locks, idempotency keys, digests, task metrics and core.cache entries
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"{REDIS_URL}/1",
+        "KEY_PREFIX": "car_rental",
+        "VERSION": CACHE_VERSION,
+        "OPTIONS": CACHE_OPTIONS,
+    },
+    # DRF throttle history
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"{REDIS_URL}/2",
+        "KEY_PREFIX": "car_rental",
+        "VERSION": CACHE_VERSION,
+        "OPTIONS": CACHE_OPTIONS,
+    },
+    # Cached API responses (cache_page and the cache middleware)
+    "responses": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"{REDIS_URL}/3",
+        "KEY_PREFIX": "car_rental",
+        "VERSION": CACHE_VERSION,
+        "TIMEOUT": 60,
+        "OPTIONS": CACHE_OPTIONS,
+    },
+    # Sessions (admin), backed by the database
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"{REDIS_URL}/4",
+        "KEY_PREFIX": "car_rental",
+        "VERSION": CACHE_VERSION,
+        "OPTIONS": CACHE_OPTIONS,
+    },
+}
+
+CACHE_MIDDLEWARE_ALIAS = "responses"
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "sessions"
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": ("user.authentication.CachedJWTAuthentication",),
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_CLASSES": [
+        "core.throttling.AnonRateThrottle",
+        "core.throttling.UserRateThrottle",
+        "core.throttling.ScopedRateThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "10000/day",
+        "user": "10000/day",
+        # Per-endpoint scopes (throttle_scope / throttle_scopes on the views)
+        "booking": os.getenv("THROTTLE_RATE_BOOKING", "30/min"),
+        "payment": os.getenv("THROTTLE_RATE_PAYMENT", "20/min"),
+        "oauth": os.getenv("THROTTLE_RATE_OAUTH", "10/min"),
+    },
+    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "PAGE_SIZE": 10,
+}
+
+# Maximum number of cars in one batch booking request
+RENTAL_BATCH_MAX_CARS = int(os.getenv("RENTAL_BATCH_MAX_CARS", 50))
+
+# Idempotency-Key support for booking and payment creation endpoints (seconds)
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 60 * 60 * 24))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+IDEMPOTENCY_WAIT_TIMEOUT = int(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 10))
+
+# Payment outbox: how long the return endpoint waits for Stripe links before answering 202 (seconds)
+PAYMENT_OUTBOX_WAIT_TIMEOUT = float(os.getenv("PAYMENT_OUTBOX_WAIT_TIMEOUT", 5))
+PAYMENT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("PAYMENT_OUTBOX_MAX_ATTEMPTS", 3))
+PAYMENT_OUTBOX_BATCH_SIZE = int(os.getenv("PAYMENT_OUTBOX_BATCH_SIZE", 20))
+
+# Stripe webhook events are stored and processed by Celery in batches
+STRIPE_EVENTS_BATCH_SIZE = int(os.getenv("STRIPE_EVENTS_BATCH_SIZE", 100))
+STRIPE_EVENTS_MAX_ATTEMPTS = int(os.getenv("STRIPE_EVENTS_MAX_ATTEMPTS", 5))
+
+STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
+STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "https://api.stripe.com")
+
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=1440),
+    "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "ROTATE_REFRESH_TOKENS": False,
+    "AUTH_HEADER_NAME": "HTTP_AUTHORIZE",
+    "AUTH_HEADER_TYPES": ("Bearer",),
+    # Tokens carry a hash of the password, so changing it revokes them
+    "CHECK_REVOKE_TOKEN": True,
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.TokenObtainPairSerializer",
+}
+
+# Seconds CachedJWTAuthentication keeps a user before reloading it
+JWT_USER_CACHE_TIMEOUT = int(os.getenv("JWT_USER_CACHE_TIMEOUT", 60))
+# Build the user from token claims instead of the cache or database
+JWT_STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH") == "True"
+
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+STATIC_URL = "static/"
+
+AUTH_USER_MODEL = "user.User"
+
+
+# Telegram
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_ADMIN_CHAT_ID = os.getenv("TELEGRAM_ADMIN_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Client-side limits in messages per second (Telegram allows ~30/s per bot and ~1/s per chat)
+TELEGRAM_GLOBAL_RATE_LIMIT = float(os.getenv("TELEGRAM_GLOBAL_RATE_LIMIT", 30))
+TELEGRAM_CHAT_RATE_LIMIT = float(os.getenv("TELEGRAM_CHAT_RATE_LIMIT", 1))
+
+# Celery
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", f"{REDIS_URL}/0")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", f"{REDIS_URL}/0")
+
+CELERY_ACCEPT_CONTENT = ["json"]
+CELERY_TASK_SERIALIZER = "json"
+
+# No caller reads task results; tasks that need one can opt in with ignore_result=False
+CELERY_TASK_IGNORE_RESULT = True
+
+# Queues by workload, so minute-level sweeps and bulk jobs never delay user-facing work:
+# - payments: Stripe checkout sessions and webhook events (a user may be waiting on them)
+# - notifications: notification tasks; channel dispatchers run on notifications.<channel>
+# - sweeps: periodic expiry and overdue sweeps
+# - bulk: per-chunk follow-ups of the sweeps
+# Lower priority values are consumed first (Redis supports 0-9).
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_TASK_ROUTES = {
+    "payment.tasks.*": {"queue": "payments", "priority": 0},
+    "notifications.tasks.digest.*": {"queue": "notifications.telegram", "priority": 2},
+    "notifications.tasks.dispatch.send_notifications": {"priority": 2},
+    "notifications.tasks.expire_payments.expire_pending_payments": {"queue": "sweeps", "priority": 6},
+    "notifications.tasks.overdue_rentals.notify_overdue_rentals": {"queue": "sweeps", "priority": 6},
+    "notifications.tasks.overdue_rentals.mark_rentals_overdue": {"queue": "sweeps", "priority": 6},
+    "notifications.tasks.expire_payments.notify_expired_payments": {"queue": "bulk", "priority": 8},
+    "notifications.tasks.overdue_rentals.send_overdue_rental_notifications": {"queue": "bulk", "priority": 8},
+    "notifications.tasks.*": {"queue": "notifications", "priority": 2},
+}
+
+CELERY_TIMEZONE = TIME_ZONE
+
+# Task slow log (core.task_metrics): runs longer than the threshold in seconds are logged to
+# the "core.task_metrics.slow" logger. The default applies to tasks without their own entry;
+# leave TASK_SLOW_LOG_THRESHOLD unset to only log the tasks listed.
+TASK_SLOW_LOG_THRESHOLD = (
+    float(os.environ["TASK_SLOW_LOG_THRESHOLD"]) if "TASK_SLOW_LOG_THRESHOLD" in os.environ else None
+)
+TASK_SLOW_LOG_THRESHOLDS = {
+    "notifications.tasks.expire_payments.expire_pending_payments": 60,
+    "notifications.tasks.overdue_rentals.notify_overdue_rentals": 60,
+}
+
+# Rows per transaction in the expiry and overdue sweeps
+SWEEP_CHUNK_SIZE = int(os.getenv("SWEEP_CHUNK_SIZE", 500))
+
+# Overdue checks are scheduled with an ETA at the end of a rental's end_date, but only
+# when due within this horizon; the daily reconciliation schedules the rest.
+OVERDUE_ETA_HORIZON = timedelta(hours=24)
+
+# ETA tasks stay unacknowledged in Redis until they run; keep the visibility timeout
+# above OVERDUE_ETA_HORIZON so they are not redelivered while waiting.
+# Workers consume their queues in the order given to -Q, and priorities within a queue.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": 60 * 60 * 26,
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+}
+
+# Channels every notification is fanned out to (see notifications.channels)
+NOTIFICATION_CHANNELS = os.getenv("NOTIFICATION_CHANNELS", "telegram,email,webhook").split(",")
+
+# Notification outbox: rows per dispatcher batch and delivery attempts before FAILED
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", 100))
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", 5))
+
+NOTIFICATION_WEBHOOK_URL = os.getenv("NOTIFICATION_WEBHOOK_URL")
+NOTIFICATION_WEBHOOK_SECRET = os.getenv("NOTIFICATION_WEBHOOK_SECRET")
+NOTIFICATION_WEBHOOK_TIMEOUT = float(os.getenv("NOTIFICATION_WEBHOOK_TIMEOUT", 5))
+
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", 25))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS") == "True"
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 10))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@car-rental.local")
+
+# Telegram notifications are coalesced into one message per window (seconds) or per N events
+NOTIFICATION_DIGEST_ENABLED = os.getenv("NOTIFICATION_DIGEST_ENABLED", "True") == "True"
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv("NOTIFICATION_DIGEST_WINDOW", 5))
+NOTIFICATION_DIGEST_MAX_EVENTS = int(os.getenv("NOTIFICATION_DIGEST_MAX_EVENTS", 20))
+
+CELERY_BEAT_SCHEDULE = {
+    "reconcile-overdue-rentals-daily": {
+        "task": "notifications.tasks.overdue_rentals.notify_overdue_rentals",
+        "schedule": crontab(hour=0, minute=5),
+    },
+    "expire-payments-safety-sweep-hourly": {
+        "task": "notifications.tasks.expire_payments.expire_pending_payments",
+        "schedule": crontab(minute=15),
+    },
+    "relay-checkout-outbox-every-minute": {
+        "task": "payment.tasks.create_checkout_sessions",
+        "schedule": crontab(minute="*/1"),
+    },
+    "relay-notifications-every-minute": {
+        "task": "notifications.tasks.dispatch.relay_notifications",
+        "schedule": crontab(minute="*/1"),
+    },
+    "relay-stripe-events-every-minute": {
+        "task": "payment.tasks.handle_stripe_events",
+        "schedule": crontab(minute="*/1"),
+    },
+}
+
+
+SPECTACULAR_SETTINGS = {
+    "TITLE": "Car Rental Service API",
+    "DESCRIPTION": "API documentation for the Car Rental Service project",
+    "VERSION": "1.0.0",
+    "SERVE_INCLUDE_SCHEMA": False,
+    "SORT_OPERATION_PARAMETERS": False,
+}
+
+
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+GOOGLE_OAUTH_TOKEN_URL = os.getenv("GOOGLE_OAUTH_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_OAUTH_USERINFO_URL = os.getenv("GOOGLE_OAUTH_USERINFO_URL", "https://www.googleapis.com/oauth2/v2/userinfo")
+GOOGLE_OAUTH_JWKS_URL = os.getenv("GOOGLE_OAUTH_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+# Seconds to wait for Google per request (connecting is limited to 2 seconds)
+GOOGLE_OAUTH_TIMEOUT = float(os.getenv("GOOGLE_OAUTH_TIMEOUT", 5))
+
+STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+if os.getenv("USE_S3") == "True":
+    STORAGES = {
+        "default": {
+            "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        },
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        },
+    }
+
+    AWS_ACCESS_KEY_ID = os.getenv("MINIO_ROOT_USER", "minioadmin")
+    AWS_SECRET_ACCESS_KEY = os.getenv("MINIO_ROOT_PASSWORD", "minioadmin")
+
+    AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_STORAGE_BUCKET_NAME", "car-rental-bucket")
+
+    AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL", "http://minio:9000")
+
+    AWS_S3_FILE_OVERWRITE = False
+
+else:
+    MEDIA_URL = "/media/"
+    MEDIA_ROOT = BASE_DIR / "uploads"
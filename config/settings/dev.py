@@ -0,0 +1,24 @@
+import socket
+
+from config.settings.base import *  # noqa: F403
+from config.settings.base import ALLOWED_HOSTS, INSTALLED_APPS, MIDDLEWARE
+
+
+DEBUG = True
+
+ALLOWED_HOSTS = [*ALLOWED_HOSTS, "anthropogenic-empirically-zayne.ngrok-free.dev"]
+
+INSTALLED_APPS = [*INSTALLED_APPS, "debug_toolbar"]
+
+MIDDLEWARE = [*MIDDLEWARE]
+MIDDLEWARE.insert(
+    MIDDLEWARE.index("core.middleware.SessionMiddleware") + 1, "debug_toolbar.middleware.DebugToolbarMiddleware"
+)
+
+# The Docker host, so the toolbar shows for requests from the host's browser
+try:
+    hostname, _, ips = socket.gethostbyname_ex(socket.gethostname())
+except OSError:
+    ips = []
+INTERNAL_IPS = [ip[: ip.rfind(".")] + ".1" for ip in ips] + ["127.0.0.1", "10.0.2.2"]
+DEBUG_TOOLBAR_CONFIG = {"SHOW_TOOLBAR_CALLBACK": "core.middleware.show_debug_toolbar"}
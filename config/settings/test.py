@@ -0,0 +1,5 @@
+from config.settings.base import *  # noqa: F403
+
+
+# Test users are created with passwords all the time; hashing strength does not matter here
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
@@ -11,6 +11,8 @@ urlpatterns = [
     path("api/cars/", include("car.urls", namespace="car")),
     path("api/rentals/", include("rental.urls", namespace="rental")),
     path("api/payment/", include("payment.urls", namespace="payment")),
+    path("api/notifications/", include("notifications.urls", namespace="notifications")),
+    path("api/metrics/", include("core.urls", namespace="metrics")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -19,7 +21,8 @@ urlpatterns = [
     ),
 ]
 
-if settings.DEBUG:
+# The toolbar views only answer when the toolbar is shown (DEBUG, internal IPs)
+if "debug_toolbar" in settings.INSTALLED_APPS:
     import debug_toolbar
 
     urlpatterns += [
@@ -0,0 +1,94 @@
+import asyncio
+from collections.abc import Callable
+from inspect import isawaitable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.views import APIView
+
+
+def per_event_loop(factory: Callable) -> Callable:
+    """
+    Returns a function giving each running event loop its own `factory()` result.
+
+    Pooled async HTTP clients cannot be shared between event loops. Under ASGI a worker
+    runs a single loop, but under WSGI (runserver, the test client) Django runs each
+    async view in a new one; instances of closed loops are dropped.
+    """
+    instances = {}
+
+    def get():
+        loop = asyncio.get_running_loop()
+        for closed in [other for other in instances if other.is_closed()]:
+            del instances[closed]
+
+        if loop not in instances:
+            instances[loop] = factory()
+        return instances[loop]
+
+    return get
+
+
+class AsyncViewMixin:
+    """
+    Lets DRF views and viewset actions define `async def` handlers, for endpoints that
+    mostly wait on Stripe, Google or the payment outbox. Served over ASGI, such requests
+    hold no worker thread while they wait.
+
+    DRF's authentication, permission and throttle hooks are synchronous (cache and
+    database lookups), so `initial()` runs in a thread once per request. Routes whose
+    handlers are sync keep DRF's regular dispatch.
+    """
+
+    @classmethod
+    def handlers_are_async(cls, actions: dict[str, str] | None = None) -> bool:
+        """Whether the handlers of a view (or of a viewset route's actions) are async."""
+        if actions is None:
+            return cls.view_is_async
+
+        is_async = {iscoroutinefunction(getattr(cls, action)) for action in actions.values()}
+        if len(is_async) > 1:
+            raise ImproperlyConfigured(f"{cls.__qualname__} mixes sync and async actions for {', '.join(actions)}")
+        return is_async == {True}
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        if cls.handlers_are_async(getattr(view, "actions", None)):
+            markcoroutinefunction(view)
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.handlers_are_async(getattr(self, "action_map", None)):
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """`dispatch()` awaiting the handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncAPIView(AsyncViewMixin, APIView):
+    """APIView whose handlers are `async def`."""
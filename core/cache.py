@@ -0,0 +1,138 @@
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from redis.commands.core import Script
+
+
+POLL_INTERVAL = 0.05
+
+# Deletes KEYS[1] only if it still holds ARGV[1]. Registered once: the script is
+# sent by SHA and loaded into Redis on first use.
+RELEASE_LOCK_SCRIPT = Script(
+    None,
+    b"""
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+""",
+)
+
+
+def _tag_key(tag: str) -> str:
+    return f"cache-tag:{tag}"
+
+
+def _tag_versions(cache, tags: Iterable[str]) -> dict[str, int]:
+    """
+    Returns the current version of each tag, creating missing ones.
+
+    Versions are timestamps rather than counters, so a tag evicted from the cache
+    comes back with a new version and cannot revive entries invalidated before.
+    """
+    keys = {tag: _tag_key(tag) for tag in tags}
+    if not keys:
+        return {}
+
+    stored = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in stored]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        stored.update(cache.get_many(missing))
+
+    return {tag: stored.get(key) for tag, key in keys.items()}
+
+
+def _fresh(entry: dict | None, tag_versions: dict[str, int], now: float) -> bool:
+    return entry is not None and entry["tags"] == tag_versions and now < entry["fresh_until"]
+
+
+def get_or_set(
+    key: str,
+    default: Callable[[], Any],
+    timeout: int,
+    *,
+    tags: Iterable[str] = (),
+    cache_alias: str = "default",
+    stale_timeout: int | None = None,
+    lock_timeout: int = 10,
+    wait_timeout: float = 5,
+) -> Any:
+    """
+    Returns the cached value of `key`, computing it with `default()` when missing or expired.
+
+    Stampede protection: only the caller holding the key's lock recomputes the value.
+    Meanwhile, other callers get the expired value if it is still stored (it is kept
+    for `stale_timeout` seconds after `timeout`, by default as long again), or wait
+    up to `wait_timeout` seconds for the new value before computing it themselves.
+
+    Entries stored with `tags` are dropped as soon as one of the tags is passed to
+    `invalidate_tags`; invalidated values are never served, not even as stale values.
+    """
+    cache = caches[cache_alias]
+    tag_versions = _tag_versions(cache, tags)
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    now = time.time()
+    if _fresh(entry, tag_versions, now):
+        return entry["value"]
+
+    stale = entry if entry is not None and entry["tags"] == tag_versions else None
+    deadline = now + wait_timeout
+
+    while not cache.add(lock_key, True, timeout=lock_timeout):
+        if stale is not None:
+            return stale["value"]
+
+        if time.time() >= deadline:
+            return default()
+
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if _fresh(entry, tag_versions, time.time()):
+            return entry["value"]
+
+    try:
+        # Another caller may have stored the value between our read and the lock
+        entry = cache.get(key)
+        if _fresh(entry, tag_versions, time.time()):
+            return entry["value"]
+
+        value = default()
+        stale_timeout = timeout if stale_timeout is None else stale_timeout
+        cache.set(
+            key,
+            {"value": value, "tags": tag_versions, "fresh_until": time.time() + timeout},
+            timeout=timeout + stale_timeout,
+        )
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_tags(*tags: str, cache_alias: str = "default") -> None:
+    """
+    Invalidates every entry stored with any of `tags`, e.g. `invalidate_tags(f"car:{car.id}")`
+    after a car changes. Costs one write per tag regardless of how many entries use it.
+    """
+    caches[cache_alias].set_many({_tag_key(tag): time.time_ns() for tag in tags}, timeout=None)
+
+
+def release_lock(key: str, token: str, *, cache_alias: str = "default") -> None:
+    """
+    Deletes a lock taken with `cache.add(key, token)`, unless it expired and now belongs
+    to another caller. Atomic on Redis; other caches (tests, local development) check
+    and delete in two steps.
+    """
+    cache = caches[cache_alias]
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        RELEASE_LOCK_SCRIPT(keys=[key], args=[cache._cache._serializer.dumps(token)], client=client)
+    elif cache.get(key) == token:
+        cache.delete(key)
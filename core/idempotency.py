@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http.request import RawPostDataException
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import release_lock
+
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+POLL_INTERVAL = 0.05
+
+
+def _cache_key(request, idempotency_key: str) -> str:
+    """
+    Builds a cache key scoped to the user, HTTP method and path,
+    so the same client key can be reused safely across endpoints.
+    """
+    user_id = request.user.pk if request.user and request.user.is_authenticated else "anon"
+    return f"idempotency:{user_id}:{request.method}:{request.path}:{idempotency_key}"
+
+
+def _fingerprint(request) -> str:
+    """
+    Returns a hash of the raw request body used to detect key reuse with a different payload.
+    """
+    try:
+        body = request._request.body
+    except RawPostDataException:
+        body = b""
+    return hashlib.sha256(body).hexdigest()
+
+
+def _replay(stored: dict, fingerprint: str) -> Response:
+    """
+    Rebuilds a response from a stored entry, or rejects a key reused with another payload.
+    """
+    if stored["fingerprint"] != fingerprint:
+        return Response(
+            {"detail": "Idempotency-Key was already used with a different request payload."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    return Response(stored["data"], status=stored["status"], headers={REPLAYED_HEADER: "true"})
+
+
+def _in_progress() -> Response:
+    return Response(
+        {"detail": "A request with this Idempotency-Key is still being processed."},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+@dataclass
+class _IdempotentRequest:
+    """
+    The cache entries of a request carrying an Idempotency-Key: the stored response
+    under `key` and the in-flight marker under `lock_key`, holding this request's
+    `token` so it never releases a lock that expired and passed to another request.
+    The wrappers only do the cache I/O and waiting, sync or async.
+    """
+
+    key: str
+    fingerprint: str
+    token: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    @classmethod
+    def from_request(cls, request) -> "_IdempotentRequest | None":
+        """Returns None if the request has no Idempotency-Key header."""
+        idempotency_key = request.META.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return None
+        return cls(key=_cache_key(request, idempotency_key), fingerprint=_fingerprint(request))
+
+    @property
+    def lock_key(self) -> str:
+        return f"{self.key}:lock"
+
+    @staticmethod
+    def wait_deadline() -> float:
+        """
+        Until when a duplicate waits for the in-flight request. It replays the response once
+        stored, or runs the view itself if the lock is released without one (a 5xx).
+        """
+        return time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+
+    def replay(self, stored: dict) -> Response:
+        return _replay(stored, self.fingerprint)
+
+    def entry(self, response: Response) -> dict | None:
+        """The cache entry of a response, or None for server errors (5xx), which the client may retry."""
+        if response.status_code >= 500:
+            return None
+        return {"status": response.status_code, "data": response.data, "fingerprint": self.fingerprint}
+
+
+def idempotent(view_method):
+    """
+    Decorator for DRF view handlers that honours the `Idempotency-Key` header.
+
+    - The first request with a given key runs the view and stores its status and body
+      in the cache for IDEMPOTENCY_KEY_TTL seconds.
+    - Repeated requests with the same key replay the stored response without running the view.
+    - Concurrent duplicates wait for the in-flight request to finish instead of running again;
+      if it fails with a server error, one of them takes over.
+    - Server errors (5xx) are not stored, so the client can retry them.
+
+    Requests without the header are processed as usual. Async handlers get an async wrapper.
+    """
+    if iscoroutinefunction(view_method):
+        return _async_idempotent(view_method)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        idempotent_request = _IdempotentRequest.from_request(request)
+        if idempotent_request is None:
+            return view_method(self, request, *args, **kwargs)
+
+        key, lock_key, token = idempotent_request.key, idempotent_request.lock_key, idempotent_request.token
+        deadline = idempotent_request.wait_deadline()
+        while True:
+            stored = cache.get(key)
+            if stored is not None:
+                return idempotent_request.replay(stored)
+            if cache.add(lock_key, token, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return _in_progress()
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            if (entry := idempotent_request.entry(response)) is not None:
+                cache.set(key, entry, timeout=settings.IDEMPOTENCY_KEY_TTL)
+        finally:
+            release_lock(lock_key, token)
+
+        return response
+
+    return wrapper
+
+
+def _async_idempotent(view_method):
+    """`idempotent` for async handlers, waiting on duplicates without blocking the event loop."""
+
+    @wraps(view_method)
+    async def wrapper(self, request, *args, **kwargs):
+        idempotent_request = _IdempotentRequest.from_request(request)
+        if idempotent_request is None:
+            return await view_method(self, request, *args, **kwargs)
+
+        key, lock_key, token = idempotent_request.key, idempotent_request.lock_key, idempotent_request.token
+        deadline = idempotent_request.wait_deadline()
+        while True:
+            stored = await cache.aget(key)
+            if stored is not None:
+                return idempotent_request.replay(stored)
+            if await cache.aadd(lock_key, token, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return _in_progress()
+            await asyncio.sleep(POLL_INTERVAL)
+
+        try:
+            response = await view_method(self, request, *args, **kwargs)
+            if (entry := idempotent_request.entry(response)) is not None:
+                await cache.aset(key, entry, timeout=settings.IDEMPOTENCY_KEY_TTL)
+        finally:
+            await sync_to_async(release_lock)(lock_key, token)
+
+        return response
+
+    return wrapper
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.server import WORKER_CLASSES, Application, gunicorn_options
+
+
+class Command(BaseCommand):
+    """
+    Runs the app on gunicorn, configured for production by `config.server.gunicorn_options`.
+
+    Defaults come from the WEB_* settings; worker and thread counts left at 0 are tuned
+    for the CPUs and memory available to the container.
+    """
+
+    help = "Run the production web server (gunicorn) with workers tuned for this machine."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--worker-class",
+            choices=WORKER_CLASSES,
+            default=settings.WEB_WORKER_CLASS,
+            help="sync and gthread serve WSGI, uvicorn serves ASGI (default: WEB_WORKER_CLASS).",
+        )
+        parser.add_argument("--bind", default=settings.WEB_BIND, help="Address to listen on (default: WEB_BIND).")
+        parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS, help="Worker processes (0: tuned).")
+        parser.add_argument("--threads", type=int, default=settings.WEB_THREADS, help="Threads per worker (0: tuned).")
+        parser.add_argument("--reload", action="store_true", help="Restart workers on code changes (development).")
+        parser.add_argument("--print-config", action="store_true", help="Print the gunicorn settings and exit.")
+
+    def handle(self, *args, **options):
+        config = gunicorn_options(
+            options["worker_class"],
+            bind=options["bind"],
+            workers=options["workers"],
+            threads=options["threads"],
+            worker_memory=settings.WEB_WORKER_MEMORY_MB * 1024 * 1024,
+            max_requests=settings.WEB_MAX_REQUESTS,
+            timeout=settings.WEB_TIMEOUT,
+            graceful_timeout=settings.WEB_GRACEFUL_TIMEOUT,
+            keepalive=settings.WEB_KEEPALIVE,
+            reload=options["reload"],
+        )
+
+        if options["print_config"]:
+            for key, value in config.items():
+                if not callable(value):
+                    self.stdout.write(f"{key} = {value!r}")
+            return
+
+        Application(options["worker_class"], config).run()
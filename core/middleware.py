@@ -0,0 +1,172 @@
+import hashlib
+import math
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.core.cache import cache
+from django.middleware import csrf
+from whitenoise import middleware as whitenoise
+
+from core.replicas import routing
+
+
+# The API authenticates with JWT and never uses sessions, messages or CSRF tokens
+API_PATH_PREFIX = "/api/"
+
+
+def is_api_request(request) -> bool:
+    return request.path_info.startswith(API_PATH_PREFIX)
+
+
+def show_debug_toolbar(request) -> bool:
+    """Debug toolbar for the admin only (SHOW_TOOLBAR_CALLBACK); API responses are JSON."""
+    from debug_toolbar.middleware import show_toolbar
+
+    return not is_api_request(request) and show_toolbar(request)
+
+
+class BrowserOnlyMiddlewareMixin:
+    """
+    Skips a middleware for API requests: the request goes straight to the next one,
+    as if this middleware were not installed, while the admin keeps it.
+    """
+
+    def __call__(self, request):
+        if is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(BrowserOnlyMiddlewareMixin, sessions.SessionMiddleware):
+    """Sessions for the admin only; no session cookie or cache lookup for API requests."""
+
+
+class AuthenticationMiddleware(BrowserOnlyMiddlewareMixin, auth.AuthenticationMiddleware):
+    """Session users for the admin only; DRF authenticates API requests from the JWT."""
+
+
+class CsrfViewMiddleware(BrowserOnlyMiddlewareMixin, csrf.CsrfViewMiddleware):
+    """CSRF protection for the admin only; API requests carry no cookies to protect."""
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class MessageMiddleware(BrowserOnlyMiddlewareMixin, messages.MessageMiddleware):
+    """Flash messages for the admin only."""
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware running natively in both sync (WSGI) and async (ASGI) stacks:
+    `__call__` handles sync requests and `__acall__` async ones, so async views
+    are not pushed into a thread by the middleware in front of them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class WhiteNoiseMiddleware(AsyncCapableMiddleware, whitenoise.WhiteNoiseMiddleware):
+    """WhiteNoise static files, without forcing async requests through a thread."""
+
+    def __init__(self, get_response):
+        whitenoise.WhiteNoiseMiddleware.__init__(self, get_response)
+        AsyncCapableMiddleware.__init__(self, get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return whitenoise.WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class RateLimitHeadersMiddleware(AsyncCapableMiddleware):
+    """
+    Adds X-RateLimit-Limit, X-RateLimit-Remaining and X-RateLimit-Reset (seconds until the
+    limit is fully available again) for the most restrictive throttle checked on the request.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._add_headers(request, await self.get_response(request))
+
+    @staticmethod
+    def _add_headers(request, response):
+        rate_limit = getattr(request, "rate_limit", None)
+        if rate_limit is not None:
+            response["X-RateLimit-Limit"] = rate_limit.limit
+            response["X-RateLimit-Remaining"] = rate_limit.remaining
+            response["X-RateLimit-Reset"] = math.ceil(rate_limit.reset)
+
+        return response
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Lets safe requests (GET, HEAD, OPTIONS) read from the replicas, see `core.replicas`.
+
+    After a request that wrote to the primary, the same client (by Authorization header,
+    or by IP without one) reads from the primary for REPLICA_STICKY_SECONDS, so it sees
+    its own booking or payment even while the replicas catch up.
+
+    The routing state is a context variable, so async requests keep theirs across
+    `sync_to_async` calls (ORM queries) and concurrent requests do not share it.
+    """
+
+    @staticmethod
+    def _sticky_key(request) -> str:
+        client = request.META.get(settings.SIMPLE_JWT["AUTH_HEADER_NAME"]) or request.META.get("REMOTE_ADDR", "")
+        return f"db-sticky:{hashlib.sha256(client.encode()).hexdigest()}"
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        key = self._sticky_key(request)
+        use_replicas = request.method in ("GET", "HEAD", "OPTIONS") and not cache.get(key)
+
+        with routing(use_replicas) as state:
+            response = self.get_response(request)
+
+        if state.wrote:
+            cache.set(key, True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        key = self._sticky_key(request)
+        use_replicas = request.method in ("GET", "HEAD", "OPTIONS") and not await cache.aget(key)
+
+        with routing(use_replicas) as state:
+            response = await self.get_response(request)
+
+        if state.wrote:
+            await cache.aset(key, True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+        return response
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+
+# Rows stuck in PROCESSING longer than this are assumed to belong to a dead worker.
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def claim_outbox_rows(queryset: QuerySet, *, batch_size: int, due: Q | None = None) -> list[models.Model]:
+    """
+    Locks and marks as PROCESSING a batch of outbox rows from `queryset`.
+
+    Claims PENDING rows (matching `due`, if given) and stale PROCESSING rows left by
+    a crashed worker, oldest first. Rows locked by other workers are skipped (FOR UPDATE
+    SKIP LOCKED), so several workers can drain the same outbox without double-processing.
+    Each claim counts as an attempt.
+
+    The model needs a `Status` with PENDING and PROCESSING members and the `status`,
+    `claimed_at` and `attempts` fields.
+
+    Returns:
+        list: The claimed rows, with their new status, claim time and attempts.
+    """
+    model = queryset.model
+    now = timezone.now()
+
+    pending = Q(status=model.Status.PENDING)
+    if due is not None:
+        pending &= due
+
+    with transaction.atomic():
+        claimed = list(
+            queryset.select_for_update(skip_locked=True, of=("self",))
+            .filter(pending | Q(status=model.Status.PROCESSING, claimed_at__lt=now - OUTBOX_CLAIM_TIMEOUT))
+            .order_by("id")[:batch_size]
+        )
+
+        model.objects.filter(id__in=[row.id for row in claimed]).update(
+            status=model.Status.PROCESSING,
+            claimed_at=now,
+            attempts=F("attempts") + 1,
+        )
+
+    for row in claimed:
+        row.status = model.Status.PROCESSING
+        row.claimed_at = now
+        row.attempts += 1
+
+    return claimed
+
+
+def mark_outbox_row_failed(
+    row: models.Model, error: str, *, max_attempts: int, retry_delay: timedelta | None = None
+) -> None:
+    """
+    Returns a claimed row to PENDING for another attempt, or marks it FAILED after `max_attempts`.
+
+    With `retry_delay`, the next attempt waits retry_delay * 2^(attempts - 1): the row's
+    `available_at` is moved forward, so its `due` filter must check it.
+    """
+    update_fields = ["status", "error"]
+
+    if row.attempts >= max_attempts:
+        row.status = row.Status.FAILED
+    else:
+        row.status = row.Status.PENDING
+        if retry_delay is not None:
+            row.available_at = timezone.now() + retry_delay * 2 ** (row.attempts - 1)
+            update_fields.append("available_at")
+
+    row.error = error
+    row.save(update_fields=update_fields)
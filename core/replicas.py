@@ -0,0 +1,124 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds of replication lag; 0 when the replica has replayed everything it received
+LAG_QUERY = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+@dataclass
+class RoutingState:
+    """Database routing of the current request or job."""
+
+    use_replicas: bool
+    wrote: bool = False
+
+
+_state: ContextVar[RoutingState | None] = ContextVar("db_routing_state", default=None)
+
+# alias -> (checked at, lag in seconds) for this process
+_lag_checks: dict[str, tuple[float, float]] = {}
+
+
+@contextmanager
+def routing(use_replicas: bool):
+    """Routes the reads in the block to replicas (if enabled) until the first write."""
+    state = RoutingState(use_replicas=use_replicas)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def replica_reads():
+    """For reporting jobs: reads in the block may go to a replica."""
+    return routing(use_replicas=True)
+
+
+def replica_lag(alias: str) -> float:
+    """Returns the replica's lag in seconds (0 for databases other than PostgreSQL)."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_QUERY)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def available_replicas() -> list[str]:
+    """
+    Returns the replicas lagging at most REPLICA_MAX_LAG seconds behind the primary.
+
+    Lag is measured at most every REPLICA_LAG_CHECK_INTERVAL seconds per replica and
+    process; a replica that cannot be reached counts as lagging until the next check.
+    """
+    now = time.monotonic()
+    available = []
+
+    for alias in settings.DATABASE_REPLICAS:
+        checked_at, lag = _lag_checks.get(alias, (None, None))
+        if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            try:
+                lag = replica_lag(alias)
+            except DatabaseError:
+                logger.warning("Replica %s is unavailable", alias, exc_info=True)
+                lag = float("inf")
+            _lag_checks[alias] = (now, lag)
+
+        if lag <= settings.REPLICA_MAX_LAG:
+            available.append(alias)
+
+    return available
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random replica within a `routing(use_replicas=True)` block, i.e. safe
+    requests (see `core.middleware.ReplicaRoutingMiddleware`) and reporting jobs.
+
+    Everything else uses the primary: writes, reads after a write in the same block
+    (read your writes), and all reads when every replica lags too far behind.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        state = _state.get()
+        if state is None or not state.use_replicas or state.wrote:
+            return None
+
+        replicas = available_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints) -> str:
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        # Replicas hold the same data as the primary
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool | None:
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,46 @@
+from collections.abc import Callable
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+
+def update_in_chunks(
+    queryset: QuerySet,
+    *,
+    chunk_size: int,
+    on_commit: Callable[[list[int]], None] | None = None,
+    **values,
+) -> int:
+    """
+    Applies `queryset.update(**values)` in chunks of at most `chunk_size` rows.
+
+    Each chunk runs in its own short transaction: the next IDs are selected with
+    FOR UPDATE SKIP LOCKED (so several workers can sweep the same table at once
+    without blocking or double-processing rows) and updated with a single
+    set-based UPDATE. `on_commit` is called with the updated IDs once the chunk
+    is committed, e.g. to enqueue batched notifications.
+
+    The queryset filter must exclude rows once they are updated, otherwise
+    the same rows would be claimed again.
+
+    Returns:
+        int: Total number of updated rows.
+    """
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                queryset.select_for_update(skip_locked=True).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                return total
+
+            updated = queryset.filter(pk__in=ids).update(**values)
+            total += updated
+
+            if on_commit:
+                transaction.on_commit(lambda ids=ids: on_commit(ids))
+
+        if len(ids) < chunk_size:
+            return total
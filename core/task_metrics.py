@@ -0,0 +1,183 @@
+import logging
+import math
+import time
+from datetime import datetime
+
+from celery import current_app
+from celery.signals import before_task_publish, task_postrun, task_prerun, task_retry
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+slow_logger = logging.getLogger("core.task_metrics.slow")
+
+PUBLISHED_AT_HEADER = "published_at"
+
+# Histogram upper bounds in seconds, shared by queue wait and runtime
+BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, math.inf)
+
+COUNTERS = ("count", "failures", "retries", "queue_wait_ms", "waited", "runtime_ms", "db_queries")
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+# task_id -> (start time, query counter) of the tasks running in this process
+_running: dict[str, tuple[float, QueryCounter]] = {}
+
+
+def _key(task_name: str, metric: str) -> str:
+    return f"task-metrics:{task_name}:{metric}"
+
+
+def _bucket_key(task_name: str, metric: str, bound: float) -> str:
+    return _key(task_name, f"{metric}:{'+Inf' if bound == math.inf else bound}")
+
+
+def _incr(key: str, delta: int = 1) -> None:
+    cache.add(key, 0, timeout=None)
+    cache.incr(key, delta)
+
+
+def _observe(task_name: str, metric: str, seconds: float) -> None:
+    """Adds an observation to the metric's histogram and running total."""
+    bound = next(bound for bound in BUCKETS if seconds <= bound)
+    _incr(_bucket_key(task_name, metric, bound))
+    _incr(_key(task_name, f"{metric}_ms"), round(seconds * 1000))
+
+
+@before_task_publish.connect
+def stamp_published_at(headers: dict, **kwargs) -> None:
+    """Stamps every published message, including retries, with its publish time."""
+    headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+def _queue_wait(request, started_at: float) -> float | None:
+    """
+    Seconds the message waited for a worker: from publishing, or from its ETA
+    (countdowns, retries and scheduled checks) if that is later.
+    """
+    published_at = (request.headers or {}).get(PUBLISHED_AT_HEADER)
+    if published_at is None:
+        return None
+
+    ready_at = published_at
+    if request.eta:
+        eta = request.eta if isinstance(request.eta, datetime) else datetime.fromisoformat(request.eta)
+        ready_at = max(ready_at, eta.timestamp())
+
+    return max(started_at - ready_at, 0.0)
+
+
+@task_prerun.connect
+def start_task_timer(task_id: str, task, **kwargs) -> None:
+    """Records queue wait and starts counting runtime and database queries."""
+    started_at = time.time()
+    counter = QueryCounter()
+    for connection in connections.all():
+        connection.execute_wrappers.append(counter)
+    _running[task_id] = (started_at, counter)
+
+    wait = _queue_wait(task.request, started_at)
+    if wait is not None:
+        _observe(task.name, "queue_wait", wait)
+        _incr(_key(task.name, "waited"))
+
+
+@task_postrun.connect
+def stop_task_timer(task_id: str, task, state: str | None = None, **kwargs) -> None:
+    """Records runtime, query count and outcome, and logs the task if it was slow."""
+    if task_id not in _running:
+        return
+
+    started_at, counter = _running.pop(task_id)
+    for connection in connections.all():
+        if counter in connection.execute_wrappers:
+            connection.execute_wrappers.remove(counter)
+
+    runtime = time.time() - started_at
+    _observe(task.name, "runtime", runtime)
+    _incr(_key(task.name, "count"))
+    _incr(_key(task.name, "db_queries"), counter.count)
+    if state == "FAILURE":
+        _incr(_key(task.name, "failures"))
+
+    threshold = settings.TASK_SLOW_LOG_THRESHOLDS.get(task.name, settings.TASK_SLOW_LOG_THRESHOLD)
+    if threshold is not None and runtime >= threshold:
+        slow_logger.warning(
+            "Slow task %s[%s]: %.3fs runtime, %s queries, state %s",
+            task.name,
+            task_id,
+            runtime,
+            counter.count,
+            state,
+        )
+
+
+@task_retry.connect
+def count_task_retry(sender, **kwargs) -> None:
+    _incr(_key(sender.name, "retries"))
+
+
+def _histogram(values: dict, task_name: str, metric: str) -> dict:
+    """Cumulative bucket counts keyed by upper bound, as in Prometheus histograms."""
+    buckets = {}
+    total = 0
+    for bound in BUCKETS:
+        key = _bucket_key(task_name, metric, bound)
+        total += values.get(key, 0)
+        buckets[key.rsplit(":", 1)[1]] = total
+    return buckets
+
+
+def task_metrics() -> dict:
+    """
+    Returns per-task metrics recorded by the Celery signal hooks.
+
+    Counters live in the default cache, so they cover every worker sharing it.
+
+    - count/failures/retries: finished runs, failed runs and retries.
+    - queue_wait: time from publishing (or the ETA) until a worker started the task.
+    - runtime: time spent running the task.
+    - db_queries: total and average database queries per run.
+    """
+    names = sorted(current_app.tasks)
+    keys = [_key(name, counter) for name in names for counter in COUNTERS]
+    keys += [
+        _bucket_key(name, metric, bound) for name in names for metric in ("queue_wait", "runtime") for bound in BUCKETS
+    ]
+    values = cache.get_many(keys)
+
+    metrics = {}
+    for name in names:
+        count, failures, retries, wait_ms, waited, runtime_ms, queries = (
+            values.get(_key(name, counter), 0) for counter in COUNTERS
+        )
+        if not count and not retries:
+            continue
+
+        metrics[name] = {
+            "count": count,
+            "failures": failures,
+            "retries": retries,
+            "queue_wait": {
+                "avg_seconds": round(wait_ms / waited / 1000, 3) if waited else None,
+                "buckets": _histogram(values, name, "queue_wait"),
+            },
+            "runtime": {
+                "avg_seconds": round(runtime_ms / count / 1000, 3) if count else None,
+                "buckets": _histogram(values, name, "runtime"),
+            },
+            "db_queries": {"total": queries, "avg": round(queries / count, 1) if count else None},
+        }
+
+    return metrics
@@ -0,0 +1,98 @@
+import asyncio
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.aio import AsyncAPIView, AsyncViewMixin, per_event_loop
+
+
+class EchoView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        await asyncio.sleep(0)
+        if "missing" in request.query_params:
+            raise NotFound()
+        return Response({"email": request.user.email})
+
+
+class EchoViewSet(AsyncViewMixin, viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        return Response({"action": self.action})
+
+    @action(detail=False, methods=["POST"])
+    async def wait(self, request):
+        await asyncio.sleep(0)
+        return Response({"action": self.action})
+
+
+class AsyncViewTests(TestCase):
+    """
+    Tests DRF dispatch of async handlers.
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(email="user@test.com", password="password123")
+
+    def _request(self, method, path="/", **extra):
+        request = getattr(self.factory, method)(path, **extra)
+        force_authenticate(request, user=self.user)
+        return request
+
+    def test_async_handler_runs_after_authentication(self):
+        view = EchoView.as_view()
+
+        self.assertTrue(iscoroutinefunction(view))
+        response = asyncio.run(view(self._request("get")))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"email": "user@test.com"})
+
+    def test_permissions_and_exceptions_become_responses(self):
+        view = EchoView.as_view()
+
+        self.assertEqual(asyncio.run(view(self.factory.get("/"))).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(asyncio.run(view(self._request("get", "/?missing"))).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(asyncio.run(view(self._request("post"))).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_viewset_routes_with_async_actions_are_async(self):
+        """Only the routes of async actions are async; the others keep the sync dispatch."""
+        sync_view = EchoViewSet.as_view({"get": "list"})
+        async_view = EchoViewSet.as_view({"post": "wait"})
+
+        self.assertFalse(iscoroutinefunction(sync_view))
+        self.assertEqual(sync_view(self._request("get")).data, {"action": "list"})
+
+        self.assertTrue(iscoroutinefunction(async_view))
+        self.assertEqual(asyncio.run(async_view(self._request("post"))).data, {"action": "wait"})
+
+
+class PerEventLoopTests(SimpleTestCase):
+    def test_one_instance_per_loop(self):
+        get = per_event_loop(object)
+
+        async def twice():
+            return get(), get()
+
+        first, second = asyncio.run(twice())
+        self.assertIs(first, second)
+        self.assertIsNot(asyncio.run(twice())[0], first)
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    @override_settings(DEBUG=True)
+    def test_middleware_stack_runs_async(self):
+        """Under ASGI no middleware pushes the request through a thread (Django logs each adaptation)."""
+        with self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler().load_middleware(is_async=True)
@@ -0,0 +1,94 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase
+
+from core.cache import get_or_set, invalidate_tags
+
+
+class GetOrSetTests(SimpleTestCase):
+    """
+    Tests the cache API with stampede protection and tagged invalidation.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_computes_once_then_hits(self):
+        """The value is computed on the first call and served from the cache afterwards."""
+        default = MagicMock(return_value={"cars": 3})
+
+        self.assertEqual(get_or_set("cars", default, 60), {"cars": 3})
+        self.assertEqual(get_or_set("cars", default, 60), {"cars": 3})
+        default.assert_called_once()
+
+    def test_caches_falsy_values(self):
+        """None and empty values are cached like any other value."""
+        default = MagicMock(return_value=None)
+
+        get_or_set("nothing", default, 60)
+        get_or_set("nothing", default, 60)
+
+        default.assert_called_once()
+
+    def test_concurrent_misses_compute_once(self):
+        """Concurrent callers wait for the one recomputing instead of stampeding the database."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_or_set("hot", compute, 60))) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 10)
+
+    def test_serves_stale_value_while_recomputing(self):
+        """An expired value is returned while another caller holds the lock."""
+        get_or_set("report", lambda: "old", 1)
+        time.sleep(1.1)
+        cache.add("report:lock", True)
+
+        self.assertEqual(get_or_set("report", lambda: "new", 1), "old")
+
+    def test_computes_itself_when_waiting_times_out(self):
+        """Without a stale value, a caller stops waiting after wait_timeout and computes the value."""
+        cache.add("report:lock", True)
+
+        self.assertEqual(get_or_set("report", lambda: "new", 60, wait_timeout=0.1), "new")
+
+    def test_invalidated_tags_force_recompute(self):
+        """Invalidating a tag drops every entry stored with it, and only those."""
+        get_or_set("car:1:detail", lambda: "v1", 60, tags=["car:1"])
+        get_or_set("car:2:detail", lambda: "v1", 60, tags=["car:2"])
+
+        invalidate_tags("car:1")
+
+        self.assertEqual(get_or_set("car:1:detail", lambda: "v2", 60, tags=["car:1"]), "v2")
+        self.assertEqual(get_or_set("car:2:detail", lambda: "v2", 60, tags=["car:2"]), "v1")
+
+    def test_invalidated_value_is_not_served_as_stale(self):
+        """A caller waiting on another's recompute never gets an invalidated value."""
+        get_or_set("car:1:detail", lambda: "v1", 60, tags=["car:1"])
+        invalidate_tags("car:1")
+        cache.add("car:1:detail:lock", True)
+
+        self.assertEqual(get_or_set("car:1:detail", lambda: "v2", 60, tags=["car:1"], wait_timeout=0.1), "v2")
+
+    def test_uses_the_given_cache(self):
+        """Entries go to the cache alias they are requested for."""
+        caches["responses"].clear()
+
+        get_or_set("page", lambda: "body", 60, cache_alias="responses")
+
+        self.assertIsNone(cache.get("page"))
+        self.assertIsNotNone(caches["responses"].get("page"))
@@ -0,0 +1,150 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from unittest import skipUnless
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from car.models import Car
+from config.database import connection_settings
+from core.tests.utils import benchmark
+from user.authentication import RefreshToken
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    """
+    Tests the DATABASES settings of each connection strategy.
+    """
+
+    def test_persistent_connections_are_health_checked(self):
+        self.assertEqual(
+            connection_settings("persistent", conn_max_age=300), {"CONN_MAX_AGE": 300, "CONN_HEALTH_CHECKS": True}
+        )
+
+    def test_pool_returns_connections_after_each_request(self):
+        """Django requires CONN_MAX_AGE = 0 with a pool; connections are checked before use."""
+        db = connection_settings("pool", pool_min_size=1, pool_max_size=4)
+
+        self.assertEqual(db["CONN_MAX_AGE"], 0)
+        self.assertEqual(db["OPTIONS"]["pool"]["min_size"], 1)
+        self.assertEqual(db["OPTIONS"]["pool"]["max_size"], 4)
+        self.assertTrue(db["CONN_HEALTH_CHECKS"])
+
+    def test_pgbouncer_disables_server_side_state(self):
+        """Transaction pooling cannot keep cursors or prepared statements between transactions."""
+        db = connection_settings("pgbouncer")
+
+        self.assertTrue(db["DISABLE_SERVER_SIDE_CURSORS"])
+        self.assertIsNone(db["OPTIONS"]["prepare_threshold"])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            connection_settings("session")
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+class IteratorTests(TransactionTestCase):
+    """
+    Tests `.iterator()` in autocommit mode, as used by sweeps behind PgBouncer.
+    """
+
+    def setUp(self):
+        Car.objects.bulk_create(
+            Car(brand="Toyota", model=f"M{i}", year=2020, fuel_type="GAS", daily_rate=50, inventory=1) for i in range(5)
+        )
+
+    def test_iterator_without_server_side_cursors(self):
+        """With PgBouncer settings the rows are fetched client-side, in one plain query."""
+        connection.settings_dict["DISABLE_SERVER_SIDE_CURSORS"] = True
+        try:
+            with self.assertNumQueries(1) as queries:
+                cars = list(Car.objects.iterator(chunk_size=2))
+        finally:
+            connection.settings_dict["DISABLE_SERVER_SIDE_CURSORS"] = False
+
+        self.assertEqual(len(cars), 5)
+        self.assertNotIn("DECLARE", queries.captured_queries[0]["sql"])
+
+
+@benchmark
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+class ConnectionModeBenchmark(TransactionTestCase):
+    """
+    Requests per second for /api/cars/ under each connection strategy, against
+    opening a connection per request (CONN_MAX_AGE = 0, the previous setup).
+
+    Each mode runs its own single-threaded server process, like a sync gunicorn
+    worker, configured through the DB_CONNECTION_MODE environment variable.
+    """
+
+    CARS = 20
+    REQUESTS = 200
+
+    def setUp(self):
+        Car.objects.bulk_create(
+            Car(brand="Toyota", model=f"M{i}", year=2020, fuel_type="GAS", daily_rate=50, inventory=1)
+            for i in range(self.CARS)
+        )
+        user = get_user_model().objects.create_user(email="bench@test.com", password="password123")
+        self.token = str(RefreshToken.for_user(user).access_token)
+
+    def _requests_per_second(self, **env) -> float:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        db = connection.settings_dict
+        server = subprocess.Popen(
+            [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload", "--nothreading"],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "POSTGRES_DB": db["NAME"],
+                "POSTGRES_USER": db["USER"] or "",
+                "POSTGRES_PASSWORD": db["PASSWORD"] or "",
+                "POSTGRES_HOST": db["HOST"] or "",
+                "POSTGRES_PORT": str(db["PORT"] or ""),
+                **env,
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            with httpx.Client(
+                base_url=f"http://127.0.0.1:{port}", headers={"Authorize": f"Bearer {self.token}"}
+            ) as client:
+                deadline = time.monotonic() + 30
+                while True:
+                    try:
+                        client.get("/api/cars/").raise_for_status()
+                        break
+                    except httpx.TransportError:
+                        if time.monotonic() > deadline:
+                            raise
+                        time.sleep(0.1)
+
+                started = time.perf_counter()
+                for _ in range(self.REQUESTS):
+                    client.get("/api/cars/").raise_for_status()
+                return self.REQUESTS / (time.perf_counter() - started)
+        finally:
+            server.terminate()
+            server.wait()
+
+    def test_reused_connections_serve_more_requests(self):
+        baseline = self._requests_per_second(DB_CONNECTION_MODE="persistent", DB_CONN_MAX_AGE="0")
+        modes = {
+            mode: self._requests_per_second(DB_CONNECTION_MODE=mode) for mode in ("persistent", "pool", "pgbouncer")
+        }
+
+        report = ", ".join(f"{mode}: {rps:.0f}/s" for mode, rps in {"per request": baseline, **modes}.items())
+        for mode, rps in modes.items():
+            with self.subTest(mode):
+                self.assertGreater(rps, baseline, report)
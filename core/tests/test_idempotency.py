@@ -0,0 +1,206 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from core.idempotency import REPLAYED_HEADER, _cache_key, idempotent
+
+
+class CountingView(APIView):
+    """Test view that counts how many times its handler actually runs."""
+
+    handler = MagicMock(return_value=(status.HTTP_201_CREATED, {"id": 1}))
+
+    @idempotent
+    def post(self, request):
+        code, data = self.handler()
+        return Response(data, status=code)
+
+
+class IdempotentDecoratorTests(TestCase):
+    """Tests for the idempotent view decorator."""
+
+    def setUp(self):
+        cache.clear()
+        CountingView.handler.reset_mock(return_value=True, side_effect=True)
+        CountingView.handler.return_value = (status.HTTP_201_CREATED, {"id": 1})
+
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(email="user@test.com", password="testpass")
+        self.view = CountingView.as_view()
+
+    def _post(self, key=None, data=None, user=None):
+        """Sends a POST to the test view with an optional Idempotency-Key header."""
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        request = self.factory.post("/test/", data or {"car": 1}, format="json", **headers)
+        force_authenticate(request, user=user or self.user)
+        return self.view(request)
+
+    def test_without_header_runs_every_time(self):
+        """Tests that requests without the header are never deduplicated."""
+        self._post()
+        self._post()
+
+        self.assertEqual(CountingView.handler.call_count, 2)
+
+    def test_duplicate_key_replays_first_response(self):
+        """Tests that a retried request returns the stored response without running the view."""
+        first = self._post(key="abc")
+        second = self._post(key="abc")
+
+        self.assertEqual(CountingView.handler.call_count, 1)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second[REPLAYED_HEADER], "true")
+
+    def test_key_is_scoped_per_user(self):
+        """Tests that two users sending the same key do not share responses."""
+        other = get_user_model().objects.create_user(email="other@test.com", password="testpass")
+
+        self._post(key="abc")
+        self._post(key="abc", user=other)
+
+        self.assertEqual(CountingView.handler.call_count, 2)
+
+    def test_key_reused_with_different_payload_returns_422(self):
+        """Tests that reusing a key with another body is rejected."""
+        self._post(key="abc", data={"car": 1})
+        response = self._post(key="abc", data={"car": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(CountingView.handler.call_count, 1)
+
+    def test_client_errors_are_stored(self):
+        """Tests that 4xx responses are replayed as well."""
+        CountingView.handler.return_value = (status.HTTP_400_BAD_REQUEST, {"error": "bad"})
+
+        self._post(key="abc")
+        response = self._post(key="abc")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(CountingView.handler.call_count, 1)
+
+    def test_server_errors_are_not_stored(self):
+        """Tests that 5xx responses are not stored so the client can retry."""
+        CountingView.handler.return_value = (status.HTTP_502_BAD_GATEWAY, {"detail": "Stripe down"})
+        self._post(key="abc")
+
+        CountingView.handler.return_value = (status.HTTP_200_OK, {"id": 1})
+        response = self._post(key="abc")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CountingView.handler.call_count, 2)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_in_flight_duplicate_times_out_with_409(self):
+        """Tests that a duplicate returns 409 if the original request does not finish in time."""
+        request = self.factory.post("/test/", {"car": 1}, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        request.user = self.user
+        cache.add(f"{_cache_key(request, 'abc')}:lock", "fingerprint")
+
+        response = self._post(key="abc")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        CountingView.handler.assert_not_called()
+
+    def test_in_flight_duplicate_waits_for_result(self):
+        """Tests that a concurrent duplicate waits and replays the in-flight response."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_handler():
+            started.set()
+            release.wait(timeout=5)
+            return status.HTTP_201_CREATED, {"id": 7}
+
+        CountingView.handler.side_effect = slow_handler
+        results = {}
+
+        first = threading.Thread(target=lambda: results.setdefault("first", self._post(key="abc")))
+        first.start()
+        started.wait(timeout=5)
+
+        second = threading.Thread(target=lambda: results.setdefault("second", self._post(key="abc")))
+        second.start()
+        release.set()
+
+        first.join(timeout=5)
+        second.join(timeout=5)
+
+        self.assertEqual(CountingView.handler.call_count, 1)
+        self.assertEqual(results["second"].status_code, status.HTTP_201_CREATED)
+        self.assertEqual(results["second"].data, {"id": 7})
+
+    def test_async_handler_replays_first_response(self):
+        """Async handlers get the same replay behaviour."""
+        handler = MagicMock(return_value=Response({"id": 1}, status=status.HTTP_201_CREATED))
+
+        @idempotent
+        async def post(view, request):
+            return handler()
+
+        def call():
+            request = Request(self.factory.post("/test/", {"car": 1}, format="json", HTTP_IDEMPOTENCY_KEY="abc"))
+            request.user = self.user
+            return asyncio.run(post(None, request))
+
+        call()
+        response = call()
+
+        handler.assert_called_once()
+        self.assertEqual((response.status_code, response.data), (status.HTTP_201_CREATED, {"id": 1}))
+        self.assertEqual(response[REPLAYED_HEADER], "true")
+
+    def test_in_flight_duplicate_takes_over_after_server_error(self):
+        """Tests that a waiting duplicate runs the view itself once a failed request releases the lock."""
+        started = threading.Event()
+        release = threading.Event()
+        responses = iter(
+            [(status.HTTP_502_BAD_GATEWAY, {"detail": "Stripe down"}), (status.HTTP_201_CREATED, {"id": 7})]
+        )
+
+        def handler():
+            started.set()
+            release.wait(timeout=5)
+            return next(responses)
+
+        CountingView.handler.side_effect = handler
+        results = {}
+
+        first = threading.Thread(target=lambda: results.setdefault("first", self._post(key="abc")))
+        first.start()
+        started.wait(timeout=5)
+
+        second = threading.Thread(target=lambda: results.setdefault("second", self._post(key="abc")))
+        second.start()
+        release.set()
+
+        first.join(timeout=5)
+        second.join(timeout=5)
+
+        self.assertEqual(CountingView.handler.call_count, 2)
+        self.assertEqual(results["first"].status_code, status.HTTP_502_BAD_GATEWAY)
+        self.assertEqual(results["second"].status_code, status.HTTP_201_CREATED)
+
+    def test_lock_taken_over_by_another_request_is_kept(self):
+        """Tests that a request whose lock expired does not release the lock of the next holder."""
+        request = self.factory.post("/test/", {"car": 1}, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        request.user = self.user
+        lock_key = f"{_cache_key(request, 'abc')}:lock"
+
+        def handler():
+            cache.set(lock_key, "other-request")
+            return status.HTTP_502_BAD_GATEWAY, {"detail": "Stripe down"}
+
+        CountingView.handler.side_effect = handler
+        self._post(key="abc")
+
+        self.assertEqual(cache.get(lock_key), "other-request")
@@ -0,0 +1,105 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path
+
+from core.middleware import show_debug_toolbar
+from core.tests.utils import benchmark
+
+
+def probe(request):
+    """Reports which browser middleware ran for the request."""
+    return JsonResponse(
+        {
+            "session": hasattr(request, "session"),
+            "user": hasattr(request, "user"),
+            "messages": hasattr(request, "_messages"),
+        }
+    )
+
+
+urlpatterns = [
+    path("api/probe/", probe),
+    path("admin/probe/", probe),
+]
+
+# The stack before API requests skipped the browser middleware
+STOCK_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.WhiteNoiseMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.RateLimitHeadersMiddleware",
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class BrowserOnlyMiddlewareTests(TestCase):
+    """
+    Tests that API requests skip session, CSRF, authentication and messages middleware.
+    """
+
+    def test_api_requests_skip_browser_middleware(self):
+        response = self.client.get("/api/probe/")
+
+        self.assertEqual(response.json(), {"session": False, "user": False, "messages": False})
+
+    def test_admin_keeps_browser_middleware(self):
+        response = self.client.get("/admin/probe/")
+
+        self.assertEqual(response.json(), {"session": True, "user": True, "messages": True})
+
+    def test_csrf_is_only_checked_outside_the_api(self):
+        self.client = self.client_class(enforce_csrf_checks=True)
+
+        self.assertEqual(self.client.post("/api/probe/").status_code, 200)
+        self.assertEqual(self.client.post("/admin/probe/").status_code, 403)
+
+    @override_settings(DEBUG=True, INTERNAL_IPS=["127.0.0.1"])
+    def test_debug_toolbar_is_only_shown_outside_the_api(self):
+        factory = RequestFactory()
+
+        self.assertFalse(show_debug_toolbar(factory.get("/api/cars/")))
+        self.assertTrue(show_debug_toolbar(factory.get("/admin/")))
+
+
+@benchmark
+@override_settings(ROOT_URLCONF=__name__)
+class MiddlewareOverheadBenchmark(SimpleTestCase):
+    """
+    Per-request middleware overhead of an API request, with the stock Django middleware
+    against the stack skipping the browser middleware for /api/ paths.
+    """
+
+    REQUESTS = 2000
+    ROUNDS = 5
+
+    def _microseconds_per_request(self, middleware: list[str]) -> float:
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+
+        request = RequestFactory().get("/api/probe/", HTTP_AUTHORIZE="Bearer token")
+        best = float("inf")
+        for _ in range(self.ROUNDS):
+            started = time.perf_counter()
+            for _ in range(self.REQUESTS):
+                handler.get_response(request)
+            best = min(best, time.perf_counter() - started)
+
+        return best / self.REQUESTS * 1_000_000
+
+    def test_api_requests_have_less_middleware_overhead(self):
+        stock = self._microseconds_per_request(STOCK_MIDDLEWARE)
+        lean = self._microseconds_per_request(settings.MIDDLEWARE)
+
+        self.assertLess(lean, stock, f"stock: {stock:.0f} µs/request, lean: {lean:.0f} µs/request")
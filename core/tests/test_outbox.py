@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from core.outbox import OUTBOX_CLAIM_TIMEOUT, claim_outbox_rows, mark_outbox_row_failed
+from notifications.models import Notification
+
+
+class OutboxHelpersTests(TestCase):
+    """
+    Tests claiming and retrying outbox rows, using the notification outbox.
+    """
+
+    def _notification(self, key, **fields):
+        return Notification.objects.create(channel="email", event="test", dedupe_key=key, text="hello", **fields)
+
+    def test_claims_due_and_stale_rows(self):
+        """Due PENDING rows and PROCESSING rows of a dead worker are claimed; others are left alone."""
+        now = timezone.now()
+        due = self._notification("due")
+        self._notification("later", available_at=now + timedelta(minutes=1))
+        stale = self._notification(
+            "stale", status=Notification.Status.PROCESSING, claimed_at=now - OUTBOX_CLAIM_TIMEOUT * 2
+        )
+        self._notification("busy", status=Notification.Status.PROCESSING, claimed_at=now)
+
+        claimed = claim_outbox_rows(Notification.objects.all(), batch_size=10, due=Q(available_at__lte=timezone.now()))
+
+        self.assertEqual([row.id for row in claimed], [due.id, stale.id])
+        for row in claimed:
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), (Notification.Status.PROCESSING, 1))
+
+    def test_failed_rows_back_off_then_fail(self):
+        notification = self._notification("failing")
+        delay = timedelta(seconds=30)
+
+        [notification] = claim_outbox_rows(Notification.objects.all(), batch_size=10)
+        mark_outbox_row_failed(notification, "boom", max_attempts=2, retry_delay=delay)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertGreater(notification.available_at, timezone.now() + delay / 2)
+
+        Notification.objects.update(available_at=timezone.now())
+        [notification] = claim_outbox_rows(Notification.objects.all(), batch_size=10)
+        mark_outbox_row_failed(notification, "boom again", max_attempts=2, retry_delay=delay)
+
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.error), (Notification.Status.FAILED, "boom again"))
@@ -0,0 +1,138 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from car.models import Car
+from core import replicas
+from core.replicas import ReplicaRouter, replica_reads, routing
+from user.authentication import RefreshToken
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1", "replica_2"], REPLICA_MAX_LAG=5, REPLICA_LAG_CHECK_INTERVAL=5)
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Tests routing decisions between the primary and the replicas.
+    """
+
+    def setUp(self):
+        replicas._lag_checks.clear()
+        self.router = ReplicaRouter()
+        lag = patch("core.replicas.replica_lag", return_value=0)
+        self.replica_lag = lag.start()
+        self.addCleanup(lag.stop)
+
+    def test_reads_use_primary_by_default(self):
+        """Celery tasks and unsafe requests never read from a replica."""
+        self.assertIsNone(self.router.db_for_read(Car))
+
+        with routing(use_replicas=False):
+            self.assertIsNone(self.router.db_for_read(Car))
+
+    def test_replica_reads(self):
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Car), ["replica_1", "replica_2"])
+
+    def test_reads_after_write_use_primary(self):
+        """Read your writes: once the block wrote, its reads go to the primary."""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Car), "default")
+            self.assertIsNone(self.router.db_for_read(Car))
+
+    def test_lagging_replicas_are_skipped(self):
+        self.replica_lag.side_effect = lambda alias: {"replica_1": 30, "replica_2": 1}[alias]
+
+        with replica_reads():
+            self.assertEqual({self.router.db_for_read(Car) for _ in range(10)}, {"replica_2"})
+
+    def test_falls_back_to_primary(self):
+        """With every replica lagging or unreachable, reads go to the primary."""
+        self.replica_lag.side_effect = lambda alias: {"replica_1": 30}.get(alias) or _raise(DatabaseError())
+
+        with replica_reads(), self.assertLogs("core.replicas", "WARNING"):
+            self.assertIsNone(self.router.db_for_read(Car))
+
+    def test_lag_is_checked_once_per_interval(self):
+        with replica_reads():
+            for _ in range(5):
+                self.router.db_for_read(Car)
+
+        self.assertEqual(self.replica_lag.call_count, 2)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica_1", "car"))
+        self.assertIsNone(self.router.allow_migrate("default", "car"))
+
+
+def _raise(error):
+    raise error
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Tests request routing with a "replica" alias pointing at the test database,
+    as a second connection like a real replica would be.
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings["replica"] = {**connection.settings_dict, "TEST": {"MIRROR": "default"}}
+        cls.addClassCleanup(cls._remove_replica)
+        super().setUpClass()
+
+    @classmethod
+    def _remove_replica(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+
+    def setUp(self):
+        replicas._lag_checks.clear()
+        replica_settings = override_settings(DATABASE_REPLICAS=["replica"])
+        replica_settings.enable()
+        self.addCleanup(replica_settings.disable)
+
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, fuel_type="GAS", daily_rate=50, inventory=2
+        )
+        self.user = get_user_model().objects.create_user(email="user@test.com", password="password123")
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZE=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def _get_cars(self, client) -> tuple[list, list]:
+        """Lists cars and returns the queries run on the primary and on the replica."""
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(connections["replica"]) as replica:
+            client.get(reverse("car:car-list"))
+        return primary.captured_queries, replica.captured_queries
+
+    def test_safe_requests_read_from_replica(self):
+        primary, replica = self._get_cars(self._client(self.user))
+
+        self.assertTrue(any('"car_car"' in query["sql"] for query in replica))
+        self.assertFalse(any('"car_car"' in query["sql"] for query in primary))
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_client_reads_from_primary_after_write(self, mock_dispatch):
+        """After booking, the same client reads its writes from the primary; others still use the replica."""
+        client = self._client(self.user)
+        response = client.post(
+            reverse("rental:rental-list"), {"car": self.car.id, "start_date": "2099-01-01", "end_date": "2099-01-03"}
+        )
+        self.assertEqual(response.status_code, 201)
+
+        primary, replica = self._get_cars(client)
+        self.assertTrue(any('"car_car"' in query["sql"] for query in primary))
+        self.assertFalse(replica)
+
+        other = get_user_model().objects.create_user(email="other@test.com", password="password123")
+        _, replica = self._get_cars(self._client(other))
+        self.assertTrue(replica)
@@ -0,0 +1,193 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from config import server
+from config.server import available_cpus, available_memory, gunicorn_options, tune
+from core.tests.utils import benchmark
+from user.authentication import RefreshToken
+
+
+GB = 1024**3
+
+
+class TuneTests(SimpleTestCase):
+    """
+    Tests worker and thread counts per worker class.
+    """
+
+    def test_worker_counts_follow_cpus(self):
+        self.assertEqual(tune("sync", cpus=4, memory=16 * GB, worker_memory=GB // 4), {"workers": 9, "threads": 1})
+        self.assertEqual(tune("gthread", cpus=4, memory=16 * GB, worker_memory=GB // 4), {"workers": 5, "threads": 4})
+        self.assertEqual(tune("uvicorn", cpus=4, memory=16 * GB, worker_memory=GB // 4), {"workers": 4, "threads": 1})
+
+    def test_workers_fit_in_memory(self):
+        """A small container gets fewer workers, but always one."""
+        self.assertEqual(tune("sync", cpus=8, memory=GB, worker_memory=GB // 4)["workers"], 4)
+        self.assertEqual(tune("sync", cpus=8, memory=GB // 8, worker_memory=GB // 4)["workers"], 1)
+
+    def test_unknown_worker_class(self):
+        with self.assertRaises(ValueError):
+            tune("eventlet", cpus=1, memory=GB, worker_memory=GB)
+
+
+class ContainerLimitsTests(SimpleTestCase):
+    """
+    Tests reading the container's CPU and memory limits (cgroup v2).
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cgroup = Path(directory.name)
+        cgroup = patch.object(server, "CGROUP", self.cgroup)
+        cgroup.start()
+        self.addCleanup(cgroup.stop)
+
+    def test_cpu_quota_is_rounded_up(self):
+        (self.cgroup / "cpu.max").write_text("150000 100000\n")
+
+        with patch("os.sched_getaffinity", return_value=set(range(8)), create=True):
+            self.assertEqual(available_cpus(), 2)
+
+    def test_without_limits_uses_the_machine(self):
+        (self.cgroup / "cpu.max").write_text("max 100000\n")
+        (self.cgroup / "memory.max").write_text("max\n")
+
+        with patch("os.sched_getaffinity", return_value=set(range(8)), create=True):
+            self.assertEqual(available_cpus(), 8)
+        self.assertEqual(available_memory(), os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+
+    def test_memory_limit(self):
+        (self.cgroup / "memory.max").write_text(f"{2 * GB}\n")
+
+        self.assertEqual(available_memory(), 2 * GB)
+
+
+@patch("config.server.available_memory", return_value=16 * GB)
+@patch("config.server.available_cpus", return_value=2)
+class GunicornOptionsTests(SimpleTestCase):
+    """
+    Tests the gunicorn settings of `manage.py serve`.
+    """
+
+    def _options(self, worker_class="gthread", **kwargs):
+        defaults = {
+            "bind": "0.0.0.0:8000",
+            "worker_memory": GB // 4,
+            "max_requests": 1000,
+            "timeout": 30,
+            "graceful_timeout": 30,
+            "keepalive": 5,
+        }
+        return gunicorn_options(worker_class, **{**defaults, **kwargs})
+
+    def test_production_defaults(self, *mocks):
+        """The app is preloaded and workers are recycled at different times."""
+        options = self._options()
+
+        self.assertEqual((options["workers"], options["threads"]), (3, 4))
+        self.assertTrue(options["preload_app"])
+        self.assertFalse(options["reload"])
+        self.assertEqual(options["max_requests_jitter"], 100)
+
+    def test_explicit_counts_win(self, *mocks):
+        options = self._options(workers=6, threads=2)
+
+        self.assertEqual((options["workers"], options["threads"]), (6, 2))
+
+    def test_reload_loads_app_in_workers(self, *mocks):
+        self.assertFalse(self._options(reload=True)["preload_app"])
+
+    def test_print_config(self, *mocks):
+        out = StringIO()
+        call_command("serve", "--worker-class", "uvicorn", "--print-config", stdout=out)
+
+        self.assertIn("worker_class = 'uvicorn_worker.UvicornWorker'", out.getvalue())
+        self.assertIn("workers = 2", out.getvalue())
+
+
+@benchmark
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+class ServeTests(TransactionTestCase):
+    """
+    Runs `manage.py serve` against the test database. Boots real servers for each worker
+    class, so like the benchmarks it only runs with RUN_BENCHMARKS set.
+    """
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="serve@test.com", password="password123")
+        self.token = str(RefreshToken.for_user(user).access_token)
+
+    def _serve(self, *args, **env) -> tuple[subprocess.Popen, str]:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        db = connection.settings_dict
+        process = subprocess.Popen(
+            [sys.executable, "manage.py", "serve", "--bind", f"127.0.0.1:{port}", *args],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "POSTGRES_DB": db["NAME"],
+                "POSTGRES_USER": db["USER"] or "",
+                "POSTGRES_PASSWORD": db["PASSWORD"] or "",
+                "POSTGRES_HOST": db["HOST"] or "",
+                "POSTGRES_PORT": str(db["PORT"] or ""),
+                **env,
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        self.addCleanup(process.kill)
+        return process, f"http://127.0.0.1:{port}"
+
+    def _get_cars(self, base_url: str, count: int) -> None:
+        # A new connection per request: a recycled worker drops its idle keep-alive connections
+        with httpx.Client(
+            base_url=base_url,
+            headers={"Authorize": f"Bearer {self.token}"},
+            limits=httpx.Limits(max_keepalive_connections=0),
+        ) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    client.get("/api/cars/").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.1)
+
+            for _ in range(count - 1):
+                client.get("/api/cars/").raise_for_status()
+
+    def test_workers_are_recycled_and_stop_gracefully(self):
+        """With one worker and WEB_MAX_REQUESTS=10, serving 30 requests boots replacement workers."""
+        for worker_class in server.WORKER_CLASSES:
+            with self.subTest(worker_class):
+                process, base_url = self._serve("--worker-class", worker_class, "--workers", "1", WEB_MAX_REQUESTS="10")
+
+                self._get_cars(base_url, 30)
+                process.send_signal(signal.SIGTERM)
+                _, log = process.communicate(timeout=60)
+
+                self.assertEqual(process.returncode, 0, log)
+                self.assertGreater(log.count("Booting worker"), 1, log)
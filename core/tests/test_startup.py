@@ -0,0 +1,122 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(?P<cumulative>\d+) \|(?P<indent> +)(?P<module>\S+)$")
+
+# Generous budget for `manage.py check` imports on CI; lower it as startup gets faster
+IMPORT_TIME_BUDGET_MS = int(os.getenv("IMPORT_TIME_BUDGET_MS", 2000))
+
+LAZY_MODULES = ("stripe", "httpx")
+
+PROD_ENV = {"DJANGO_ENV": "prod", "DJANGO_SECRET_KEY": "startup-test"}
+
+# `manage.py check` with name resolution and connections failing
+CHECK_WITHOUT_NETWORK = """
+import runpy, socket, sys
+
+def blocked(*args, **kwargs):
+    raise OSError("network I/O during startup")
+
+socket.getaddrinfo = socket.gethostbyname = socket.gethostbyname_ex = socket.create_connection = blocked
+socket.socket.connect = blocked
+sys.argv = ["manage.py", "check"]
+runpy.run_path("manage.py", run_name="__main__")
+"""
+
+
+def measure_startup_imports(**env) -> tuple[float, set[str]]:
+    """
+    Runs `python -X importtime manage.py check` and parses its report.
+
+    Args:
+        **env: Environment variables to set, e.g. the settings profile.
+
+    Returns:
+        tuple: Total import time of top-level modules in milliseconds and the names of all imported modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "manage.py", "check"],
+        cwd=Path(settings.BASE_DIR),
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+
+        modules.add(match["module"])
+        if len(match["indent"]) == 1:
+            total_us += int(match["cumulative"])
+
+    return total_us / 1000, modules
+
+
+class StartupImportTimeTests(SimpleTestCase):
+    """
+    Import-time benchmark for `manage.py check`, the cost paid by every web worker,
+    Celery worker and management command.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.total_ms, cls.modules = measure_startup_imports()
+
+    def test_import_time_within_budget(self):
+        """Startup imports stay within IMPORT_TIME_BUDGET_MS."""
+        self.assertLess(
+            self.total_ms,
+            IMPORT_TIME_BUDGET_MS,
+            f"Startup imports took {self.total_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS} ms)",
+        )
+
+    def test_external_sdks_are_imported_lazily(self):
+        """External SDKs are only imported when first used."""
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, self.modules)
+
+
+class ProdStartupTests(SimpleTestCase):
+    """
+    Startup of the prod settings profile, as used by the production web server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.total_ms, cls.modules = measure_startup_imports(**PROD_ENV)
+
+    def test_import_time_within_budget(self):
+        self.assertLess(
+            self.total_ms,
+            IMPORT_TIME_BUDGET_MS,
+            f"Startup imports took {self.total_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS} ms)",
+        )
+
+    def test_no_debug_apps(self):
+        self.assertNotIn("debug_toolbar", self.modules)
+
+    def test_no_network_io(self):
+        """`manage.py check` succeeds with the network unavailable: no DNS lookups or connections at import."""
+        result = subprocess.run(
+            [sys.executable, "-c", CHECK_WITHOUT_NETWORK],
+            cwd=Path(settings.BASE_DIR),
+            env={**os.environ, **PROD_ENV},
+            capture_output=True,
+            text=True,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
@@ -0,0 +1,108 @@
+import time
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.task_metrics import _queue_wait, task_metrics
+from notifications.tasks.expire_payments import expire_pending_payments
+
+
+TASK_NAME = expire_pending_payments.name
+
+
+class TaskMetricsTests(TestCase):
+    """
+    Tests the Celery signal hooks recording per-task metrics.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_records_runtime_and_queries(self):
+        """Each run is counted with its runtime and database queries."""
+        expire_pending_payments.apply()
+        expire_pending_payments.apply()
+
+        metrics = task_metrics()[TASK_NAME]
+        self.assertEqual(metrics["count"], 2)
+        self.assertEqual(metrics["failures"], 0)
+        self.assertEqual(metrics["runtime"]["buckets"]["+Inf"], 2)
+        self.assertGreater(metrics["db_queries"]["total"], 0)
+        self.assertIsNone(metrics["queue_wait"]["avg_seconds"])
+
+    def test_records_queue_wait_from_publish_header(self):
+        """Queue wait is measured from the publish time stamped on the message."""
+        expire_pending_payments.apply(headers={"published_at": time.time() - 2})
+
+        queue_wait = task_metrics()[TASK_NAME]["queue_wait"]
+        self.assertAlmostEqual(queue_wait["avg_seconds"], 2, delta=0.5)
+        self.assertEqual(queue_wait["buckets"]["1"], 0)
+        self.assertEqual(queue_wait["buckets"]["5"], 1)
+
+    def test_queue_wait_starts_at_eta(self):
+        """Tasks scheduled for later only count the time after their ETA."""
+        published_at = time.time() - 60
+        eta = datetime.fromtimestamp(published_at + 50, tz=UTC).isoformat()
+        request = SimpleNamespace(headers={"published_at": published_at}, eta=eta)
+
+        self.assertAlmostEqual(_queue_wait(request, time.time()), 10, delta=0.5)
+
+    @patch("notifications.tasks.expire_payments.update_in_chunks", side_effect=ValueError("boom"))
+    def test_records_retries_and_failures(self, mock_update):
+        """Autoretries are counted, and the final failed run too."""
+        expire_pending_payments.apply()
+
+        metrics = task_metrics()[TASK_NAME]
+        self.assertEqual(metrics["retries"], 3)
+        self.assertEqual(metrics["failures"], 1)
+
+    @override_settings(TASK_SLOW_LOG_THRESHOLD=0, TASK_SLOW_LOG_THRESHOLDS={})
+    def test_slow_tasks_are_logged(self):
+        """Runs over the threshold are written to the slow log."""
+        with self.assertLogs("core.task_metrics.slow", level="WARNING") as logs:
+            expire_pending_payments.apply()
+
+        self.assertIn(TASK_NAME, logs.output[0])
+
+    @override_settings(TASK_SLOW_LOG_THRESHOLD=None, TASK_SLOW_LOG_THRESHOLDS={TASK_NAME: 60})
+    def test_fast_tasks_are_not_logged(self):
+        """Runs under their task's threshold are not logged."""
+        with self.assertNoLogs("core.task_metrics.slow"):
+            expire_pending_payments.apply()
+
+
+class TaskMetricsViewTests(TestCase):
+    """
+    Tests the task metrics endpoint.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("metrics:tasks")
+
+    def test_admin_only(self):
+        """Regular users cannot read the metrics."""
+        user = get_user_model().objects.create_user(email="user@test.com", password="password")
+        self.client.force_authenticate(user=user)
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_returns_metrics_per_task(self):
+        """Admins get the metrics keyed by task name; tasks that never ran are omitted."""
+        expire_pending_payments.apply()
+        admin = get_user_model().objects.create_superuser(email="admin@test.com", password="password")
+        self.client.force_authenticate(user=admin)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), [TASK_NAME])
+        self.assertEqual(response.data[TASK_NAME]["count"], 1)
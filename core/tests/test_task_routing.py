@@ -0,0 +1,151 @@
+import re
+import statistics
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from config.celery_app import app
+from core.tests.utils import benchmark
+
+
+WORKER_QUEUES = re.compile(r"-Q (?P<queues>\S+)")
+
+# Production routes the benchmark's stand-in tasks are sent with
+BULK_ROUTE = "notifications.tasks.overdue_rentals.send_overdue_rental_notifications"
+NOTIFICATION_ROUTE = "notifications.tasks.*"
+
+
+def compose_worker_queues() -> list[list[str]]:
+    """Returns the queues consumed by each Celery worker in docker-compose.yml."""
+    compose = (Path(settings.BASE_DIR) / "docker-compose.yml").read_text()
+    return [match["queues"].split(",") for match in WORKER_QUEUES.finditer(compose)]
+
+
+class TaskRoutingTests(SimpleTestCase):
+    """
+    Tests that tasks are routed to the queues of their workload.
+    """
+
+    def _route(self, name, **options):
+        return app.amqp.router.route(options, name)
+
+    def test_tasks_are_routed_by_workload(self):
+        """Payments, notifications, sweeps and bulk jobs each get their own queue."""
+        routes = {
+            "payment.tasks.create_checkout_sessions": "payments",
+            "payment.tasks.handle_stripe_events": "payments",
+            "notifications.tasks.dispatch.relay_notifications": "notifications",
+            "notifications.tasks.digest.flush_notification_digest": "notifications.telegram",
+            "notifications.tasks.expire_payments.expire_pending_payments": "sweeps",
+            "notifications.tasks.overdue_rentals.mark_rentals_overdue": "sweeps",
+            "notifications.tasks.overdue_rentals.send_overdue_rental_notifications": "bulk",
+        }
+
+        for name, queue in routes.items():
+            with self.subTest(name):
+                self.assertEqual(self._route(name)["queue"].name, queue)
+
+    def test_payments_outrank_sweeps(self):
+        """Lower priority values are consumed first."""
+        payment = self._route("payment.tasks.create_checkout_sessions")["priority"]
+        sweep = self._route("notifications.tasks.expire_payments.expire_pending_payments")["priority"]
+
+        self.assertLess(payment, sweep)
+
+    def test_explicit_queue_wins_over_route(self):
+        """Channel dispatchers keep the queue they are sent to."""
+        route = self._route("notifications.tasks.dispatch.send_notifications", queue="notifications.email")
+
+        self.assertEqual(route["queue"].name, "notifications.email")
+
+    def test_every_queue_has_a_worker(self):
+        """Every routed queue is consumed by a worker in docker-compose.yml."""
+        consumed = {queue for queues in compose_worker_queues() for queue in queues}
+        routed = {route["queue"] for route in settings.CELERY_TASK_ROUTES.values() if "queue" in route}
+        channels = {f"notifications.{name}" for name in settings.NOTIFICATION_CHANNELS}
+
+        self.assertLessEqual(routed | channels | {settings.CELERY_TASK_DEFAULT_QUEUE}, consumed)
+
+    def test_long_tasks_ack_late(self):
+        """Sweeps and bulk jobs are acknowledged after they finish, so a lost worker redelivers them."""
+        for name, route in settings.CELERY_TASK_ROUTES.items():
+            if route.get("queue") in ("sweeps", "bulk"):
+                with self.subTest(name):
+                    self.assertTrue(app.tasks[name].acks_late)
+
+
+@benchmark
+class QueueIsolationBenchmark(SimpleTestCase):
+    """
+    Notification latency while a bulk job runs, with the production routes and the
+    docker-compose worker layout, against one worker consuming every queue.
+
+    Workers run in-process on the in-memory broker with one solo process each. Workers
+    look tasks up in the registry of the first app started in the process, so every run
+    names its tasks afresh.
+    """
+
+    BULK_JOBS = 6
+    BULK_JOB_SECONDS = 0.2
+    NOTIFICATIONS = 5
+
+    def _measure(self, worker_queues: list[list[str]]) -> list[float]:
+        """Starts a bulk job, then sends notifications and returns their queue latency in seconds."""
+        bulk_name, notification_name = (f"benchmark.{uuid.uuid4().hex}.{name}" for name in ("bulk", "notification"))
+        bench = Celery("benchmark", broker="memory://localhost/", set_as_current=False)
+        bench.conf.update(
+            task_routes={
+                bulk_name: settings.CELERY_TASK_ROUTES[BULK_ROUTE],
+                notification_name: settings.CELERY_TASK_ROUTES[NOTIFICATION_ROUTE],
+            },
+            task_ignore_result=True,
+            worker_prefetch_multiplier=1,
+            broker_transport_options={"polling_interval": 0.01},
+            broker_connection_retry_on_startup=True,
+        )
+        latencies = []
+
+        @bench.task(name=bulk_name, acks_late=True)
+        def bulk_job():
+            time.sleep(self.BULK_JOB_SECONDS)
+
+        @bench.task(name=notification_name)
+        def notification(sent_at):
+            latencies.append(time.time() - sent_at)
+
+        with ExitStack() as workers:
+            for queues in worker_queues:
+                workers.enter_context(
+                    start_worker(bench, queues=queues, pool="solo", perform_ping_check=False, loglevel="ERROR")
+                )
+
+            for _ in range(self.BULK_JOBS):
+                bulk_job.delay()
+            time.sleep(self.BULK_JOB_SECONDS / 4)
+
+            for _ in range(self.NOTIFICATIONS):
+                notification.delay(time.time())
+                time.sleep(self.BULK_JOB_SECONDS / 4)
+
+            deadline = time.monotonic() + self.BULK_JOBS * self.BULK_JOB_SECONDS * 2
+            while len(latencies) < self.NOTIFICATIONS and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        return latencies
+
+    def test_notification_latency_is_unaffected_by_bulk_jobs(self):
+        """With dedicated workers notifications never wait for a bulk job; with one shared worker they do."""
+        dedicated = self._measure(compose_worker_queues())
+        shared = self._measure([[queue for queues in compose_worker_queues() for queue in queues]])
+
+        self.assertEqual(len(dedicated), self.NOTIFICATIONS)
+        self.assertLess(max(dedicated), self.BULK_JOB_SECONDS / 2, f"dedicated workers: {dedicated}")
+        self.assertGreater(
+            statistics.median(shared), statistics.median(dedicated), f"shared: {shared}, dedicated: {dedicated}"
+        )
@@ -0,0 +1,149 @@
+import statistics
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status, throttling
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from core.tests.utils import benchmark
+from core.throttling import ScopedRateThrottle, UserRateThrottle, gcra
+
+
+class GCRATests(SimpleTestCase):
+    """
+    Tests the GCRA limiter against the "throttle" cache (Lua script on Redis).
+    """
+
+    def setUp(self):
+        self.cache = caches["throttle"]
+        self.cache.clear()
+
+    def test_allows_burst_up_to_limit(self):
+        """A fresh client may send `limit` requests at once, then has to wait."""
+        results = [gcra(self.cache, "client", 5, 60) for _ in range(6)]
+
+        self.assertEqual([result.allowed for result in results], [True] * 5 + [False])
+        self.assertEqual([result.remaining for result in results], [4, 3, 2, 1, 0, 0])
+        self.assertAlmostEqual(results[-1].retry_after, 12, delta=0.5)
+
+    def test_replenishes_at_sustained_rate(self):
+        """One request becomes available again every period / limit seconds."""
+        for _ in range(10):
+            gcra(self.cache, "client", 10, 1)
+        self.assertFalse(gcra(self.cache, "client", 10, 1).allowed)
+
+        time.sleep(0.15)
+
+        self.assertTrue(gcra(self.cache, "client", 10, 1).allowed)
+        self.assertFalse(gcra(self.cache, "client", 10, 1).allowed)
+
+    def test_denied_requests_are_not_counted(self):
+        """Hammering while limited does not push the next allowed request further away."""
+        for _ in range(2):
+            gcra(self.cache, "client", 2, 60)
+        first = gcra(self.cache, "client", 2, 60)
+        for _ in range(20):
+            gcra(self.cache, "client", 2, 60)
+
+        self.assertAlmostEqual(gcra(self.cache, "client", 2, 60).retry_after, first.retry_after, delta=0.5)
+
+    def test_rate_not_dividing_the_period(self):
+        """Rates like 7/min give a fractional interval; the key TTL is rounded up."""
+        results = [gcra(self.cache, "client", 7, 60) for _ in range(8)]
+
+        self.assertEqual([result.allowed for result in results], [True] * 7 + [False])
+        self.assertAlmostEqual(results[-1].retry_after, 60 / 7, delta=0.5)
+
+    def test_keys_are_independent(self):
+        gcra(self.cache, "a", 1, 60)
+
+        self.assertFalse(gcra(self.cache, "a", 1, 60).allowed)
+        self.assertTrue(gcra(self.cache, "b", 1, 60).allowed)
+
+
+@patch.object(ScopedRateThrottle, "THROTTLE_RATES", {"oauth": "3/min"})
+class ScopedThrottleTests(APITestCase):
+    """
+    Tests per-endpoint scopes and the X-RateLimit-* headers.
+    """
+
+    def setUp(self):
+        caches["throttle"].clear()
+        self.url = reverse("user:google_exchange_code")
+
+    def test_scope_limit_returns_429(self):
+        """The OAuth exchange is limited by its own scope with Retry-After."""
+        responses = [self.client.post(self.url, {}) for _ in range(4)]
+
+        self.assertEqual([response.status_code for response in responses[:3]], [status.HTTP_400_BAD_REQUEST] * 3)
+        self.assertEqual(responses[3].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(responses[3]["Retry-After"]), 20)
+
+    def test_reports_most_restrictive_limit(self):
+        """Headers describe the scope rather than the looser anonymous daily rate."""
+        response = self.client.post(self.url, {})
+
+        self.assertEqual(response["X-RateLimit-Limit"], "3")
+        self.assertEqual(response["X-RateLimit-Remaining"], "2")
+        self.assertEqual(response["X-RateLimit-Reset"], "20")
+
+    def test_views_without_scope_are_not_limited(self):
+        """Only the default anon/user rates apply to unscoped views."""
+        self.client.force_authenticate(get_user_model().objects.create_user(email="user@test.com", password="pass123"))
+        response = self.client.get(reverse("car:car-list"))
+
+        self.assertEqual(response["X-RateLimit-Limit"], "10000")
+
+
+@benchmark
+class ThrottleOverheadBenchmark(SimpleTestCase):
+    """
+    Per-request cost of the GCRA throttle against DRF's timestamp list at the "user"
+    rate of 10000/day, for a client with an empty history and one with 2000 requests.
+    """
+
+    CALLS = 200
+    HISTORY = 2000
+
+    def setUp(self):
+        caches["throttle"].clear()
+        self.request = Request(APIRequestFactory().get("/"))
+        self.request.user = type("User", (), {"pk": 1, "is_authenticated": True})()
+
+    def _per_request(self, throttle_class) -> float:
+        """Median seconds per allow_request call."""
+        timings = []
+        for _ in range(self.CALLS):
+            throttle = throttle_class()
+            started = time.perf_counter()
+            throttle.allow_request(self.request, None)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    def test_cost_is_constant_per_request(self):
+        """GCRA stores one number per client, so a busy client costs no more than an idle one."""
+
+        class DRFUserRateThrottle(throttling.UserRateThrottle):
+            cache = caches["throttle"]
+
+        drf_fresh = self._per_request(DRFUserRateThrottle)
+        caches["throttle"].set("throttle_user_1", [time.time()] * self.HISTORY)
+        drf_loaded = self._per_request(DRFUserRateThrottle)
+        caches["throttle"].clear()
+
+        gcra_fresh = self._per_request(UserRateThrottle)
+        for _ in range(self.HISTORY - self.CALLS):
+            gcra(caches["throttle"], "throttle_user_1", 10000, 86400)
+        gcra_loaded = self._per_request(UserRateThrottle)
+
+        timings = (
+            f"DRF {drf_fresh * 1e6:.0f}us -> {drf_loaded * 1e6:.0f}us, "
+            f"GCRA {gcra_fresh * 1e6:.0f}us -> {gcra_loaded * 1e6:.0f}us"
+        )
+        self.assertLess(gcra_loaded, drf_loaded, timings)
+        self.assertLess(gcra_loaded, gcra_fresh * 3, timings)
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from unittest import skipUnless
+from urllib.parse import parse_qs
+
+
+# Wall-clock benchmarks are too noisy for every test run; opt in with RUN_BENCHMARKS=1
+benchmark = skipUnless(os.getenv("RUN_BENCHMARKS"), "Set RUN_BENCHMARKS=1 to run benchmarks")
+
+
+class FakeRequest(NamedTuple):
+    """A request received by `FakeHTTPServer`."""
+
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+    client_port: int
+    received_at: float
+
+    def json(self):
+        return json.loads(self.body)
+
+    def form(self) -> dict[str, list[str]]:
+        return parse_qs(self.body.decode())
+
+
+class FakeHTTPServer:
+    """
+    Local HTTP server imitating an external API in tests.
+
+    `routes` maps "METHOD /path" (or just "METHOD" for any path) to a callable that takes
+    the `FakeRequest` and returns `(status, payload)` or `(status, payload, headers)`;
+    the payload is sent as JSON, or as an empty body if it is None. Requests are recorded
+    in `requests` and answered after `delay` seconds.
+
+    Used as a context manager, it serves on a free port of 127.0.0.1 at `url`.
+    """
+
+    def __init__(self, routes: dict[str, Callable[[FakeRequest], tuple]], *, delay: float = 0):
+        self.routes = routes
+        self.delay = delay
+        self.requests: list[FakeRequest] = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                request = FakeRequest(
+                    method=self.command,
+                    path=self.path,
+                    headers=dict(self.headers),
+                    body=self.rfile.read(int(self.headers.get("Content-Length") or 0)),
+                    client_port=self.client_address[1],
+                    received_at=time.monotonic(),
+                )
+                with server.lock:
+                    server.requests.append(request)
+                time.sleep(server.delay)
+
+                route = server.routes.get(f"{self.command} {self.path}") or server.routes[self.command]
+                status, payload, *headers = route(request)
+                data = b"" if payload is None else json.dumps(payload).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for header in headers[0] if headers else ():
+                    self.send_header(*header)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128
+
+            def handle_error(self, request, client_address):
+                # Clients hanging up on slow responses are expected
+                pass
+
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def paths(self) -> list[str]:
+        return [request.path for request in self.requests]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
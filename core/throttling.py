@@ -0,0 +1,153 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from redis.commands.core import Script
+from rest_framework import throttling
+
+
+# GCRA (generic cell rate algorithm): a single "theoretical arrival time" per client
+# replaces DRF's list of request timestamps, so each request costs one round trip
+# and one small key whatever the rate. Runs atomically on the Redis clock.
+#
+# KEYS[1]: throttle key; ARGV[1]: ms between requests at the sustained rate;
+# ARGV[2]: burst tolerance in ms (limit * interval, so a fresh client can burst up to the limit).
+# Returns {allowed, remaining, ms until fully replenished, ms until the next allowed request}.
+# Registered once: the script is sent by SHA and loaded into Redis on first use.
+GCRA_SCRIPT = Script(
+    None,
+    b"""
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval
+local allow_at = new_tat - tolerance
+if now < allow_at then
+    return {0, 0, tat - now, allow_at - now}
+end
+
+redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), new_tat - now, 0}
+""",
+)
+
+_local_lock = threading.Lock()
+
+
+@dataclass
+class RateLimit:
+    """Outcome of one throttle check, reported in the X-RateLimit-* headers."""
+
+    limit: int
+    remaining: int
+    reset: float
+    retry_after: float
+
+    @property
+    def allowed(self) -> bool:
+        return self.retry_after == 0
+
+
+def _gcra_local(cache, key: str, interval: float, tolerance: float) -> tuple:
+    """GCRA for non-Redis caches (tests, local development); atomic within one process only."""
+    with _local_lock:
+        now = time.time() * 1000
+        tat = max(cache.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - tolerance
+        if now < allow_at:
+            return 0, 0, tat - now, allow_at - now
+
+        cache.set(key, new_tat, timeout=math.ceil((new_tat - now) / 1000))
+        return 1, math.floor((now - allow_at) / interval), new_tat - now, 0
+
+
+def gcra(cache, key: str, limit: int, period: int) -> RateLimit:
+    """Counts one request against `limit` requests per `period` seconds for `key`."""
+    interval = period * 1000 / limit
+    tolerance = interval * limit
+
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        result = GCRA_SCRIPT(keys=[key], args=[interval, tolerance], client=client)
+    else:
+        result = _gcra_local(cache, key, interval, tolerance)
+
+    _, remaining, reset_ms, retry_ms = result
+    return RateLimit(limit=limit, remaining=int(remaining), reset=reset_ms / 1000, retry_after=retry_ms / 1000)
+
+
+class GCRARateThrottle(throttling.SimpleRateThrottle):
+    """
+    SimpleRateThrottle using GCRA in the shared "throttle" cache instead of a timestamp list.
+
+    The outcome is attached to the request so `core.middleware.RateLimitHeadersMiddleware`
+    can report it in the X-RateLimit-* headers.
+    """
+
+    cache = caches["throttle"]
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.rate_limit = gcra(self.cache, self.key, self.num_requests, self.duration)
+
+        current = getattr(request._request, "rate_limit", None)
+        if current is None or self.rate_limit.remaining <= current.remaining:
+            request._request.rate_limit = self.rate_limit
+
+        return self.rate_limit.allowed
+
+    def wait(self) -> float:
+        return self.rate_limit.retry_after
+
+
+class AnonRateThrottle(GCRARateThrottle, throttling.AnonRateThrottle):
+    """Limits anonymous requests by IP ("anon" rate)."""
+
+
+class UserRateThrottle(GCRARateThrottle, throttling.UserRateThrottle):
+    """Limits requests by user ID, or IP for anonymous users ("user" rate)."""
+
+
+class ScopedRateThrottle(GCRARateThrottle):
+    """
+    Limits expensive endpoints with their own rate, by user ID or IP.
+
+    Views name their scope with `throttle_scope`; viewsets can set it per action with
+    `throttle_scopes = {"create": "booking"}`. Views without a scope are not limited.
+    """
+
+    def __init__(self):
+        # The rate depends on the view, so it is resolved in allow_request
+        pass
+
+    def allow_request(self, request, view) -> bool:
+        scopes = getattr(view, "throttle_scopes", {})
+        self.scope = scopes.get(getattr(view, "action", None)) or getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view) -> str:
+        ident = request.user.pk if request.user and request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import TaskMetricsAPIView
+
+
+urlpatterns = [
+    path("tasks/", TaskMetricsAPIView.as_view(), name="tasks"),
+]
+
+
+app_name = "metrics"
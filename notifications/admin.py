@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for Notification model.
+    Shows the notification outbox with delivery state per channel.
+    """
+
+    list_display = ("event", "channel", "recipient", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status", "channel", "event")
+    search_fields = ("dedupe_key", "recipient")
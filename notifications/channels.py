@@ -0,0 +1,160 @@
+import functools
+import hashlib
+import hmac
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils.html import strip_tags
+
+
+@dataclass
+class NotificationEvent:
+    """
+    A notification rendered once and delivered to every channel.
+
+    `text` is the HTML message built in `notifications.messages`;
+    `recipient` is the email of the affected user, if any;
+    `notification_id` is the outbox row being delivered.
+    """
+
+    event: str
+    text: str
+    recipient: str | None = None
+    data: dict = field(default_factory=dict)
+    notification_id: int | None = None
+
+    @property
+    def plain_text(self) -> str:
+        return strip_tags(self.text)
+
+    @property
+    def subject(self) -> str:
+        return self.plain_text.splitlines()[0].strip()
+
+
+class NotificationChannel:
+    """
+    Base class for notification channels.
+
+    Each channel is delivered by its own Celery task on its own queue, so a slow or
+    failing channel retries independently of the others.
+    """
+
+    name: str
+
+    @property
+    def queue(self) -> str:
+        return f"notifications.{self.name}"
+
+    @property
+    def deferred(self) -> bool:
+        """
+        Whether `send` only queues the event for a later batch. The outbox then leaves
+        the row PROCESSING and the channel marks it SENT or failed once the batch is sent.
+        """
+        return False
+
+    def accepts(self, event: NotificationEvent) -> bool:
+        """Returns whether the channel should deliver the event."""
+        return True
+
+    def send(self, event: NotificationEvent) -> None:
+        """Delivers the event. Raises on failure so the outbox retries it later."""
+        raise NotImplementedError
+
+
+CHANNELS: dict[str, type[NotificationChannel]] = {}
+
+
+def register_channel(channel_class: type[NotificationChannel]) -> type[NotificationChannel]:
+    """Class decorator adding a channel to the registry under its name."""
+    CHANNELS[channel_class.name] = channel_class
+    return channel_class
+
+
+def get_channel(name: str) -> NotificationChannel:
+    return CHANNELS[name]()
+
+
+def get_enabled_channels() -> list[NotificationChannel]:
+    """Returns the channels listed in NOTIFICATION_CHANNELS."""
+    return [get_channel(name) for name in settings.NOTIFICATION_CHANNELS]
+
+
+@register_channel
+class TelegramChannel(NotificationChannel):
+    """
+    Sends every event to the admin Telegram chat as part of the next digest,
+    or right away when digests are disabled.
+    """
+
+    name = "telegram"
+
+    @property
+    def deferred(self) -> bool:
+        return settings.NOTIFICATION_DIGEST_ENABLED
+
+    def send(self, event: NotificationEvent) -> None:
+        # Imported here: notification tasks import this module through the dispatcher
+        from notifications.services.telegram import send_telegram_message
+        from notifications.tasks.digest import buffer_notification
+
+        if self.deferred:
+            buffer_notification(event.notification_id)
+        else:
+            send_telegram_message(event.text)
+
+
+@register_channel
+class EmailChannel(NotificationChannel):
+    """Emails the affected user through the configured EMAIL_BACKEND."""
+
+    name = "email"
+
+    def accepts(self, event: NotificationEvent) -> bool:
+        return bool(event.recipient)
+
+    def send(self, event: NotificationEvent) -> None:
+        send_mail(event.subject, event.plain_text, None, [event.recipient])
+
+
+@functools.cache
+def _get_webhook_client():
+    import httpx
+
+    return httpx.Client(timeout=settings.NOTIFICATION_WEBHOOK_TIMEOUT)
+
+
+@register_channel
+class WebhookChannel(NotificationChannel):
+    """
+    POSTs events as JSON to NOTIFICATION_WEBHOOK_URL.
+
+    With NOTIFICATION_WEBHOOK_SECRET set, the body is signed with HMAC-SHA256
+    in the `X-Signature` header.
+    """
+
+    name = "webhook"
+
+    def accepts(self, event: NotificationEvent) -> bool:
+        return bool(settings.NOTIFICATION_WEBHOOK_URL)
+
+    def send(self, event: NotificationEvent) -> None:
+        body = json.dumps(
+            {
+                "event": event.event,
+                "recipient": event.recipient,
+                "text": event.plain_text,
+                "data": event.data,
+            }
+        ).encode()
+
+        headers = {"Content-Type": "application/json"}
+        if settings.NOTIFICATION_WEBHOOK_SECRET:
+            signature = hmac.new(settings.NOTIFICATION_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Signature"] = f"sha256={signature}"
+
+        response = _get_webhook_client().post(settings.NOTIFICATION_WEBHOOK_URL, content=body, headers=headers)
+        response.raise_for_status()
@@ -79,3 +79,19 @@ def message_returned_rental(rental):
         f"Returned at: {rental.actual_return_date}\n"
         f"Status: {rental.status}"
     )
+
+
+def message_new_rental_batch(rentals):
+    """
+    Build a single notification message for a batch of new rentals.
+    Summarizes the user, period and the list of booked cars.
+    """
+    first = rentals[0]
+    cars = "\n".join(f"• {rental.car}" for rental in rentals)
+    return (
+        "🚗 <b>Batch Rental Created</b>\n"
+        f"User: {first.user.email}\n"
+        f"Period: {first.start_date} → {first.end_date}\n"
+        f"Cars ({len(rentals)}):\n"
+        f"{cars}"
+    )
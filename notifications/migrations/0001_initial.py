@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=20)),
+                ('event', models.CharField(max_length=50)),
+                ('dedupe_key', models.CharField(max_length=255)),
+                ('recipient', models.CharField(blank=True, max_length=254)),
+                ('text', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['channel', 'status', 'available_at'], name='notificatio_channel_287d81_idx'), models.Index(fields=['sent_at'], name='notificatio_sent_at_265656_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dedupe_key', 'channel'), name='unique_notification_per_channel')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Notification(models.Model):
+    """
+    Outbox row for one notification to deliver through one channel.
+
+    Written in the same transaction as the state change that triggers it and
+    delivered by a per-channel Celery dispatcher. The dedupe key identifies the
+    event (e.g. "rental.created:42"), so retried tasks cannot send it twice.
+
+    Fields:
+    - channel: Channel name from the registry (telegram, email, webhook).
+    - event: Event type, e.g. "rental.created".
+    - dedupe_key: Unique key of the event; unique per channel.
+    - recipient: Email of the affected user, if any.
+    - text: The message rendered by `notifications.messages`.
+    - data: Event data (object IDs) sent to webhooks.
+    - status: Delivery state (PENDING, PROCESSING, SENT, FAILED).
+    - attempts: How many times a dispatcher has claimed the row.
+    - error: Last delivery error, if any.
+    - available_at: Earliest time of the next attempt (backoff after failures).
+    - sent_at: When the notification was delivered.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        PROCESSING = "PROCESSING", _("Processing")
+        SENT = "SENT", _("Sent")
+        FAILED = "FAILED", _("Failed")
+
+    channel = models.CharField(max_length=20)
+    event = models.CharField(max_length=50)
+    dedupe_key = models.CharField(max_length=255)
+    recipient = models.CharField(max_length=254, blank=True)
+    text = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["dedupe_key", "channel"], name="unique_notification_per_channel"),
+        ]
+        indexes = [
+            models.Index(fields=["channel", "status", "available_at"]),
+            models.Index(fields=["sent_at"]),
+        ]
+
+    def __str__(self):
+        """Return a human-readable string for the notification."""
+        return f"Notification {self.id} ({self.event} via {self.channel}, {self.status})"
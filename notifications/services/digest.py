@@ -0,0 +1,130 @@
+from django.core.cache import cache
+
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = "\n\n"
+
+SEQUENCE_KEY = "notification-digest:seq"
+CURSOR_KEY = "notification-digest:cursor"
+GAP_KEY = "notification-digest:gap"
+LOCK_KEY = "notification-digest:lock"
+MESSAGE_TTL = 60 * 60 * 24
+
+
+def _message_key(seq: int) -> str:
+    return f"notification-digest:message:{seq}"
+
+
+def append_message(message) -> int:
+    """
+    Appends a message (the ID of a notification) to the digest buffer in the cache (Redis in production).
+
+    Messages are numbered with an atomic counter, so the buffer keeps their order
+    across processes.
+
+    Returns:
+        int: Number of buffered messages that have not been flushed yet.
+    """
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    seq = cache.incr(SEQUENCE_KEY)
+    cache.set(_message_key(seq), message, timeout=MESSAGE_TTL)
+
+    return seq - (cache.get(CURSOR_KEY) or 0)
+
+
+def drain_messages() -> tuple[list, bool]:
+    """
+    Takes all buffered messages in order and removes them from the buffer.
+
+    A missing message either expired or is still being written by a concurrent
+    `append_message`. Draining stops before it once and skips it on the next drain,
+    so in-flight messages are not lost and a lost write does not block the buffer.
+
+    Returns:
+        tuple: The drained messages and whether messages were left in the buffer.
+        Returns no messages if another drain is in progress.
+    """
+    if not cache.add(LOCK_KEY, True, timeout=60):
+        return [], True
+
+    try:
+        first_seq = (cache.get(CURSOR_KEY) or 0) + 1
+        last_seq = cache.get(SEQUENCE_KEY) or 0
+        keys = [_message_key(seq) for seq in range(first_seq, last_seq + 1)]
+        stored = cache.get_many(keys)
+
+        messages = []
+        cursor = first_seq - 1
+        for seq, key in enumerate(keys, start=first_seq):
+            if key not in stored:
+                if cache.get(GAP_KEY) != seq:
+                    cache.set(GAP_KEY, seq, timeout=MESSAGE_TTL)
+                    break
+            else:
+                messages.append(stored[key])
+            cursor = seq
+
+        cache.set(CURSOR_KEY, cursor, timeout=None)
+        cache.delete_many(keys[: cursor - first_seq + 1])
+
+        return messages, cursor < last_seq
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def split_digest(messages: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    """
+    Joins messages into as few texts as possible, each at most `limit` characters.
+
+    Messages are never split unless a single message is longer than the limit.
+    """
+    return [text for text, _ in split_digest_parts(messages, limit)]
+
+
+def split_digest_parts(messages: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[tuple[str, list[int]]]:
+    """
+    Like `split_digest`, but returns each text with the indexes of the messages it contains.
+    A message longer than the limit is contained in several texts.
+    """
+    parts = []
+    current, indexes = "", []
+
+    for index, message in enumerate(messages):
+        for piece in _split_message(message, limit):
+            if current and len(current) + len(DIGEST_SEPARATOR) + len(piece) <= limit:
+                current = f"{current}{DIGEST_SEPARATOR}{piece}"
+                indexes.append(index)
+                continue
+
+            if current:
+                parts.append((current, indexes))
+            current, indexes = piece, [index]
+
+    if current:
+        parts.append((current, indexes))
+
+    return parts
+
+
+def _split_message(message: str, limit: int) -> list[str]:
+    """
+    Splits a message longer than `limit` at line breaks. Messages open and close their
+    HTML tags on one line, so each piece stays valid for `parse_mode=HTML`; only a single
+    line longer than the limit is cut mid-line.
+    """
+    if len(message) <= limit:
+        return [message]
+
+    pieces, current = [], None
+    for line in message.split("\n"):
+        for chunk in [line[i : i + limit] for i in range(0, len(line), limit)] or [""]:
+            if current is not None and len(current) + 1 + len(chunk) <= limit:
+                current = f"{current}\n{chunk}"
+                continue
+
+            if current is not None:
+                pieces.append(current)
+            current = chunk
+
+    pieces.append(current)
+    return pieces
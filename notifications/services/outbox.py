@@ -0,0 +1,131 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from core.outbox import claim_outbox_rows, mark_outbox_row_failed
+from core.replicas import replica_reads
+from notifications.channels import NotificationEvent, get_channel
+from notifications.models import Notification
+
+
+# Failed deliveries wait RETRY_BASE_DELAY * 2^(attempts - 1) before the next attempt.
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+logger = logging.getLogger(__name__)
+
+
+def process_notifications(channel_name: str) -> list[Notification]:
+    """
+    Claims a batch of due notifications for one channel and delivers them.
+
+    Sent rows are marked SENT; failed rows are retried with exponential backoff
+    until NOTIFICATION_OUTBOX_MAX_ATTEMPTS is reached, then become FAILED. Rows of
+    a deferred channel stay PROCESSING until the channel reports its batch result.
+    """
+    claimed = _claim_notifications(channel_name)
+    channel = get_channel(channel_name)
+
+    for notification in claimed:
+        try:
+            channel.send(
+                NotificationEvent(
+                    event=notification.event,
+                    text=notification.text,
+                    recipient=notification.recipient or None,
+                    data=notification.data,
+                    notification_id=notification.id,
+                )
+            )
+        except Exception as exc:
+            logger.exception("Failed to deliver notification %s via %s", notification.id, channel_name)
+            mark_notification_failed(notification, str(exc))
+        else:
+            if not channel.deferred:
+                mark_notification_sent(notification)
+
+    return claimed
+
+
+def _claim_notifications(channel_name: str) -> list[Notification]:
+    """Claims the due rows of a channel whose backoff has expired."""
+    return claim_outbox_rows(
+        Notification.objects.filter(channel=channel_name),
+        batch_size=settings.NOTIFICATION_OUTBOX_BATCH_SIZE,
+        due=Q(available_at__lte=timezone.now()),
+    )
+
+
+def mark_notification_sent(notification: Notification) -> None:
+    notification.status = Notification.Status.SENT
+    notification.sent_at = timezone.now()
+    notification.error = ""
+    notification.save(update_fields=["status", "sent_at", "error"])
+
+
+def mark_notification_failed(notification: Notification, error: str) -> None:
+    """Schedules another attempt with exponential backoff, or marks the row FAILED."""
+    mark_outbox_row_failed(
+        notification,
+        error,
+        max_attempts=settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS,
+        retry_delay=RETRY_BASE_DELAY,
+    )
+
+
+@replica_reads()
+def notification_metrics(window: timedelta = timedelta(hours=1)) -> dict:
+    """
+    Returns backlog and delivery latency metrics per channel, read from a replica if available.
+
+    - backlog: PENDING and PROCESSING rows, and the age in seconds of the oldest one.
+    - failed: rows that exhausted their attempts.
+    - latency: p50/p95/max seconds from creation to delivery for rows sent within `window`.
+    """
+    now = timezone.now()
+    metrics = {}
+
+    backlog = (
+        Notification.objects.filter(status__in=[Notification.Status.PENDING, Notification.Status.PROCESSING])
+        .values("channel")
+        .annotate(count=Count("id"), oldest=Min("created_at"))
+    )
+    for row in backlog:
+        metrics.setdefault(row["channel"], _empty_metrics())["backlog"] = {
+            "count": row["count"],
+            "oldest_age_seconds": round((now - row["oldest"]).total_seconds(), 3),
+        }
+
+    failed = (
+        Notification.objects.filter(status=Notification.Status.FAILED).values("channel").annotate(count=Count("id"))
+    )
+    for row in failed:
+        metrics.setdefault(row["channel"], _empty_metrics())["failed"] = row["count"]
+
+    latencies = {}
+    sent = Notification.objects.filter(sent_at__gte=now - window).values_list("channel", "created_at", "sent_at")
+    for channel, created_at, sent_at in sent:
+        latencies.setdefault(channel, []).append((sent_at - created_at).total_seconds())
+
+    for channel, values in latencies.items():
+        values.sort()
+        metrics.setdefault(channel, _empty_metrics())["latency"] = {
+            "sent": len(values),
+            "p50_seconds": round(_percentile(values, 50), 3),
+            "p95_seconds": round(_percentile(values, 95), 3),
+            "max_seconds": round(values[-1], 3),
+        }
+
+    return metrics
+
+
+def _empty_metrics() -> dict:
+    return {"backlog": {"count": 0, "oldest_age_seconds": 0}, "failed": 0, "latency": None}
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
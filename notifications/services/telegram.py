@@ -1,26 +1,193 @@
+import asyncio
 import logging
+import os
+import threading
+import time
+from collections import defaultdict
 
-import telebot
 from django.conf import settings
 
 
 logger = logging.getLogger(__name__)
 
-bot = telebot.TeleBot(
-    settings.TELEGRAM_BOT_TOKEN,
-    parse_mode="HTML",
-)
+
+class TelegramError(Exception):
+    """Raised when Telegram rejects a message or cannot be reached."""
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: allows `rate` acquisitions per second with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Blocks the bucket for `seconds`, e.g. after a 429 with `retry_after`."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it. Waiters are served in order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramSender:
+    """
+    Async Telegram Bot API client with a pooled HTTP connection and client-side rate limits.
+
+    - A global token bucket and one bucket per chat (without bursts) keep under Telegram's limits.
+    - 429 responses pause the chat's bucket for `retry_after` seconds and the message is retried.
+    - Many messages can be sent concurrently from one event loop.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        base_url: str,
+        global_rate: float,
+        chat_rate: float,
+        max_retries: int = 3,
+        timeout: float = 10.0,
+    ):
+        # Imported lazily to keep httpx out of web and worker startup
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            base_url=f"{base_url.rstrip('/')}/bot{token}/",
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = defaultdict(lambda: TokenBucket(chat_rate, capacity=1))
+
+    async def send_message(self, chat_id: int | str, text: str) -> dict:
+        """
+        Sends a message, waiting for the rate limits and retrying after 429 responses.
+
+        Raises:
+            TelegramError: If Telegram rejects the message, is unreachable,
+            or still rate limits after `max_retries` retries.
+        """
+        import httpx
+
+        chat_bucket = self.chat_buckets[chat_id]
+
+        for _ in range(self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+
+            try:
+                response = await self.client.post(
+                    "sendMessage",
+                    json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"},
+                )
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                raise TelegramError(f"Telegram request failed: {e}") from e
+
+            if response.status_code == 429:
+                retry_after = data.get("parameters", {}).get("retry_after", 1)
+                logger.warning("Telegram rate limit hit for chat %s, retrying after %ss", chat_id, retry_after)
+                chat_bucket.pause(retry_after)
+                continue
+
+            if not data.get("ok"):
+                raise TelegramError(data.get("description", f"HTTP {response.status_code}"))
+
+            return data["result"]
+
+        raise TelegramError(f"Telegram rate limit exceeded for chat {chat_id}")
+
+    async def send_messages(self, chat_id: int | str, texts: list[str]) -> list:
+        """
+        Sends messages concurrently.
+
+        Returns:
+            list: Telegram results, or the TelegramError for each message that failed.
+        """
+        return await asyncio.gather(*(self.send_message(chat_id, text) for text in texts), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_loop = None
+_sender = None
+_pid = None
+_init_lock = threading.Lock()
+
+
+def _get_sender() -> tuple[asyncio.AbstractEventLoop, TelegramSender]:
+    """
+    Returns the process-wide sender and the background event loop it runs on.
+
+    The loop lives in a daemon thread so synchronous Celery tasks reuse one pooled
+    client; both are recreated after a fork (prefork workers).
+    """
+    global _loop, _sender, _pid
+
+    with _init_lock:
+        if _pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="telegram-sender", daemon=True).start()
+            _sender = TelegramSender(
+                settings.TELEGRAM_BOT_TOKEN,
+                base_url=settings.TELEGRAM_API_URL,
+                global_rate=settings.TELEGRAM_GLOBAL_RATE_LIMIT,
+                chat_rate=settings.TELEGRAM_CHAT_RATE_LIMIT,
+            )
+            _pid = os.getpid()
+
+    return _loop, _sender
+
+
+def send_telegram_messages(texts: list[str]) -> list:
+    """
+    Send messages to the configured Telegram admin chat concurrently.
+
+    Returns:
+        list: Telegram results, or the TelegramError for each message that failed
+        (every message if the bot is not configured).
+    """
+    if not settings.TELEGRAM_BOT_TOKEN or not settings.TELEGRAM_ADMIN_CHAT_ID:
+        logger.warning("Telegram is not configured, %s message(s) not sent", len(texts))
+        return [TelegramError("Telegram is not configured") for _ in texts]
+
+    loop, sender = _get_sender()
+    future = asyncio.run_coroutine_threadsafe(sender.send_messages(settings.TELEGRAM_ADMIN_CHAT_ID, texts), loop)
+    return future.result()
 
 
 def send_telegram_message(text: str):
     """
     Send a message to the configured Telegram admin chat.
-    Logs an error if sending fails.
+
+    Raises:
+        TelegramError: If sending fails, so Celery tasks can retry.
     """
-    try:
-        bot.send_message(
-            chat_id=settings.TELEGRAM_ADMIN_CHAT_ID,
-            text=text,
-        )
-    except Exception as e:
-        logger.error("Failed to send Telegram message: %s", e)
+    for result in send_telegram_messages([text]):
+        if isinstance(result, Exception):
+            raise result
@@ -1,6 +1,23 @@
+from .digest import (
+    buffer_notification as buffer_notification,
+    flush_notification_digest as flush_notification_digest,
+)
+from .dispatch import (
+    record_notification as record_notification,
+    relay_notifications as relay_notifications,
+    send_notifications as send_notifications,
+)
+from .events import (
+    record_expired_payment as record_expired_payment,
+    record_new_rental as record_new_rental,
+    record_new_rental_batch as record_new_rental_batch,
+    record_rental_cancelled as record_rental_cancelled,
+    record_rental_returned as record_rental_returned,
+    record_successful_payment as record_successful_payment,
+)
 from .expire_payments import expire_pending_payments as expire_pending_payments
-from .new_rental import notify_new_rental as notify_new_rental
-from .overdue_rentals import notify_overdue_rentals as notify_overdue_rentals
-from .rental_cancelled import notify_rental_cancelled as notify_rental_cancelled
-from .rental_returned import notify_rental_returned as notify_rental_returned
-from .successful_payment import notify_successful_payment as notify_successful_payment
+from .overdue_rentals import (
+    mark_rentals_overdue as mark_rentals_overdue,
+    notify_overdue_rentals as notify_overdue_rentals,
+    schedule_overdue_check as schedule_overdue_check,
+)
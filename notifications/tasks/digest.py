@@ -0,0 +1,73 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from notifications.models import Notification
+from notifications.services.digest import append_message, drain_messages, split_digest_parts
+from notifications.services.outbox import mark_notification_failed, mark_notification_sent
+from notifications.services.telegram import send_telegram_messages
+
+
+WINDOW_KEY = "notification-digest:window"
+FLUSH_NOW_KEY = "notification-digest:flush-now"
+
+logger = logging.getLogger(__name__)
+
+
+def buffer_notification(notification_id: int) -> None:
+    """
+    Queues a claimed Telegram notification for the next digest instead of sending it right away.
+
+    The first message of a window schedules a flush after NOTIFICATION_DIGEST_WINDOW seconds;
+    reaching NOTIFICATION_DIGEST_MAX_EVENTS buffered messages flushes immediately.
+    """
+    pending = append_message(notification_id)
+    window = settings.NOTIFICATION_DIGEST_WINDOW
+
+    if pending >= settings.NOTIFICATION_DIGEST_MAX_EVENTS:
+        if cache.add(FLUSH_NOW_KEY, True, timeout=window):
+            flush_notification_digest.delay()
+    elif cache.add(WINDOW_KEY, True, timeout=window):
+        flush_notification_digest.apply_async(countdown=window)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3})
+def flush_notification_digest(self):
+    """
+    Send buffered notifications as combined Telegram messages of at most 4096 characters.
+    Schedules another flush if messages were left in the buffer.
+
+    A notification is marked SENT once every digest part containing it was sent; otherwise
+    it goes back to the outbox, which retries it with backoff or marks it FAILED.
+    """
+    cache.delete_many([WINDOW_KEY, FLUSH_NOW_KEY])
+    notification_ids, has_more = drain_messages()
+
+    # A row buffered again after its claim timed out may be drained twice, or be sent already
+    pending = Notification.objects.filter(id__in=notification_ids, status=Notification.Status.PROCESSING).in_bulk()
+    notifications = [pending.pop(notification_id) for notification_id in notification_ids if notification_id in pending]
+
+    parts = split_digest_parts([notification.text for notification in notifications])
+    results = send_telegram_messages([text for text, _ in parts]) if parts else []
+
+    errors = {}
+    for (_, indexes), result in zip(parts, results, strict=True):
+        if isinstance(result, Exception):
+            for index in indexes:
+                errors.setdefault(index, str(result))
+
+    for index, notification in enumerate(notifications):
+        if index in errors:
+            mark_notification_failed(notification, errors[index])
+        else:
+            mark_notification_sent(notification)
+
+    if errors:
+        logger.warning("Failed to send %s of %s digest notifications", len(errors), len(notifications))
+
+    if has_more and cache.add(WINDOW_KEY, True, timeout=settings.NOTIFICATION_DIGEST_WINDOW):
+        flush_notification_digest.apply_async(countdown=settings.NOTIFICATION_DIGEST_WINDOW)
+
+    return len(notifications) - len(errors)
@@ -0,0 +1,97 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from kombu.exceptions import OperationalError
+
+from notifications.channels import NotificationEvent, get_channel, get_enabled_channels
+from notifications.models import Notification
+from notifications.services.outbox import process_notifications
+
+
+logger = logging.getLogger(__name__)
+
+
+def _kick_key(channel_name: str) -> str:
+    return f"notification-outbox:kick:{channel_name}"
+
+
+def record_notification(
+    text: str,
+    *,
+    event: str,
+    dedupe_key: str,
+    recipient: str | None = None,
+    data: dict | None = None,
+) -> None:
+    """
+    Writes a rendered notification to the outbox, one row per enabled channel.
+
+    Call it inside the transaction of the triggering state change: the rows commit
+    or roll back with it. Rows whose (dedupe_key, channel) already exist are skipped,
+    so retried tasks cannot send an event twice. Each channel's dispatcher is started
+    once the transaction commits.
+    """
+    notification = NotificationEvent(event=event, text=text, recipient=recipient, data=data or {})
+    channels = [channel for channel in get_enabled_channels() if channel.accepts(notification)]
+
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                channel=channel.name,
+                event=event,
+                dedupe_key=dedupe_key,
+                recipient=recipient or "",
+                text=text,
+                data=notification.data,
+            )
+            for channel in channels
+        ],
+        ignore_conflicts=True,
+    )
+
+    for channel in channels:
+        transaction.on_commit(lambda channel_name=channel.name: _start_dispatcher(channel_name))
+
+
+def _start_dispatcher(channel_name: str) -> None:
+    """
+    Enqueues the channel's dispatcher unless one is already queued.
+    The dispatcher clears the marker before claiming rows, so no committed row is missed.
+    """
+    if not cache.add(_kick_key(channel_name), True, timeout=60):
+        return
+
+    try:
+        send_notifications.apply_async(args=[channel_name], queue=get_channel(channel_name).queue)
+    except OperationalError:
+        cache.delete(_kick_key(channel_name))
+        logger.exception("Failed to start the %s dispatcher; the relay will pick it up", channel_name)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
+def send_notifications(self, channel_name: str):
+    """
+    Deliver due notifications of one channel from the outbox in batches.
+    Runs on the channel's own queue, so a slow channel never delays the others.
+    """
+    cache.delete(_kick_key(channel_name))
+
+    sent = 0
+    while True:
+        claimed = process_notifications(channel_name)
+        sent += len(claimed)
+        if len(claimed) < settings.NOTIFICATION_OUTBOX_BATCH_SIZE:
+            return sent
+
+
+@shared_task(bind=True)
+def relay_notifications(self):
+    """
+    Periodic relay: starts the dispatcher of every enabled channel,
+    picking up retries whose backoff expired and rows whose kick was lost.
+    """
+    for channel in get_enabled_channels():
+        send_notifications.apply_async(args=[channel.name], queue=channel.queue)
@@ -0,0 +1,92 @@
+from notifications.messages import (
+    message_cancelled_rental,
+    message_expired_payment,
+    message_new_rental,
+    message_new_rental_batch,
+    message_returned_rental,
+    message_successful_payment,
+)
+from notifications.tasks.dispatch import record_notification
+from payment.models import Payment
+from rental.models import Rental
+
+
+def record_new_rental(rental: Rental) -> None:
+    """
+    Records the new rental notification in the outbox, within the caller's transaction.
+    """
+    record_notification(
+        message_new_rental(rental),
+        event="rental.created",
+        dedupe_key=f"rental.created:{rental.id}",
+        recipient=rental.user.email,
+        data={"rental_id": rental.id},
+    )
+
+
+def record_new_rental_batch(rentals: list[Rental]) -> None:
+    """
+    Records one aggregated notification for a batch booking in the outbox,
+    within the caller's transaction.
+    """
+    rental_ids = [rental.id for rental in rentals]
+    record_notification(
+        message_new_rental_batch(rentals),
+        event="rental.batch_created",
+        dedupe_key=f"rental.batch_created:{min(rental_ids)}",
+        recipient=rentals[0].user.email,
+        data={"rental_ids": rental_ids},
+    )
+
+
+def record_rental_cancelled(rental: Rental) -> None:
+    """
+    Records the cancellation notification in the outbox, within the caller's transaction.
+    """
+    record_notification(
+        message_cancelled_rental(rental),
+        event="rental.cancelled",
+        dedupe_key=f"rental.cancelled:{rental.id}",
+        recipient=rental.user.email,
+        data={"rental_id": rental.id},
+    )
+
+
+def record_rental_returned(rental: Rental) -> None:
+    """
+    Records the return notification in the outbox, within the caller's transaction.
+    """
+    record_notification(
+        message_returned_rental(rental),
+        event="rental.returned",
+        dedupe_key=f"rental.returned:{rental.id}",
+        recipient=rental.user.email,
+        data={"rental_id": rental.id},
+    )
+
+
+def record_successful_payment(payment: Payment) -> None:
+    """
+    Records the successful payment notification in the outbox, within the caller's transaction.
+    """
+    record_notification(
+        message_successful_payment(payment),
+        event="payment.succeeded",
+        dedupe_key=f"payment.succeeded:{payment.id}",
+        recipient=payment.rental.user.email,
+        data={"payment_id": payment.id},
+    )
+
+
+def record_expired_payment(payment: Payment) -> None:
+    """
+    Records the expired payment notification in the outbox, within the caller's transaction.
+    The webhook and the safety sweep share the dedupe key, so a payment is reported once.
+    """
+    record_notification(
+        message_expired_payment(payment),
+        event="payment.expired",
+        dedupe_key=f"payment.expired:{payment.id}",
+        recipient=payment.rental.user.email,
+        data={"payment_id": payment.id},
+    )
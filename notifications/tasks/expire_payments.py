@@ -1,28 +1,50 @@
 from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 
-from notifications.messages import message_expired_payment
-from notifications.services.telegram import send_telegram_message
+from core.sweeps import update_in_chunks
+from notifications.tasks.events import record_expired_payment
 from payment.models import Payment
 
 
-@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3})
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3}, acks_late=True)
 def expire_pending_payments(self):
     """
-    Expire payments that are pending for more than 24 hours.
-    Sends a Telegram notification for each expired payment.
+    Safety sweep for pending payments whose Stripe session has expired.
+
+    Payments are normally expired as they happen by the `checkout.session.expired`
+    webhook; this sweep only catches missed events. Uses the partial index on
+    expires_at for PENDING payments; rows without expires_at fall back to the 24h rule.
+
+    Rows are expired in chunks with SKIP LOCKED, so several workers can run the sweep
+    at once. Notifications are sent in one batched task per chunk after it commits.
     """
     now = timezone.now()
     expiration_threshold = now - timedelta(hours=24)
 
     pending_payments = Payment.objects.filter(
-        status=Payment.Status.PENDING, created_at__lte=expiration_threshold
-    ).select_related("rental__user", "rental__car")
-
-    for payment in pending_payments:
-        payment.status = Payment.Status.EXPIRED
-        payment.save(update_fields=["status"])
-        telegram_message = message_expired_payment(payment)
-        send_telegram_message(telegram_message)
+        Q(expires_at__lte=now) | Q(expires_at__isnull=True, created_at__lte=expiration_threshold),
+        status=Payment.Status.PENDING,
+    )
+
+    return update_in_chunks(
+        pending_payments,
+        chunk_size=settings.SWEEP_CHUNK_SIZE,
+        on_commit=notify_expired_payments.delay,
+        status=Payment.Status.EXPIRED,
+    )
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3}, acks_late=True)
+def notify_expired_payments(self, payment_ids: list[int]):
+    """
+    Send notifications for a chunk of payments expired by the sweep.
+    Fetches all payments in one query.
+    """
+    payments = Payment.objects.select_related("rental__user", "rental__car").filter(id__in=payment_ids).order_by("id")
+
+    for payment in payments:
+        record_expired_payment(payment)
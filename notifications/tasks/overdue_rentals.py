@@ -1,31 +1,111 @@
+from datetime import date, datetime, time, timedelta
+
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
+from core.sweeps import update_in_chunks
 from notifications.messages import message_overdue_rental
-from notifications.services.telegram import send_telegram_message
+from notifications.tasks.dispatch import record_notification
 from rental.models import Rental
 
 
-@shared_task(
-    bind=True,
-    autoretry_for=(Exception,),
-    retry_kwargs={"max_retries": 3},
-)
+def overdue_check_eta(end_date: date) -> datetime:
+    """
+    Returns the moment a rental ending on `end_date` becomes overdue:
+    the start of the following day in the project time zone.
+    """
+    return timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+
+
+def schedule_overdue_check(end_date: date) -> None:
+    """
+    Schedules the overdue check for all rentals ending on `end_date` (one task per day bucket).
+
+    Only checks due within OVERDUE_ETA_HORIZON are sent to the broker; later ones are
+    scheduled by the daily reconciliation, so no message waits in Redis for days.
+    A cache marker keeps one scheduled task per bucket.
+    """
+    eta = overdue_check_eta(end_date)
+    delay = eta - timezone.now()
+
+    if delay > settings.OVERDUE_ETA_HORIZON:
+        return
+
+    if delay.total_seconds() <= 0:
+        mark_rentals_overdue.delay(end_date.isoformat())
+        return
+
+    if cache.add(f"overdue-check:{end_date.isoformat()}", True, timeout=int(delay.total_seconds()) + 3600):
+        mark_rentals_overdue.apply_async(args=[end_date.isoformat()], eta=eta)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3}, acks_late=True)
+def mark_rentals_overdue(self, end_date: str):
+    """
+    Mark BOOKED, unreturned rentals that ended on `end_date` as OVERDUE.
+
+    Returned and cancelled rentals are not matched, so returns and cancellations
+    need no task revocation; running the task twice is a no-op.
+    """
+    end_date = date.fromisoformat(end_date)
+
+    if end_date >= timezone.localdate():
+        return 0
+
+    return _mark_overdue(Rental.objects.filter(end_date=end_date))
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3}, acks_late=True)
 def notify_overdue_rentals(self):
     """
-    Notify via Telegram about rentals that are overdue.
-    Updates rental status and calculates days late.
+    Daily reconciliation for overdue rentals.
+
+    - Marks any BOOKED rental past its end date that the scheduled checks missed.
+    - Schedules today's overdue check bucket if any active rental ends today.
+
+    Backed by the partial index on end_date for BOOKED, unreturned rentals.
     """
     today = timezone.localdate()
 
-    overdue_rentals = Rental.objects.select_related("user", "car").filter(
-        end_date__lt=today,
-        actual_return_date__isnull=True,
-        status=Rental.Status.BOOKED,
+    updated = _mark_overdue(Rental.objects.filter(end_date__lt=today))
+
+    if Rental.objects.filter(end_date=today, status=Rental.Status.BOOKED, actual_return_date__isnull=True).exists():
+        schedule_overdue_check(today)
+
+    return updated
+
+
+def _mark_overdue(queryset) -> int:
+    """
+    Marks BOOKED, unreturned rentals of the queryset as OVERDUE in chunks with SKIP LOCKED,
+    so several workers can run at once. Notifications are sent in one batched task per chunk after it commits.
+    """
+    return update_in_chunks(
+        queryset.filter(status=Rental.Status.BOOKED, actual_return_date__isnull=True),
+        chunk_size=settings.SWEEP_CHUNK_SIZE,
+        on_commit=send_overdue_rental_notifications.delay,
+        status=Rental.Status.OVERDUE,
     )
 
-    for rental in overdue_rentals:
-        Rental.objects.filter(pk=rental.pk).update(status=Rental.Status.OVERDUE)
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3}, acks_late=True)
+def send_overdue_rental_notifications(self, rental_ids: list[int]):
+    """
+    Send notifications for a chunk of rentals marked OVERDUE.
+    Fetches all rentals in one query and calculates days late.
+    """
+    today = timezone.localdate()
+    rentals = Rental.objects.select_related("user", "car").filter(id__in=rental_ids).order_by("id")
+
+    for rental in rentals:
         days_late = (today - rental.end_date).days
-        telegram_message = message_overdue_rental(rental, days_late)
-        send_telegram_message(telegram_message)
+        message = message_overdue_rental(rental, days_late)
+        record_notification(
+            message,
+            event="rental.overdue",
+            dedupe_key=f"rental.overdue:{rental.id}:{rental.end_date}",
+            recipient=rental.user.email,
+            data={"rental_id": rental.id, "days_late": days_late},
+        )
@@ -0,0 +1,180 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from notifications.models import Notification
+from notifications.services.digest import (
+    TELEGRAM_MESSAGE_LIMIT,
+    _message_key,
+    append_message,
+    drain_messages,
+    split_digest,
+    split_digest_parts,
+)
+from notifications.services.telegram import TelegramError
+from notifications.tasks.digest import buffer_notification, flush_notification_digest
+
+
+class DigestBufferTests(TestCase):
+    """
+    Tests the notification digest buffer.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_drain_returns_messages_in_order_once(self):
+        """Buffered messages are drained in order and removed from the buffer."""
+        for text in ("first", "second", "third"):
+            append_message(text)
+
+        self.assertEqual(drain_messages(), (["first", "second", "third"], False))
+        self.assertEqual(drain_messages(), ([], False))
+
+    def test_append_returns_pending_count(self):
+        """The pending count restarts after a drain."""
+        append_message("first")
+        self.assertEqual(append_message("second"), 2)
+
+        drain_messages()
+
+        self.assertEqual(append_message("third"), 1)
+
+    def test_missing_message_is_waited_for_once_then_skipped(self):
+        """A message still being written stops the drain once; a lost one is skipped next time."""
+        append_message("first")
+        append_message("lost")
+        append_message("third")
+        cache.delete(_message_key(2))
+
+        self.assertEqual(drain_messages(), (["first"], True))
+        self.assertEqual(drain_messages(), (["third"], False))
+
+    def test_split_packs_messages_under_limit(self):
+        """Messages are combined into as few texts as fit the Telegram limit."""
+        messages = ["a" * 2000, "b" * 2000, "c" * 2000]
+
+        chunks = split_digest(messages)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(all(len(chunk) <= TELEGRAM_MESSAGE_LIMIT for chunk in chunks))
+        self.assertEqual(chunks[0], "a" * 2000 + "\n\n" + "b" * 2000)
+
+    def test_split_breaks_oversized_message(self):
+        """A single message longer than the limit is split into pieces."""
+        chunks = split_digest(["x" * (TELEGRAM_MESSAGE_LIMIT + 10)])
+
+        self.assertEqual([len(chunk) for chunk in chunks], [TELEGRAM_MESSAGE_LIMIT, 10])
+
+    def test_split_keeps_lines_of_oversized_message_whole(self):
+        """An oversized message is split at line breaks, so no HTML tag is cut in half."""
+        lines = [f"<b>Rental #{i}</b> Toyota Camry" for i in range(200)]
+
+        chunks = split_digest(["\n".join(lines)])
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= TELEGRAM_MESSAGE_LIMIT for chunk in chunks))
+        self.assertEqual([line for chunk in chunks for line in chunk.split("\n")], lines)
+
+    def test_split_parts_track_their_messages(self):
+        """Each part lists the messages it contains; an oversized message spans several parts."""
+        parts = split_digest_parts(["a", "b" * (TELEGRAM_MESSAGE_LIMIT + 1), "c"])
+
+        self.assertEqual([indexes for _, indexes in parts], [[0], [1], [1, 2]])
+        self.assertEqual(parts[2][0], "b\n\nc")
+
+
+@override_settings(NOTIFICATION_DIGEST_ENABLED=True, NOTIFICATION_DIGEST_WINDOW=5, NOTIFICATION_DIGEST_MAX_EVENTS=3)
+class BufferNotificationTaskTests(TestCase):
+    """
+    Tests scheduling and flushing of notification digests.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def _buffer(self, *texts) -> list[Notification]:
+        """Buffers claimed Telegram outbox rows with the given texts."""
+        notifications = [
+            Notification.objects.create(
+                channel="telegram",
+                event="test",
+                dedupe_key=text,
+                text=text,
+                status=Notification.Status.PROCESSING,
+                attempts=1,
+            )
+            for text in texts
+        ]
+        for notification in notifications:
+            buffer_notification(notification.id)
+        return notifications
+
+    @patch("notifications.tasks.digest.flush_notification_digest.delay")
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_first_message_schedules_one_flush_per_window(self, mock_apply, mock_delay):
+        """Only the first message of a window schedules a delayed flush."""
+        self._buffer("first", "second")
+
+        mock_apply.assert_called_once_with(countdown=5)
+        mock_delay.assert_not_called()
+
+    @patch("notifications.tasks.digest.flush_notification_digest.delay")
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_max_events_flushes_immediately(self, mock_apply, mock_delay):
+        """Reaching the event limit flushes without waiting for the window."""
+        self._buffer(*(f"message {i}" for i in range(4)))
+
+        mock_delay.assert_called_once_with()
+
+    @patch("notifications.tasks.digest.send_telegram_messages", return_value=[{"message_id": 1}])
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_flush_sends_one_combined_message(self, mock_apply, mock_send):
+        """A flush sends all buffered notifications as one Telegram message and marks them SENT."""
+        notifications = self._buffer("first", "second")
+
+        self.assertEqual(flush_notification_digest(), 2)
+
+        mock_send.assert_called_once_with(["first\n\nsecond"])
+        for notification in notifications:
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, Notification.Status.SENT)
+
+    @override_settings(NOTIFICATION_OUTBOX_MAX_ATTEMPTS=3)
+    @patch("notifications.tasks.digest.send_telegram_messages", return_value=[TelegramError("Too Many Requests")])
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_failed_digest_goes_back_to_the_outbox(self, mock_apply, mock_send):
+        """Notifications of a digest part that failed are retried by the outbox, not marked SENT."""
+        [notification] = self._buffer("first")
+
+        self.assertEqual(flush_notification_digest(), 0)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertEqual(notification.error, "Too Many Requests")
+        self.assertEqual(drain_messages(), ([], False))
+
+    @override_settings(TELEGRAM_BOT_TOKEN=None)
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_unconfigured_telegram_does_not_mark_sent(self, mock_apply):
+        """Without a bot, buffered notifications go back to the outbox instead of being marked SENT."""
+        [notification] = self._buffer("first")
+
+        self.assertEqual(flush_notification_digest(), 0)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertEqual(notification.error, "Telegram is not configured")
+
+    @patch("notifications.tasks.digest.send_telegram_messages")
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_rows_no_longer_processing_are_skipped(self, mock_apply, mock_send):
+        """A notification buffered twice, or already sent, is not sent again."""
+        [notification] = self._buffer("first")
+        buffer_notification(notification.id)
+        Notification.objects.filter(id=notification.id).update(status=Notification.Status.SENT)
+
+        self.assertEqual(flush_notification_digest(), 0)
+
+        mock_send.assert_not_called()
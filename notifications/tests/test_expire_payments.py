@@ -6,7 +6,7 @@ from django.test import TestCase
 from django.utils import timezone
 
 from car.models import Car
-from notifications.tasks.expire_payments import expire_pending_payments
+from notifications.tasks.expire_payments import expire_pending_payments, notify_expired_payments
 from payment.models import Payment
 from rental.models import Rental
 
@@ -39,7 +39,7 @@ class ExpirePendingPaymentsTaskTests(TestCase):
             end_date=(self.now + timedelta(days=1)).date(),
         )
 
-    @patch("notifications.tasks.expire_payments.send_telegram_message")
+    @patch("notifications.tasks.events.record_notification")
     def test_expire_pending_payment_changes_status_and_sends_notification(self, mock_send):
         """Pending payments older than 24h are marked as expired and notify via Telegram."""
         old_payment = Payment.objects.create(
@@ -58,7 +58,7 @@ class ExpirePendingPaymentsTaskTests(TestCase):
         old_payment.refresh_from_db()
         self.assertEqual(old_payment.status, Payment.Status.EXPIRED)
 
-    @patch("notifications.tasks.expire_payments.send_telegram_message")
+    @patch("notifications.tasks.events.record_notification")
     def test_paid_payment_is_not_expired(self, mock_send):
         """Payments already marked as PAID remain unchanged and do not send notifications."""
         paid_payment = Payment.objects.create(
@@ -77,7 +77,7 @@ class ExpirePendingPaymentsTaskTests(TestCase):
         self.assertEqual(paid_payment.status, Payment.Status.PAID)
         mock_send.assert_not_called()
 
-    @patch("notifications.tasks.expire_payments.send_telegram_message")
+    @patch("notifications.tasks.events.record_notification")
     def test_recent_pending_payment_is_not_expired(self, mock_send):
         """Pending payments created within 24h are not expired and no notification is sent."""
         recent_payment = Payment.objects.create(
@@ -95,3 +95,27 @@ class ExpirePendingPaymentsTaskTests(TestCase):
         recent_payment.refresh_from_db()
         self.assertEqual(recent_payment.status, Payment.Status.PENDING)
         mock_send.assert_not_called()
+
+    @patch(
+        "notifications.tasks.expire_payments.notify_expired_payments.delay",
+        side_effect=notify_expired_payments,
+    )
+    @patch("notifications.tasks.events.record_notification")
+    def test_pending_payment_past_expires_at_is_expired(self, mock_send, mock_notify):
+        """Pending payments whose session expires_at has passed are expired and notified after commit."""
+        payment = Payment.objects.create(
+            rental=self.rental,
+            status=Payment.Status.PENDING,
+            type=Payment.Type.RENTAL,
+            session_url="http://example.com/session",
+            session_id="sess_101",
+            money_to_pay=100,
+            expires_at=self.now - timedelta(minutes=1),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_pending_payments()
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.Status.EXPIRED)
+        mock_send.assert_called_once()
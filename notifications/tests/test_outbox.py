@@ -0,0 +1,242 @@
+import hashlib
+import hmac
+from datetime import timedelta
+from unittest.mock import patch
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.utils import FakeHTTPServer
+from notifications.channels import NotificationEvent, get_channel
+from notifications.models import Notification
+from notifications.services.outbox import notification_metrics, process_notifications
+from notifications.tasks.digest import flush_notification_digest
+from notifications.tasks.dispatch import record_notification, send_notifications
+
+
+TEXT = "🚗 <b>New Rental Created</b>\nUser: user@test.com"
+
+
+@override_settings(
+    NOTIFICATION_CHANNELS=["telegram", "email", "webhook"],
+    NOTIFICATION_WEBHOOK_URL="http://hooks.test/",
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2,
+)
+class NotificationOutboxTests(TestCase):
+    """
+    Tests the notification outbox: recording, dispatching and metrics.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def _record(self, dedupe_key="rental.created:1", recipient="user@test.com"):
+        record_notification(
+            TEXT, event="rental.created", dedupe_key=dedupe_key, recipient=recipient, data={"rental_id": 1}
+        )
+
+    def test_records_one_row_per_accepting_channel(self):
+        """A notification is written once per channel that accepts it."""
+        self._record()
+        self._record(dedupe_key="rental.created:2", recipient=None)
+
+        rows = Notification.objects.values_list("dedupe_key", "channel")
+        self.assertCountEqual(
+            rows,
+            [
+                ("rental.created:1", "telegram"),
+                ("rental.created:1", "email"),
+                ("rental.created:1", "webhook"),
+                ("rental.created:2", "telegram"),
+                ("rental.created:2", "webhook"),
+            ],
+        )
+
+    def test_dedupe_key_prevents_double_send(self):
+        """Recording the same event twice (e.g. a retried task) keeps one row per channel."""
+        self._record()
+        self._record()
+
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_rows_roll_back_with_the_state_change(self):
+        """Rows are only kept if the surrounding transaction commits."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self._record()
+            raise RuntimeError
+
+        self.assertFalse(Notification.objects.exists())
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_commit_starts_each_channel_dispatcher_once(self, mock_apply):
+        """After commit, each channel's dispatcher is enqueued once on its own queue."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._record()
+            self._record(dedupe_key="rental.created:2")
+
+        self.assertCountEqual(
+            [(call.kwargs["args"], call.kwargs["queue"]) for call in mock_apply.call_args_list],
+            [
+                (["telegram"], "notifications.telegram"),
+                (["email"], "notifications.email"),
+                (["webhook"], "notifications.webhook"),
+            ],
+        )
+
+    @patch("notifications.channels.EmailChannel.send")
+    def test_dispatcher_marks_rows_sent(self, mock_send):
+        """The dispatcher delivers due rows of its channel and records the delivery time."""
+        self._record()
+
+        send_notifications("email")
+
+        notification = Notification.objects.get(channel="email")
+        self.assertEqual(notification.status, Notification.Status.SENT)
+        self.assertIsNotNone(notification.sent_at)
+        self.assertEqual(mock_send.call_args[0][0].recipient, "user@test.com")
+        self.assertEqual(Notification.objects.filter(status=Notification.Status.PENDING).count(), 2)
+
+    @patch("notifications.channels.EmailChannel.send", side_effect=ConnectionError("SMTP down"))
+    def test_failed_delivery_backs_off_then_fails(self, mock_send):
+        """Failures are retried after a backoff and become FAILED after the max attempts."""
+        self._record()
+
+        process_notifications("email")
+        notification = Notification.objects.get(channel="email")
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertGreater(notification.available_at, timezone.now())
+        process_notifications("email")
+        self.assertEqual(mock_send.call_count, 1)
+
+        Notification.objects.filter(id=notification.id).update(available_at=timezone.now())
+        process_notifications("email")
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.FAILED)
+        self.assertEqual(notification.attempts, 2)
+        self.assertEqual(notification.error, "SMTP down")
+
+    @override_settings(NOTIFICATION_DIGEST_ENABLED=True)
+    @patch("notifications.tasks.digest.send_telegram_messages", return_value=[{"message_id": 1}])
+    @patch("notifications.tasks.digest.flush_notification_digest.apply_async")
+    def test_telegram_rows_are_sent_when_the_digest_is(self, mock_flush, mock_send):
+        """Buffering a Telegram row for the digest does not mark it SENT; the flush does."""
+        self._record()
+
+        process_notifications("telegram")
+        notification = Notification.objects.get(channel="telegram")
+        self.assertEqual(notification.status, Notification.Status.PROCESSING)
+
+        flush_notification_digest()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.SENT)
+        mock_send.assert_called_once_with([TEXT])
+
+    def test_metrics_report_backlog_failures_and_latency(self):
+        """Metrics include per-channel backlog, failures and delivery latency."""
+        self._record()
+        now = timezone.now()
+        Notification.objects.filter(channel="telegram").update(
+            status=Notification.Status.SENT, created_at=now - timedelta(seconds=2), sent_at=now
+        )
+        Notification.objects.filter(channel="webhook").update(status=Notification.Status.FAILED)
+
+        metrics = notification_metrics()
+
+        self.assertEqual(metrics["email"]["backlog"]["count"], 1)
+        self.assertEqual(metrics["webhook"]["failed"], 1)
+        self.assertEqual(metrics["telegram"]["latency"]["sent"], 1)
+        self.assertAlmostEqual(metrics["telegram"]["latency"]["p95_seconds"], 2, places=1)
+
+
+class ChannelDeliveryTests(SimpleTestCase):
+    """
+    Tests delivery through each channel using local stand-ins.
+    """
+
+    def setUp(self):
+        self.event = NotificationEvent(
+            event="rental.created", text=TEXT, recipient="user@test.com", data={"rental_id": 1}, notification_id=7
+        )
+
+    @override_settings(NOTIFICATION_DIGEST_ENABLED=True)
+    @patch("notifications.tasks.digest.buffer_notification")
+    def test_telegram_channel_buffers_for_digest(self, mock_buffer):
+        """Telegram delivery goes through the admin digest buffer."""
+        get_channel("telegram").send(self.event)
+
+        mock_buffer.assert_called_once_with(7)
+
+    @override_settings(NOTIFICATION_DIGEST_ENABLED=False)
+    @patch("notifications.services.telegram.send_telegram_message")
+    def test_telegram_channel_without_digest_sends_immediately(self, mock_send):
+        self.assertFalse(get_channel("telegram").deferred)
+
+        get_channel("telegram").send(self.event)
+
+        mock_send.assert_called_once_with(TEXT)
+
+    def test_email_channel_sends_plain_text_to_user(self):
+        """The email is sent to the user with the message as plain text."""
+        get_channel("email").send(self.event)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["user@test.com"])
+        self.assertEqual(mail.outbox[0].subject, "🚗 New Rental Created")
+        self.assertNotIn("<b>", mail.outbox[0].body)
+
+    def test_webhook_channel_posts_signed_json(self):
+        """The webhook receives the event as JSON with an HMAC signature."""
+        with FakeHTTPServer({"POST /hooks/": lambda request: (200, None)}) as server:
+            with override_settings(
+                NOTIFICATION_WEBHOOK_URL=f"{server.url}/hooks/", NOTIFICATION_WEBHOOK_SECRET="secret"
+            ):
+                get_channel("webhook").send(self.event)
+
+        request = server.requests[0]
+        self.assertEqual(request.json()["event"], "rental.created")
+        self.assertEqual(request.json()["data"], {"rental_id": 1})
+        expected = hmac.new(b"secret", request.body, hashlib.sha256).hexdigest()
+        self.assertEqual(request.headers["X-Signature"], f"sha256={expected}")
+
+    def test_failed_webhook_raises(self):
+        """A non-2xx webhook response raises so the outbox retries the delivery."""
+        with FakeHTTPServer({"POST /hooks/": lambda request: (503, None)}) as server:
+            with override_settings(NOTIFICATION_WEBHOOK_URL=f"{server.url}/hooks/"):
+                with self.assertRaises(httpx.HTTPStatusError):
+                    get_channel("webhook").send(self.event)
+
+
+class NotificationMetricsViewTests(TestCase):
+    """
+    Tests the notification metrics endpoint.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("notifications:metrics")
+        self.user = get_user_model().objects.create_user(email="user@test.com", password="password")
+        self.admin = get_user_model().objects.create_superuser(email="admin@test.com", password="password")
+
+    def test_admin_only(self):
+        """Regular users cannot read the metrics."""
+        self.client.force_authenticate(user=self.user)
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_returns_metrics_per_channel(self):
+        """Admins get the metrics keyed by channel."""
+        Notification.objects.create(channel="email", event="rental.created", dedupe_key="rental.created:1", text=TEXT)
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"]["backlog"]["count"], 1)
@@ -1,12 +1,18 @@
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from car.models import Car
-from notifications.tasks.overdue_rentals import notify_overdue_rentals
+from notifications.tasks.overdue_rentals import (
+    mark_rentals_overdue,
+    notify_overdue_rentals,
+    schedule_overdue_check,
+    send_overdue_rental_notifications,
+)
 from rental.models import Rental
 
 
@@ -38,13 +44,18 @@ class NotifyOverdueRentalsTaskTests(TestCase):
             user=self.user, car=self.car, start_date=self.today, end_date=self.today + timedelta(days=1), **kwargs
         )
 
-    @patch("notifications.tasks.overdue_rentals.send_telegram_message")
-    def test_overdue_rental_becomes_overdue_and_sends_notification(self, mock_send):
-        """Rental past end_date without return is marked OVERDUE and sends Telegram notification."""
+    @patch(
+        "notifications.tasks.overdue_rentals.send_overdue_rental_notifications.delay",
+        side_effect=send_overdue_rental_notifications,
+    )
+    @patch("notifications.tasks.overdue_rentals.record_notification")
+    def test_overdue_rental_becomes_overdue_and_sends_notification(self, mock_send, mock_notify):
+        """Rental past end_date without return is marked OVERDUE and sends Telegram notification after commit."""
         rental = self._create_valid_rental(status=Rental.Status.BOOKED)
 
         Rental.objects.filter(pk=rental.pk).update(end_date=self.today - timedelta(days=2))
-        notify_overdue_rentals()
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_overdue_rentals()
         rental.refresh_from_db()
 
         self.assertEqual(rental.status, Rental.Status.OVERDUE)
@@ -88,3 +99,108 @@ class NotifyOverdueRentalsTaskTests(TestCase):
 
         self.assertEqual(rental.status, Rental.Status.BOOKED)
         mock_send.assert_not_called()
+
+    @override_settings(SWEEP_CHUNK_SIZE=2)
+    @patch("notifications.tasks.overdue_rentals.send_overdue_rental_notifications.delay")
+    def test_overdue_rentals_are_processed_in_chunks(self, mock_notify):
+        """All overdue rentals are marked in chunks, with one batched notification per chunk."""
+        rentals = [self._create_valid_rental(status=Rental.Status.BOOKED) for _ in range(5)]
+        Rental.objects.filter(pk__in=[rental.pk for rental in rentals]).update(end_date=self.today - timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = notify_overdue_rentals()
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(Rental.objects.filter(status=Rental.Status.OVERDUE).count(), 5)
+        self.assertEqual(mock_notify.call_count, 3)
+        notified_ids = [rental_id for call in mock_notify.call_args_list for rental_id in call.args[0]]
+        self.assertCountEqual(notified_ids, [rental.pk for rental in rentals])
+
+    @patch("notifications.tasks.overdue_rentals.schedule_overdue_check")
+    def test_reconciliation_schedules_todays_bucket(self, mock_schedule):
+        """The daily run schedules the check for active rentals ending today."""
+        rental = self._create_valid_rental(status=Rental.Status.BOOKED)
+        Rental.objects.filter(pk=rental.pk).update(end_date=self.today)
+
+        notify_overdue_rentals()
+
+        mock_schedule.assert_called_once_with(self.today)
+
+
+class ScheduledOverdueCheckTests(TestCase):
+    """
+    Tests the ETA-scheduled overdue check per end date bucket.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.user = User.objects.create_user(email="test@example.com", password="password123")
+        self.car = Car.objects.create(brand="BMW", model="X5", year=2022, daily_rate=100, inventory=5)
+
+    def _create_rental(self, end_date, **kwargs):
+        """Helper to create a rental ending on the given (possibly past) date."""
+        rental = Rental.objects.create(
+            user=self.user, car=self.car, start_date=self.today, end_date=max(end_date, self.today), **kwargs
+        )
+        Rental.objects.filter(pk=rental.pk).update(end_date=end_date)
+        rental.refresh_from_db()
+        return rental
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    @patch("notifications.tasks.overdue_rentals.mark_rentals_overdue.apply_async")
+    def test_creating_rental_schedules_check_at_end_of_end_date(self, mock_apply, mock_dispatch):
+        """A rental ending today schedules one check at the start of tomorrow."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_rental(self.today)
+            self._create_rental(self.today)
+
+        mock_apply.assert_called_once()
+        expected_eta = timezone.make_aware(datetime.combine(self.today + timedelta(days=1), time.min))
+        self.assertEqual(mock_apply.call_args.kwargs["eta"], expected_eta)
+        self.assertEqual(mock_apply.call_args.kwargs["args"], [self.today.isoformat()])
+
+    @patch("notifications.tasks.overdue_rentals.mark_rentals_overdue.apply_async")
+    def test_checks_beyond_horizon_are_left_to_reconciliation(self, mock_apply):
+        """Rentals ending after the horizon are not sent to the broker yet."""
+        schedule_overdue_check(self.today + timedelta(days=7))
+
+        mock_apply.assert_not_called()
+
+    @patch("notifications.tasks.overdue_rentals.mark_rentals_overdue.apply_async")
+    def test_extending_rental_schedules_new_end_date(self, mock_apply):
+        """Saving a new end date schedules the bucket for that date."""
+        rental = self._create_rental(self.today + timedelta(days=7))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rental.end_date = self.today
+            rental.save()
+
+        mock_apply.assert_called_once()
+        self.assertEqual(mock_apply.call_args.kwargs["args"], [self.today.isoformat()])
+
+    @patch("notifications.tasks.overdue_rentals.send_overdue_rental_notifications.delay")
+    def test_bucket_marks_only_active_rentals_of_its_date(self, mock_notify):
+        """The bucket task skips returned, cancelled and other-date rentals."""
+        yesterday = self.today - timedelta(days=1)
+        active = self._create_rental(yesterday)
+        returned = self._create_rental(yesterday, actual_return_date=yesterday)
+        cancelled = self._create_rental(yesterday, status=Rental.Status.CANCELLED)
+        other_date = self._create_rental(yesterday - timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = mark_rentals_overdue(yesterday.isoformat())
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(Rental.objects.get(pk=active.pk).status, Rental.Status.OVERDUE)
+        for rental in (returned, cancelled, other_date):
+            self.assertNotEqual(Rental.objects.get(pk=rental.pk).status, Rental.Status.OVERDUE)
+        mock_notify.assert_called_once_with([active.pk])
+
+    def test_bucket_running_early_does_nothing(self):
+        """A check delivered before its end date has passed marks nothing."""
+        rental = self._create_rental(self.today)
+
+        self.assertEqual(mark_rentals_overdue(self.today.isoformat()), 0)
+        rental.refresh_from_db()
+        self.assertEqual(rental.status, Rental.Status.BOOKED)
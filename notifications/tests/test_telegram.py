@@ -0,0 +1,135 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core.tests.utils import FakeHTTPServer
+from notifications.services.telegram import TelegramError, TelegramSender, TokenBucket, send_telegram_message
+
+
+class FakeTelegramServer(FakeHTTPServer):
+    """
+    Local HTTP server imitating the Telegram Bot API `sendMessage` method.
+
+    `responses` is a queue of (status, body) pairs answered in order;
+    once it is empty every request succeeds.
+    """
+
+    def __init__(self):
+        super().__init__({"POST": self.send_message})
+        self.responses = []
+
+    def send_message(self, request):
+        if self.responses:
+            return self.responses.pop(0)
+        return 200, {"ok": True, "result": {"message_id": len(self.requests)}}
+
+
+class TelegramSenderTests(SimpleTestCase):
+    """
+    Tests the async Telegram sender against a local fake Bot API server.
+    """
+
+    def _send(self, server, texts, **kwargs):
+        """Sends texts to chat 42 with a fresh sender and closes it afterwards."""
+        options = {"global_rate": 1000, "chat_rate": 1000, **kwargs}
+
+        async def run():
+            sender = TelegramSender("TOKEN", base_url=server.url, **options)
+            try:
+                return await sender.send_messages(42, texts)
+            finally:
+                await sender.aclose()
+
+        return asyncio.run(run())
+
+    def test_sends_messages_to_bot_endpoint(self):
+        """Messages are posted to sendMessage with the chat ID and HTML parse mode."""
+        with FakeTelegramServer() as server:
+            results = self._send(server, ["hello", "world"])
+
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(path == "/botTOKEN/sendMessage" for path in server.paths()))
+        self.assertCountEqual([request.json()["text"] for request in server.requests], ["hello", "world"])
+        self.assertEqual(server.requests[0].json()["chat_id"], 42)
+        self.assertEqual(server.requests[0].json()["parse_mode"], "HTML")
+
+    def test_retries_after_429_with_retry_after(self):
+        """A 429 response pauses the chat for retry_after seconds and the message is resent."""
+        with FakeTelegramServer() as server:
+            server.responses.append(
+                (429, {"ok": False, "description": "Too Many Requests", "parameters": {"retry_after": 1}})
+            )
+            results = self._send(server, ["hello"])
+
+        self.assertEqual(results, [{"message_id": 2}])
+        self.assertGreaterEqual(server.requests[1].received_at - server.requests[0].received_at, 0.9)
+
+    def test_gives_up_after_max_retries(self):
+        """Persistent rate limiting is reported as a TelegramError."""
+        limited = (429, {"ok": False, "parameters": {"retry_after": 0}})
+
+        with FakeTelegramServer() as server:
+            server.responses.extend([limited] * 3)
+            results = self._send(server, ["hello"], max_retries=2)
+
+        self.assertIsInstance(results[0], TelegramError)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_rejected_message_raises(self):
+        """A non-ok response is returned as a TelegramError without retrying."""
+        with FakeTelegramServer() as server:
+            server.responses.append((400, {"ok": False, "description": "Bad Request: chat not found"}))
+            results = self._send(server, ["hello"])
+
+        self.assertIsInstance(results[0], TelegramError)
+        self.assertIn("chat not found", str(results[0]))
+        self.assertEqual(len(server.requests), 1)
+
+    def test_chat_rate_limit_spaces_requests(self):
+        """The per-chat bucket limits how fast messages reach the server."""
+        with FakeTelegramServer() as server:
+            self._send(server, ["a", "b", "c"], chat_rate=10)
+
+        timestamps = sorted(request.received_at for request in server.requests)
+        self.assertGreaterEqual(timestamps[-1] - timestamps[0], 0.15)
+
+
+class SendTelegramMessageTests(SimpleTestCase):
+    """
+    Tests the synchronous wrapper used by Celery tasks.
+    """
+
+    @patch("notifications.services.telegram._pid", None)
+    def test_failure_is_raised_for_celery_retry(self):
+        """Errors are no longer swallowed, so autoretry_for can retry the task."""
+        with FakeTelegramServer() as server:
+            server.responses.append((400, {"ok": False, "description": "Bad Request"}))
+
+            with override_settings(
+                TELEGRAM_BOT_TOKEN="TOKEN", TELEGRAM_ADMIN_CHAT_ID="42", TELEGRAM_API_URL=server.url
+            ):
+                with self.assertRaises(TelegramError):
+                    send_telegram_message("hello")
+                send_telegram_message("hello again")
+
+        self.assertEqual(server.requests[-1].json(), {"chat_id": "42", "text": "hello again", "parse_mode": "HTML"})
+
+
+class TokenBucketTests(SimpleTestCase):
+    """
+    Tests the asyncio token bucket.
+    """
+
+    def test_allows_burst_then_waits(self):
+        """Up to capacity tokens are granted at once; the next one waits for a refill."""
+
+        async def run():
+            bucket = TokenBucket(rate=20, capacity=2)
+            started = time.monotonic()
+            for _ in range(3):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.04)
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import NotificationMetricsAPIView
+
+
+urlpatterns = [
+    path("metrics/", NotificationMetricsAPIView.as_view(), name="metrics"),
+]
+
+
+app_name = "notifications"
@@ -0,0 +1,43 @@
+from drf_spectacular.utils import OpenApiExample, extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from notifications.services.outbox import notification_metrics
+
+
+class NotificationMetricsAPIView(APIView):
+    """
+    Notification outbox metrics endpoint (admins only).
+
+    Reports per-channel backlog, failures and delivery latency.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="Get notification delivery metrics",
+        description=(
+            "Returns per-channel metrics of the notification outbox: pending backlog and the age of "
+            "its oldest row, failed deliveries, and p50/p95/max delivery latency over the last hour."
+        ),
+        responses={
+            200: OpenApiExample(
+                "Metrics",
+                value={
+                    "telegram": {
+                        "backlog": {"count": 3, "oldest_age_seconds": 1.2},
+                        "failed": 0,
+                        "latency": {"sent": 120, "p50_seconds": 0.4, "p95_seconds": 2.1, "max_seconds": 5.3},
+                    }
+                },
+            ),
+            403: None,
+        },
+    )
+    def get(self, request):
+        """
+        Returns the current outbox metrics.
+        """
+        return Response(notification_metrics(), status=status.HTTP_200_OK)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Payment
+from .models import CheckoutRequest, Payment, StripeEvent
 
 
 @admin.register(Payment)
@@ -12,3 +12,26 @@ class PaymentAdmin(admin.ModelAdmin):
 
     list_display = ("rental", "status", "type", "money_to_pay")
     list_filter = ("status", "type")
+
+
+@admin.register(CheckoutRequest)
+class CheckoutRequestAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for CheckoutRequest model.
+    Shows queued Stripe sessions with their processing state and errors.
+    """
+
+    list_display = ("rental", "type", "status", "attempts", "created_at")
+    list_filter = ("status", "type")
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for StripeEvent model.
+    Lists stored webhook events with their processing state.
+    """
+
+    list_display = ("event_id", "type", "status", "attempts", "stripe_created")
+    list_filter = ("status", "type")
+    search_fields = ("event_id",)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from payment.models import StripeEvent
+from payment.tasks import handle_stripe_events
+
+
+class Command(BaseCommand):
+    """
+    Re-queues stored Stripe webhook events for processing.
+
+    By default replays FAILED events. Event handlers are idempotent,
+    so already PROCESSED events can be replayed safely with --status PROCESSED.
+    """
+
+    help = "Replay stored Stripe webhook events (e.g. after an outage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status",
+            choices=StripeEvent.Status.values,
+            default=StripeEvent.Status.FAILED,
+            help="Replay events with this status (default: FAILED).",
+        )
+        parser.add_argument("--since", help="Only events created by Stripe at or after this ISO datetime.")
+        parser.add_argument("--type", dest="event_type", help="Only events of this Stripe type.")
+
+    def handle(self, *args, **options):
+        events = StripeEvent.objects.filter(status=options["status"])
+
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since must be an ISO 8601 datetime")
+            events = events.filter(stripe_created__gte=since)
+
+        if options["event_type"]:
+            events = events.filter(type=options["event_type"])
+
+        count = events.update(status=StripeEvent.Status.PENDING, attempts=0, error="")
+
+        if count:
+            handle_stripe_events.delay()
+
+        self.stdout.write(self.style.SUCCESS(f"Queued {count} Stripe event(s) for replay."))
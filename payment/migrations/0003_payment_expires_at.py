@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:40
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_expires_at(apps, schema_editor):
+    Payment = apps.get_model('payment', 'Payment')
+    Payment.objects.filter(expires_at__isnull=True).update(expires_at=F('created_at') + timedelta(hours=24))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
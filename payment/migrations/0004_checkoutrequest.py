@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_payment_expires_at'),
+        ('rental', '0003_alter_rental_car_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('RENTAL', 'Rental'), ('CANCELLATION_FEE', 'Cancellation Fee'), ('OVERDUE_FEE', 'Overdue Fee')], max_length=20)),
+                ('money_to_pay', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('success_url', models.URLField(max_length=500)),
+                ('cancel_url', models.URLField(max_length=500)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='checkout_requests', to='payment.payment')),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkout_requests', to='rental.rental')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'claimed_at'], name='payment_che_status_41f0f1_idx')],
+            },
+        ),
+    ]
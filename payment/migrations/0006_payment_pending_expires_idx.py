@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_stripeevent'),
+        ('rental', '0003_alter_rental_car_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['expires_at'], name='payment_pending_expires_idx'),
+        ),
+    ]
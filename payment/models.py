@@ -15,6 +15,7 @@ class Payment(models.Model):
     - session_url: Stripe Checkout URL.
     - session_id: Stripe session identifier.
     - money_to_pay: Amount to be paid.
+    - expires_at: When the Stripe Checkout session stops accepting payment.
     - created_at: Timestamp of creation.
     """
 
@@ -44,12 +45,133 @@ class Payment(models.Model):
     session_url = models.URLField(max_length=500)
     session_id = models.CharField(max_length=255)
     money_to_pay = models.DecimalField(max_digits=10, decimal_places=2)
+    expires_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status="PENDING"),
+                name="payment_pending_expires_idx",
+            ),
+        ]
 
     def __str__(self):
         """Return a human-readable string for the payment."""
         return f"Payment {self.id} ({self.status})"
+
+
+class CheckoutRequest(models.Model):
+    """
+    Outbox row describing a Stripe Checkout session that still has to be created.
+
+    Written in the same transaction as the rental state change, then processed
+    by a Celery worker outside of any request transaction.
+
+    Fields:
+    - rental: The rental the payment is for.
+    - type: Payment type to create (RENTAL, CANCELLATION_FEE, OVERDUE_FEE).
+    - money_to_pay: Amount calculated when the request was written.
+    - success_url / cancel_url: Absolute Stripe redirect URLs built from the original request.
+    - status: Processing state (PENDING, PROCESSING, DONE, FAILED).
+    - payment: The Payment created for this request, once DONE.
+    - attempts: How many times a worker has claimed the request.
+    - error: Last error message, if any.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        PROCESSING = "PROCESSING", _("Processing")
+        DONE = "DONE", _("Done")
+        FAILED = "FAILED", _("Failed")
+
+    rental = models.ForeignKey(
+        Rental,
+        on_delete=models.CASCADE,
+        related_name="checkout_requests",
+    )
+    type = models.CharField(max_length=20, choices=Payment.Type.choices)
+    money_to_pay = models.DecimalField(max_digits=10, decimal_places=2)
+
+    success_url = models.URLField(max_length=500)
+    cancel_url = models.URLField(max_length=500)
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="checkout_requests",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "claimed_at"]),
+        ]
+
+    def __str__(self):
+        """Return a human-readable string for the checkout request."""
+        return f"CheckoutRequest {self.id} ({self.type}, {self.status})"
+
+
+class StripeEvent(models.Model):
+    """
+    Raw Stripe webhook event, stored as received and processed asynchronously.
+
+    The unique event_id makes redelivered webhooks no-ops, and stored events
+    can be replayed after outages.
+
+    Fields:
+    - event_id: Stripe event identifier (evt_...).
+    - type: Stripe event type, e.g. checkout.session.completed.
+    - payload: The verified raw event body.
+    - stripe_created: Event creation time reported by Stripe (used for ordering).
+    - status: Processing state (PENDING, PROCESSED, FAILED).
+    - attempts: How many times processing was attempted.
+    - error: Last processing error, if any.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        PROCESSED = "PROCESSED", _("Processed")
+        FAILED = "FAILED", _("Failed")
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    stripe_created = models.DateTimeField()
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["stripe_created", "id"]
+        indexes = [
+            models.Index(fields=["status", "stripe_created"]),
+        ]
+
+    def __str__(self):
+        """Return a human-readable string for the event."""
+        return f"StripeEvent {self.event_id} ({self.type}, {self.status})"
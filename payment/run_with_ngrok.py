@@ -8,7 +8,8 @@ from pyngrok import conf, ngrok
 This script runs the Django development server and exposes it to the internet
 using ngrok. It automatically sets the ngrok auth token if provided in the
 environment variable `NGROK_AUTH`, starts a public ngrok tunnel on port 8000,
-and then runs the Django server on 0.0.0.0:8000.
+and then runs the Django server on 0.0.0.0:8000 (`manage.py serve`, reloading on
+code changes). Production runs `python manage.py serve` directly.
 """
 
 if __name__ == "__main__":
@@ -19,4 +20,4 @@ if __name__ == "__main__":
     public_url = ngrok.connect(8000)
     print("Ngrok public URL:", public_url)
 
-    subprocess.call(["gunicorn", "config.wsgi:application", "--bind", "0.0.0.0:8000", "--workers", "4", "--reload"])
+    subprocess.call(["python", "manage.py", "serve", "--bind", "0.0.0.0:8000", "--reload"])
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from payment.models import Payment
+from payment.models import CheckoutRequest, Payment
 from rental.serializers import RentalDetailSerializer
 
 
@@ -22,6 +22,7 @@ class PaymentListSerializer(serializers.ModelSerializer):
             "status",
             "money_to_pay",
             "session_url",
+            "expires_at",
             "created_at",
             "rental",
         ]
@@ -47,6 +48,32 @@ class PaymentDetailSerializer(serializers.ModelSerializer):
             "money_to_pay",
             "session_url",
             "session_id",
+            "expires_at",
             "created_at",
             "rental",
         ]
+
+
+class CheckoutRequestSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the CheckoutRequest model (payment outbox status).
+
+    Exposes processing status and, once the Stripe session exists,
+    the resulting payment ID and session URL.
+    """
+
+    session_url = serializers.CharField(source="payment.session_url", read_only=True, default=None)
+
+    class Meta:
+        model = CheckoutRequest
+        fields = [
+            "id",
+            "rental",
+            "type",
+            "status",
+            "money_to_pay",
+            "payment",
+            "session_url",
+            "error",
+            "created_at",
+        ]
@@ -1,16 +1,33 @@
+import asyncio
+import functools
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 
-import stripe
 from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
+from django.utils import timezone
 
-from payment.models import Payment
+from core.aio import per_event_loop
+from core.outbox import claim_outbox_rows, mark_outbox_row_failed
+from notifications.tasks import record_expired_payment, record_successful_payment
+from payment.models import CheckoutRequest, Payment, StripeEvent
 from rental.models import Rental
 
 
 FINE_MULTIPLIER = Decimal("1.5")
 
+# Checkout sessions are created with an explicit expiry (Stripe allows 30 minutes to 24 hours).
+SESSION_LIFETIME = timedelta(hours=24)
+# A pending session is only reused if it stays valid at least this long.
+SESSION_REUSE_MIN_REMAINING = timedelta(minutes=10)
+
+OUTBOX_POLL_INTERVAL = 0.1
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +35,34 @@ class PaymentServiceError(Exception):
     """Custom exception for Stripe payment service errors."""
 
 
+@functools.cache
+def get_stripe():
+    """
+    Imports and configures the Stripe SDK on first use.
+
+    The SDK is large, so processes that never call Stripe (most Celery tasks,
+    management commands) do not pay for importing it at startup.
+    """
+    import stripe
+
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.api_base = settings.STRIPE_API_BASE
+    return stripe
+
+
+@per_event_loop
+def get_async_stripe_client():
+    """
+    Returns a Stripe client for async views, with pooled connections of the running event loop.
+    """
+    stripe = get_stripe()
+    return stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        base_addresses={"api": settings.STRIPE_API_BASE},
+        http_client=stripe.HTTPXClient(),
+    )
+
+
 def create_stripe_payment_for_rental(
     *,
     rental: Rental,
@@ -26,31 +71,254 @@ def create_stripe_payment_for_rental(
 ) -> Payment:
     """
     Creates a Stripe Checkout Session and a corresponding local Payment record.
+
+    If the rental already has a PENDING payment of the same type and amount whose
+    session is still valid, that payment is returned instead of creating a new session.
     """
-    stripe.api_key = settings.STRIPE_SECRET_KEY
+    amount = _calculate_amount(rental=rental, payment_type=payment_type)
+
+    reusable_payment = _get_reusable_pending_payment(rental=rental, payment_type=payment_type, amount=amount)
+    if reusable_payment:
+        return reusable_payment
 
+    success_url, cancel_url = _build_redirect_urls(request)
+    expires_at = timezone.now() + SESSION_LIFETIME
+
+    session = _create_checkout_session(
+        rental_id=rental.id,
+        payment_type=payment_type,
+        amount=amount,
+        success_url=success_url,
+        cancel_url=cancel_url,
+        expires_at=expires_at,
+    )
+
+    payment = Payment.objects.create(
+        rental=rental,
+        type=payment_type,
+        session_id=session.id,
+        session_url=session.url,
+        money_to_pay=amount,
+        expires_at=expires_at,
+    )
+
+    return payment
+
+
+async def acreate_stripe_payment_for_rental(
+    *,
+    rental: Rental,
+    payment_type: Payment.Type,
+    request,
+) -> Payment:
+    """
+    Async variant of `create_stripe_payment_for_rental` for async views.
+    The rental must be fetched with its car (`select_related("car")`).
+    """
     amount = _calculate_amount(rental=rental, payment_type=payment_type)
 
+    reusable_payment = await _reusable_pending_payments(
+        rental=rental, payment_type=payment_type, amount=amount
+    ).afirst()
+    if reusable_payment:
+        return reusable_payment
+
+    success_url, cancel_url = _build_redirect_urls(request)
+    expires_at = timezone.now() + SESSION_LIFETIME
+
+    session = await _acreate_checkout_session(
+        rental_id=rental.id,
+        payment_type=payment_type,
+        amount=amount,
+        success_url=success_url,
+        cancel_url=cancel_url,
+        expires_at=expires_at,
+    )
+
+    return await Payment.objects.acreate(
+        rental=rental,
+        type=payment_type,
+        session_id=session.id,
+        session_url=session.url,
+        money_to_pay=amount,
+        expires_at=expires_at,
+    )
+
+
+def enqueue_checkout_request(
+    *,
+    rental: Rental,
+    payment_type: Payment.Type,
+    request,
+) -> CheckoutRequest:
+    """
+    Writes an outbox row for a Stripe Checkout session to be created by a worker.
+
+    Meant to be called inside the transaction that changes the rental state,
+    so the payment request is committed atomically with it.
+    """
+    success_url, cancel_url = _build_redirect_urls(request)
+
+    return CheckoutRequest.objects.create(
+        rental=rental,
+        type=payment_type,
+        money_to_pay=_calculate_amount(rental=rental, payment_type=payment_type),
+        success_url=success_url,
+        cancel_url=cancel_url,
+    )
+
+
+def process_checkout_requests(request_ids: list[int] | None = None) -> list[CheckoutRequest]:
+    """
+    Claims pending outbox rows and creates their Stripe Checkout sessions.
+
+    Sessions for the claimed rows are created concurrently, outside of any DB transaction.
+    Failed rows go back to PENDING until PAYMENT_OUTBOX_MAX_ATTEMPTS is reached, then become FAILED.
+    """
+    claimed = _claim_checkout_requests(request_ids)
+    if not claimed:
+        return []
+
+    to_create = []
+    for checkout_request in claimed:
+        reusable_payment = _get_reusable_pending_payment(
+            rental=checkout_request.rental,
+            payment_type=checkout_request.type,
+            amount=checkout_request.money_to_pay,
+        )
+        if reusable_payment:
+            _mark_checkout_request_done(checkout_request, reusable_payment)
+        else:
+            to_create.append(checkout_request)
+
+    if to_create:
+        expires_at = timezone.now() + SESSION_LIFETIME
+
+        with ThreadPoolExecutor(max_workers=len(to_create)) as executor:
+            futures = {
+                checkout_request: executor.submit(
+                    _create_checkout_session,
+                    rental_id=checkout_request.rental_id,
+                    payment_type=checkout_request.type,
+                    amount=checkout_request.money_to_pay,
+                    success_url=checkout_request.success_url,
+                    cancel_url=checkout_request.cancel_url,
+                    expires_at=expires_at,
+                )
+                for checkout_request in to_create
+            }
+
+        for checkout_request, future in futures.items():
+            try:
+                session = future.result()
+            except PaymentServiceError as exc:
+                _mark_checkout_request_failed(checkout_request, str(exc))
+                continue
+
+            # Together, so a crash in between cannot leave a payment whose row is retried into a second session
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    rental=checkout_request.rental,
+                    type=checkout_request.type,
+                    session_id=session.id,
+                    session_url=session.url,
+                    money_to_pay=checkout_request.money_to_pay,
+                    expires_at=expires_at,
+                )
+                _mark_checkout_request_done(checkout_request, payment)
+
+    return claimed
+
+
+async def await_checkout_requests(request_ids: list[int], timeout: float) -> list[CheckoutRequest]:
+    """
+    Polls outbox rows until all of them are DONE or FAILED, or the timeout elapses.
+    Returns the latest state of the rows.
+    """
+    deadline = time.monotonic() + timeout
+    finished = (CheckoutRequest.Status.DONE, CheckoutRequest.Status.FAILED)
+
+    while True:
+        checkout_requests = [
+            checkout_request
+            async for checkout_request in CheckoutRequest.objects.select_related("payment")
+            .filter(id__in=request_ids)
+            .order_by("id")
+        ]
+        if all(checkout_request.status in finished for checkout_request in checkout_requests):
+            return checkout_requests
+        if time.monotonic() >= deadline:
+            return checkout_requests
+        await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+
+
+def _claim_checkout_requests(request_ids: list[int] | None) -> list[CheckoutRequest]:
+    """Claims pending outbox rows, only those in `request_ids` if given."""
+    queryset = CheckoutRequest.objects.select_related("rental__car")
+    if request_ids is not None:
+        queryset = queryset.filter(id__in=request_ids)
+
+    return claim_outbox_rows(queryset, batch_size=settings.PAYMENT_OUTBOX_BATCH_SIZE)
+
+
+def _mark_checkout_request_done(checkout_request: CheckoutRequest, payment: Payment) -> None:
+    """Links the created payment to the outbox row and marks it DONE."""
+    checkout_request.payment = payment
+    checkout_request.status = CheckoutRequest.Status.DONE
+    checkout_request.error = ""
+    checkout_request.save(update_fields=["payment", "status", "error"])
+
+
+def _mark_checkout_request_failed(checkout_request: CheckoutRequest, error: str) -> None:
+    """Returns the outbox row to PENDING for another attempt, or marks it FAILED."""
+    mark_outbox_row_failed(checkout_request, error, max_attempts=settings.PAYMENT_OUTBOX_MAX_ATTEMPTS)
+
+
+def _build_redirect_urls(request) -> tuple[str, str]:
+    """
+    Builds absolute Stripe success and cancel URLs for the current request.
+    """
     success_url = request.build_absolute_uri(reverse("payment:success")) + "?session_id={CHECKOUT_SESSION_ID}"
     cancel_url = request.build_absolute_uri(reverse("payment:cancel"))
+    return success_url, cancel_url
+
+
+def _checkout_session_params(
+    *,
+    rental_id: int,
+    payment_type: Payment.Type,
+    amount: Decimal,
+    success_url: str,
+    cancel_url: str,
+    expires_at: datetime,
+) -> dict:
+    """Returns the Stripe parameters of a Checkout Session that expires at `expires_at`."""
+    return {
+        "mode": "payment",
+        "payment_method_types": ["card"],
+        "line_items": [
+            {
+                "price_data": {
+                    "currency": "usd",
+                    "product_data": {"name": f"Rental #{rental_id} — {payment_type}"},
+                    "unit_amount": int(amount * 100),
+                },
+                "quantity": 1,
+            }
+        ],
+        "success_url": success_url,
+        "cancel_url": cancel_url,
+        "expires_at": int(expires_at.timestamp()),
+    }
+
+
+@contextmanager
+def _stripe_errors():
+    """Turns Stripe SDK errors raised in the block into PaymentServiceError."""
+    stripe = get_stripe()
 
     try:
-        session = stripe.checkout.Session.create(
-            mode="payment",
-            payment_method_types=["card"],
-            line_items=[
-                {
-                    "price_data": {
-                        "currency": "usd",
-                        "product_data": {"name": f"Rental #{rental.id} — {payment_type}"},
-                        "unit_amount": int(amount * 100),
-                    },
-                    "quantity": 1,
-                }
-            ],
-            success_url=success_url,
-            cancel_url=cancel_url,
-        )
+        yield
     except stripe.error.RateLimitError as exc:
         raise PaymentServiceError("Stripe API rate limit exceeded") from exc
     except stripe.error.APIConnectionError as exc:
@@ -63,15 +331,47 @@ def create_stripe_payment_for_rental(
         logger.exception("Unexpected error during Stripe payment")
         raise PaymentServiceError("Unexpected error occurred") from exc
 
-    payment = Payment.objects.create(
+
+def _create_checkout_session(**params):
+    """
+    Calls Stripe to create a Checkout Session (see `_checkout_session_params`).
+    Does not touch the database, so it is safe to run in worker threads.
+
+    Raises:
+        PaymentServiceError: If Stripe returns an error or cannot be reached.
+    """
+    with _stripe_errors():
+        return get_stripe().checkout.Session.create(**_checkout_session_params(**params))
+
+
+async def _acreate_checkout_session(**params):
+    """
+    Async variant of `_create_checkout_session`.
+
+    Raises:
+        PaymentServiceError: If Stripe returns an error or cannot be reached.
+    """
+    with _stripe_errors():
+        return await get_async_stripe_client().v1.checkout.sessions.create_async(_checkout_session_params(**params))
+
+
+def _get_reusable_pending_payment(*, rental: Rental, payment_type: Payment.Type, amount: Decimal) -> Payment | None:
+    """
+    Returns the latest PENDING payment of the same type and amount whose
+    Stripe session is still valid, using the locally stored expiry time.
+    """
+    return _reusable_pending_payments(rental=rental, payment_type=payment_type, amount=amount).first()
+
+
+def _reusable_pending_payments(*, rental: Rental, payment_type: Payment.Type, amount: Decimal):
+    """Pending payments of the same type and amount with a valid session, latest first."""
+    return Payment.objects.filter(
         rental=rental,
         type=payment_type,
-        session_id=session.id,
-        session_url=session.url,
+        status=Payment.Status.PENDING,
         money_to_pay=amount,
-    )
-
-    return payment
+        expires_at__gt=timezone.now() + SESSION_REUSE_MIN_REMAINING,
+    ).order_by("-created_at")
 
 
 def _calculate_amount(*, rental: Rental, payment_type: Payment.Type) -> Decimal:
@@ -100,8 +400,12 @@ def _calculate_amount(*, rental: Rental, payment_type: Payment.Type) -> Decimal:
 def complete_rental_if_all_payments_paid(payment: Payment) -> None:
     """
     Checks if all payments for a rental are settled and updates rental status.
+
+    The rental row is locked first: when two payments of a rental are paid at the same
+    time, the second waits for the first to commit and then sees it PAID, so one of
+    them always completes the rental.
     """
-    rental = payment.rental
+    rental = Rental.objects.select_for_update().get(pk=payment.rental_id)
 
     if payment.type == Payment.Type.CANCELLATION_FEE:
         rental.status = Rental.Status.CANCELLED
@@ -118,3 +422,107 @@ def complete_rental_if_all_payments_paid(payment: Payment) -> None:
     if not has_pending_payments:
         rental.status = Rental.Status.COMPLETED
         rental.save(update_fields=["status"])
+
+
+def store_stripe_event(*, event, payload: dict) -> tuple[StripeEvent, bool]:
+    """
+    Persists a verified Stripe event for asynchronous processing.
+
+    Returns the stored event and whether it was newly created;
+    redelivered events (same event ID) are not stored twice.
+    """
+    return StripeEvent.objects.get_or_create(event_id=event["id"], defaults=_stripe_event_fields(event, payload))
+
+
+async def astore_stripe_event(*, event, payload: dict) -> tuple[StripeEvent, bool]:
+    """Async variant of `store_stripe_event`."""
+    return await StripeEvent.objects.aget_or_create(event_id=event["id"], defaults=_stripe_event_fields(event, payload))
+
+
+def _stripe_event_fields(event, payload: dict) -> dict:
+    return {
+        "type": event["type"],
+        "payload": payload,
+        "stripe_created": datetime.fromtimestamp(event["created"], tz=UTC),
+    }
+
+
+def process_stripe_events(event_ids: list[int] | None = None) -> list[StripeEvent]:
+    """
+    Processes a batch of pending Stripe events in Stripe creation order.
+
+    The claimed rows stay locked (SKIP LOCKED for other workers) until the batch commits,
+    so an event is never handled twice concurrently. Each event runs in its own savepoint:
+    a failing event is retried on a later run and becomes FAILED after STRIPE_EVENTS_MAX_ATTEMPTS.
+    """
+    with transaction.atomic():
+        queryset = (
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=StripeEvent.Status.PENDING)
+            .order_by("stripe_created", "id")
+        )
+        if event_ids is not None:
+            queryset = queryset.filter(id__in=event_ids)
+
+        events = list(queryset[: settings.STRIPE_EVENTS_BATCH_SIZE])
+
+        for stripe_event in events:
+            stripe_event.attempts += 1
+
+            try:
+                with transaction.atomic():
+                    handle_stripe_event(stripe_event)
+            except Exception as exc:
+                logger.exception("Failed to process Stripe event %s", stripe_event.event_id)
+                stripe_event.error = str(exc)
+                if stripe_event.attempts >= settings.STRIPE_EVENTS_MAX_ATTEMPTS:
+                    stripe_event.status = StripeEvent.Status.FAILED
+            else:
+                stripe_event.status = StripeEvent.Status.PROCESSED
+                stripe_event.processed_at = timezone.now()
+                stripe_event.error = ""
+
+            stripe_event.save(update_fields=["status", "attempts", "error", "processed_at"])
+
+    return events
+
+
+def handle_stripe_event(stripe_event: StripeEvent) -> None:
+    """
+    Applies a stored Stripe event to local payments. Unknown event types are ignored.
+    """
+    if stripe_event.type == "checkout.session.completed":
+        _handle_checkout_session_completed(stripe_event.payload["data"]["object"])
+    elif stripe_event.type in ("checkout.session.expired", "checkout.session.async_payment_failed"):
+        _handle_checkout_session_expired(stripe_event.payload["data"]["object"])
+
+
+def _handle_checkout_session_completed(session: dict) -> None:
+    """
+    Marks the payment for the completed session as PAID, notifies admins
+    and completes the rental if all its payments are settled.
+    """
+    payment = Payment.objects.select_for_update().filter(session_id=session["id"]).first()
+
+    if payment and payment.status != Payment.Status.PAID:
+        payment.status = Payment.Status.PAID
+        payment.save(update_fields=["status"])
+
+        record_successful_payment(payment)
+        complete_rental_if_all_payments_paid(payment)
+
+
+def _handle_checkout_session_expired(session: dict) -> None:
+    """
+    Marks the PENDING payment for an expired (or failed async) session as EXPIRED
+    and notifies admins. Payments that are already PAID or EXPIRED are left unchanged.
+    """
+    payment = (
+        Payment.objects.select_for_update().filter(session_id=session["id"], status=Payment.Status.PENDING).first()
+    )
+
+    if payment:
+        payment.status = Payment.Status.EXPIRED
+        payment.save(update_fields=["status"])
+
+        record_expired_payment(payment)
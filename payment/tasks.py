@@ -0,0 +1,21 @@
+from celery import shared_task
+
+from payment.services import process_checkout_requests, process_stripe_events
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
+def create_checkout_sessions(self, request_ids: list[int] | None = None):
+    """
+    Create Stripe Checkout sessions for outbox rows written by the API.
+    Without IDs, acts as a relay that picks up any pending or stale rows.
+    """
+    process_checkout_requests(request_ids)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
+def handle_stripe_events(self, event_ids: list[int] | None = None):
+    """
+    Process stored Stripe webhook events in batches.
+    Without IDs, acts as a relay that picks up any pending events (e.g. after an outage or replay).
+    """
+    process_stripe_events(event_ids)
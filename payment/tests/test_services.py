@@ -1,17 +1,32 @@
+import threading
+import time
 from datetime import date, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import patch
 
 import stripe
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 
 from car.models import Car
+from notifications.models import Notification
 from payment import services
-from payment.models import Payment
+from payment.models import CheckoutRequest, Payment, StripeEvent
 from rental.models import Rental
+from rental.views import RentalViewSet
 from user.models import User
 
 
+# Request the Stripe redirect URLs are built from
+REQUEST = RequestFactory().get("/")
+
+
 class PaymentServicesTests(TestCase):
     """Tests for business logic in payment.services module."""
 
@@ -47,18 +62,14 @@ class PaymentServicesTests(TestCase):
         with self.assertRaises(ValueError):
             services._calculate_amount(rental=self.rental, payment_type="INVALID")
 
-    @patch("payment.services.stripe.checkout.Session.create")
+    @patch("stripe.checkout.Session.create")
     def test_create_stripe_payment_for_rental(self, mock_session):
         """Tests creation of Stripe session and Payment record."""
         mock_session.return_value.id = "sess_123"
         mock_session.return_value.url = "http://stripe.test"
 
-        class DummyRequest:
-            def build_absolute_uri(self, path):
-                return f"http://testserver{path}"
-
         payment = services.create_stripe_payment_for_rental(
-            rental=self.rental, payment_type=Payment.Type.RENTAL, request=DummyRequest()
+            rental=self.rental, payment_type=Payment.Type.RENTAL, request=REQUEST
         )
 
         self.assertEqual(payment.rental, self.rental)
@@ -67,23 +78,71 @@ class PaymentServicesTests(TestCase):
         self.assertEqual(payment.session_url, "http://stripe.test")
         self.assertEqual(payment.money_to_pay, Decimal("300.00"))
         mock_session.assert_called_once()
+        self.assertEqual(mock_session.call_args.kwargs["expires_at"], int(payment.expires_at.timestamp()))
 
-    @patch("payment.services.stripe.checkout.Session.create")
+    @patch("stripe.checkout.Session.create")
     def test_create_stripe_payment_raises_payment_service_error(self, mock_session):
         """Tests that Stripe errors are converted into PaymentServiceError."""
         mock_session.side_effect = stripe.error.APIConnectionError("Connection failed")
 
-        class DummyRequest:
-            def build_absolute_uri(self, path):
-                return f"http://testserver{path}"
-
         with self.assertRaises(services.PaymentServiceError) as cm:
             services.create_stripe_payment_for_rental(
-                rental=self.rental, payment_type=Payment.Type.RENTAL, request=DummyRequest()
+                rental=self.rental, payment_type=Payment.Type.RENTAL, request=REQUEST
             )
 
         self.assertIn("Stripe API connection failed", str(cm.exception))
 
+    @patch("stripe.checkout.Session.create")
+    def test_create_stripe_payment_reuses_valid_pending_session(self, mock_session):
+        """Tests that a still-valid pending session of the same type and amount is reused."""
+        existing = Payment.objects.create(
+            rental=self.rental,
+            type=Payment.Type.RENTAL,
+            session_id="sess_existing",
+            session_url="http://stripe.test/existing",
+            money_to_pay=Decimal("300.00"),
+            expires_at=timezone.now() + timedelta(hours=12),
+        )
+
+        payment = services.create_stripe_payment_for_rental(
+            rental=self.rental, payment_type=Payment.Type.RENTAL, request=REQUEST
+        )
+
+        self.assertEqual(payment, existing)
+        self.assertEqual(Payment.objects.count(), 1)
+        mock_session.assert_not_called()
+
+    @patch("stripe.checkout.Session.create")
+    def test_create_stripe_payment_skips_unusable_pending_sessions(self, mock_session):
+        """Tests that expiring, mismatched-amount or other-type pending payments are not reused."""
+        mock_session.return_value.id = "sess_new"
+        mock_session.return_value.url = "http://stripe.test/new"
+        soon = timezone.now() + timedelta(minutes=1)
+        later = timezone.now() + timedelta(hours=12)
+
+        for session_id, payment_type, amount, expires_at in [
+            ("sess_expiring", Payment.Type.RENTAL, Decimal("300.00"), soon),
+            ("sess_old_amount", Payment.Type.RENTAL, Decimal("200.00"), later),
+            ("sess_other_type", Payment.Type.CANCELLATION_FEE, Decimal("300.00"), later),
+            ("sess_unknown_expiry", Payment.Type.RENTAL, Decimal("300.00"), None),
+        ]:
+            Payment.objects.create(
+                rental=self.rental,
+                type=payment_type,
+                session_id=session_id,
+                session_url="http://stripe.test",
+                money_to_pay=amount,
+                expires_at=expires_at,
+            )
+
+        payment = services.create_stripe_payment_for_rental(
+            rental=self.rental, payment_type=Payment.Type.RENTAL, request=REQUEST
+        )
+
+        self.assertEqual(payment.session_id, "sess_new")
+        self.assertIsNotNone(payment.expires_at)
+        mock_session.assert_called_once()
+
     def test_complete_rental_status_various(self):
         """
         Tests rental status updates based on payment completion.
@@ -123,3 +182,389 @@ class PaymentServicesTests(TestCase):
             services.complete_rental_if_all_payments_paid(payment)
             self.rental.refresh_from_db()
             self.assertEqual(self.rental.status, expected_status)
+
+
+@override_settings(STRIPE_SECRET_KEY="sk_test_123")
+class AsyncPaymentServicesTests(TestCase):
+    """Tests for the async Stripe payment creation used by async views."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@test.com", password="1234")
+        self.car = Car.objects.create(brand="BMW", model="X5", year=2023, fuel_type="GAS", daily_rate=100, inventory=1)
+        self.rental = Rental.objects.create(
+            user=self.user,
+            car=self.car,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=2),
+        )
+
+    def _create_payment(self) -> Payment:
+        return async_to_sync(services.acreate_stripe_payment_for_rental)(
+            rental=Rental.objects.select_related("car").get(pk=self.rental.pk),
+            payment_type=Payment.Type.RENTAL,
+            request=REQUEST,
+        )
+
+    @patch("stripe.checkout.SessionService.create_async")
+    def test_acreate_stripe_payment_for_rental(self, mock_create):
+        mock_create.return_value.id = "sess_123"
+        mock_create.return_value.url = "http://stripe.test"
+
+        payment = self._create_payment()
+
+        self.assertEqual(payment.session_id, "sess_123")
+        self.assertEqual(payment.money_to_pay, Decimal("300.00"))
+        params = mock_create.await_args.args[0]
+        self.assertEqual(params["expires_at"], int(payment.expires_at.timestamp()))
+        self.assertEqual(params["line_items"][0]["price_data"]["unit_amount"], 30000)
+
+    @patch("stripe.checkout.SessionService.create_async")
+    def test_acreate_stripe_payment_raises_payment_service_error(self, mock_create):
+        mock_create.side_effect = stripe.error.APIConnectionError("Connection failed")
+
+        with self.assertRaises(services.PaymentServiceError) as cm:
+            self._create_payment()
+
+        self.assertIn("Stripe API connection failed", str(cm.exception))
+
+    @patch("stripe.checkout.SessionService.create_async")
+    def test_acreate_stripe_payment_reuses_valid_pending_session(self, mock_create):
+        existing = Payment.objects.create(
+            rental=self.rental,
+            type=Payment.Type.RENTAL,
+            session_id="sess_existing",
+            session_url="http://stripe.test/existing",
+            money_to_pay=Decimal("300.00"),
+            expires_at=timezone.now() + timedelta(hours=12),
+        )
+
+        self.assertEqual(self._create_payment(), existing)
+        mock_create.assert_not_awaited()
+
+
+class CheckoutOutboxServicesTests(TestCase):
+    """Tests for the payment outbox (CheckoutRequest) processing."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@test.com", password="1234")
+        self.car = Car.objects.create(brand="BMW", model="X5", year=2023, fuel_type="GAS", daily_rate=100, inventory=1)
+        self.rental = Rental.objects.create(
+            user=self.user,
+            car=self.car,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=2),
+        )
+
+    def _enqueue(self, payment_type=Payment.Type.RENTAL):
+        """Writes an outbox row for the rental."""
+        return CheckoutRequest.objects.create(
+            rental=self.rental,
+            type=payment_type,
+            money_to_pay=Decimal("300.00"),
+            success_url="http://testserver/api/payment/success/",
+            cancel_url="http://testserver/api/payment/cancel/",
+        )
+
+    def test_enqueue_checkout_request_does_not_call_stripe(self):
+        """Tests that writing the outbox row calculates the amount without contacting Stripe."""
+
+        with patch("stripe.checkout.Session.create") as mock_session:
+            checkout_request = services.enqueue_checkout_request(
+                rental=self.rental, payment_type=Payment.Type.RENTAL, request=REQUEST
+            )
+
+        mock_session.assert_not_called()
+        self.assertEqual(checkout_request.status, CheckoutRequest.Status.PENDING)
+        self.assertEqual(checkout_request.money_to_pay, Decimal("300.00"))
+        self.assertIn("{CHECKOUT_SESSION_ID}", checkout_request.success_url)
+
+    @patch("stripe.checkout.Session.create")
+    def test_process_creates_payments_for_all_claimed_requests(self, mock_session):
+        """Tests that each pending row gets a Stripe session and a linked Payment."""
+        mock_session.return_value.id = "sess_123"
+        mock_session.return_value.url = "http://stripe.test"
+        self.rental.actual_return_date = self.rental.end_date + timedelta(days=1)
+        self.rental.save()
+        requests = [self._enqueue(), self._enqueue(Payment.Type.OVERDUE_FEE)]
+
+        services.process_checkout_requests([item.id for item in requests])
+
+        self.assertEqual(mock_session.call_count, 2)
+        for checkout_request in requests:
+            checkout_request.refresh_from_db()
+            self.assertEqual(checkout_request.status, CheckoutRequest.Status.DONE)
+            self.assertEqual(checkout_request.payment.type, checkout_request.type)
+            self.assertEqual(checkout_request.attempts, 1)
+
+    @patch("stripe.checkout.Session.create")
+    def test_process_reuses_valid_pending_payment(self, mock_session):
+        """Tests that a still-valid pending payment is linked instead of creating a new session."""
+        existing = Payment.objects.create(
+            rental=self.rental,
+            type=Payment.Type.RENTAL,
+            session_id="sess_existing",
+            session_url="http://stripe.test/existing",
+            money_to_pay=Decimal("300.00"),
+            expires_at=timezone.now() + timedelta(hours=12),
+        )
+        checkout_request = self._enqueue()
+
+        services.process_checkout_requests([checkout_request.id])
+
+        checkout_request.refresh_from_db()
+        self.assertEqual(checkout_request.payment, existing)
+        mock_session.assert_not_called()
+
+    @override_settings(PAYMENT_OUTBOX_MAX_ATTEMPTS=2)
+    @patch("stripe.checkout.Session.create")
+    def test_process_retries_then_fails(self, mock_session):
+        """Tests that Stripe errors return the row to PENDING until attempts run out."""
+        mock_session.side_effect = stripe.error.APIConnectionError("Connection failed")
+        checkout_request = self._enqueue()
+
+        services.process_checkout_requests()
+        checkout_request.refresh_from_db()
+        self.assertEqual(checkout_request.status, CheckoutRequest.Status.PENDING)
+
+        services.process_checkout_requests()
+        checkout_request.refresh_from_db()
+        self.assertEqual(checkout_request.status, CheckoutRequest.Status.FAILED)
+        self.assertIn("Stripe API connection failed", checkout_request.error)
+        self.assertFalse(Payment.objects.exists())
+
+    @patch("payment.services._mark_checkout_request_done", side_effect=DatabaseError("connection lost"))
+    @patch("stripe.checkout.Session.create")
+    def test_process_keeps_no_payment_if_row_cannot_be_marked_done(self, mock_session, mock_done):
+        """Tests that the payment is rolled back with the row update, so a retry cannot leave two sessions."""
+        mock_session.return_value.id = "sess_123"
+        mock_session.return_value.url = "http://stripe.test"
+        checkout_request = self._enqueue()
+
+        with self.assertRaises(DatabaseError):
+            services.process_checkout_requests([checkout_request.id])
+
+        self.assertFalse(Payment.objects.exists())
+
+    @patch("stripe.checkout.Session.create")
+    def test_process_skips_fresh_processing_rows(self, mock_session):
+        """Tests that rows being processed by another worker are not claimed again."""
+        checkout_request = self._enqueue()
+        CheckoutRequest.objects.filter(id=checkout_request.id).update(
+            status=CheckoutRequest.Status.PROCESSING, claimed_at=timezone.now()
+        )
+
+        self.assertEqual(services.process_checkout_requests(), [])
+        mock_session.assert_not_called()
+
+
+class StripeEventProcessingTests(TestCase):
+    """Tests for asynchronous processing of stored Stripe webhook events."""
+
+    def setUp(self):
+        # Dispatcher kick markers left by earlier tests would skip the notification tasks
+        cache.clear()
+        self.user = User.objects.create_user(email="user@test.com", password="1234")
+        self.car = Car.objects.create(brand="BMW", model="X5", year=2023, fuel_type="GAS", daily_rate=100, inventory=1)
+        self.rental = Rental.objects.create(
+            user=self.user,
+            car=self.car,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=2),
+        )
+        self.payment = Payment.objects.create(
+            rental=self.rental,
+            type=Payment.Type.RENTAL,
+            session_id="sess_123",
+            session_url="http://stripe.test",
+            money_to_pay=Decimal("300.00"),
+        )
+
+    def _store(self, event_id="evt_1", session_id="sess_123", event_type="checkout.session.completed", created=1):
+        """Stores a Stripe event as the webhook would."""
+        event = {"id": event_id, "type": event_type, "created": created, "data": {"object": {"id": session_id}}}
+        return services.store_stripe_event(event=event, payload=event)[0]
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_completed_session_marks_payment_paid_and_completes_rental(self, mock_notify):
+        """Tests that processing a completed session pays the payment and completes the rental."""
+        stripe_event = self._store()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.process_stripe_events()
+
+        stripe_event.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.rental.refresh_from_db()
+
+        self.assertEqual(stripe_event.status, StripeEvent.Status.PROCESSED)
+        self.assertIsNotNone(stripe_event.processed_at)
+        self.assertEqual(self.payment.status, Payment.Status.PAID)
+        self.assertEqual(self.rental.status, Rental.Status.COMPLETED)
+        self.assertTrue(Notification.objects.filter(dedupe_key=f"payment.succeeded:{self.payment.id}").exists())
+        mock_notify.assert_called()
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_duplicate_session_events_notify_once(self, mock_notify):
+        """Tests that two events for the same session only pay and notify once."""
+        self._store(event_id="evt_1", created=1)
+        self._store(event_id="evt_2", created=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            events = services.process_stripe_events()
+
+        self.assertEqual([event.event_id for event in events], ["evt_1", "evt_2"])
+        self.assertEqual(Notification.objects.filter(event="payment.succeeded", channel="telegram").count(), 1)
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_expired_session_marks_payment_expired(self, mock_notify):
+        """Tests that checkout.session.expired flips the pending payment to EXPIRED and notifies."""
+        self._store(event_type="checkout.session.expired")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.process_stripe_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.EXPIRED)
+        self.assertTrue(Notification.objects.filter(dedupe_key=f"payment.expired:{self.payment.id}").exists())
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_async_payment_failed_does_not_touch_paid_payment(self, mock_notify):
+        """Tests that a failure event for an already paid payment is ignored."""
+        Payment.objects.filter(id=self.payment.id).update(status=Payment.Status.PAID)
+        self._store(event_type="checkout.session.async_payment_failed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.process_stripe_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.PAID)
+        self.assertFalse(Notification.objects.filter(event="payment.expired").exists())
+
+    def test_unknown_event_types_are_marked_processed(self):
+        """Tests that unhandled event types are acknowledged without side effects."""
+        stripe_event = self._store(event_type="customer.created")
+
+        services.process_stripe_events()
+
+        stripe_event.refresh_from_db()
+        self.assertEqual(stripe_event.status, StripeEvent.Status.PROCESSED)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.PENDING)
+
+    @override_settings(STRIPE_EVENTS_MAX_ATTEMPTS=2)
+    @patch("payment.services.handle_stripe_event", side_effect=RuntimeError("boom"))
+    def test_failing_event_is_retried_then_marked_failed(self, mock_handle):
+        """Tests that a failing event stays PENDING until attempts run out."""
+        stripe_event = self._store()
+
+        services.process_stripe_events()
+        stripe_event.refresh_from_db()
+        self.assertEqual(stripe_event.status, StripeEvent.Status.PENDING)
+
+        services.process_stripe_events()
+        stripe_event.refresh_from_db()
+        self.assertEqual(stripe_event.status, StripeEvent.Status.FAILED)
+        self.assertEqual(stripe_event.error, "boom")
+
+    @patch("payment.management.commands.replay_stripe_events.handle_stripe_events.delay")
+    def test_replay_command_requeues_failed_events(self, mock_enqueue):
+        """Tests that the replay command resets failed events to PENDING and queues processing."""
+        stripe_event = self._store()
+        StripeEvent.objects.filter(id=stripe_event.id).update(status=StripeEvent.Status.FAILED, attempts=5)
+
+        call_command("replay_stripe_events", stdout=StringIO())
+
+        stripe_event.refresh_from_db()
+        self.assertEqual(stripe_event.status, StripeEvent.Status.PENDING)
+        self.assertEqual(stripe_event.attempts, 0)
+        mock_enqueue.assert_called_once()
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL row locks")
+class ConcurrentPaymentCompletionTests(TransactionTestCase):
+    """Tests two payments of one rental completing in parallel workers."""
+
+    def setUp(self):
+        user = User.objects.create_user(email="user@test.com", password="1234")
+        car = Car.objects.create(brand="BMW", model="X5", year=2023, fuel_type="GAS", daily_rate=100, inventory=1)
+        self.rental = Rental.objects.create(
+            user=user, car=car, start_date=date.today(), end_date=date.today() + timedelta(days=2)
+        )
+        for payment_type, session_id in ((Payment.Type.RENTAL, "sess_rental"), (Payment.Type.OVERDUE_FEE, "sess_fee")):
+            Payment.objects.create(
+                rental=self.rental,
+                type=payment_type,
+                session_id=session_id,
+                session_url="http://stripe.test",
+                money_to_pay=Decimal("100.00"),
+            )
+
+    def test_interleaved_completions_complete_the_rental(self):
+        """
+        Both workers mark their payment PAID before either checks the other; the rental
+        lock makes the second check wait for the first commit, so the rental completes.
+        """
+        events = []
+        for session_id in ("sess_rental", "sess_fee"):
+            event = {
+                "id": f"evt_{session_id}",
+                "type": "checkout.session.completed",
+                "created": 1,
+                "data": {"object": {"id": session_id}},
+            }
+            events.append(services.store_stripe_event(event=event, payload=event)[0])
+        both_paid = threading.Barrier(2, timeout=10)
+        errors = []
+
+        def worker(stripe_event):
+            try:
+                services.process_stripe_events([stripe_event.id])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        with patch("payment.services.record_successful_payment", side_effect=lambda payment: both_paid.wait()):
+            threads = [threading.Thread(target=worker, args=(stripe_event,)) for stripe_event in events]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(set(Payment.objects.values_list("status", flat=True)), {Payment.Status.PAID})
+        self.rental.refresh_from_db()
+        self.assertEqual(self.rental.status, Rental.Status.COMPLETED)
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL row locks")
+class ConcurrentRentalReturnTests(TransactionTestCase):
+    """Tests two returns of one rental registered in parallel (e.g. with different Idempotency-Keys)."""
+
+    def setUp(self):
+        user = User.objects.create_user(email="user@test.com", password="1234")
+        car = Car.objects.create(brand="BMW", model="X5", year=2023, fuel_type="GAS", daily_rate=100, inventory=1)
+        self.rental = Rental.objects.create(
+            user=user, car=car, start_date=date.today(), end_date=date.today() + timedelta(days=2)
+        )
+
+    def test_concurrent_returns_queue_one_payment(self):
+        """The rental lock makes the second return wait for the first commit and see the rental returned."""
+        results = []
+
+        def worker():
+            try:
+                results.append(RentalViewSet._register_return(self.rental.id, REQUEST))
+            finally:
+                connection.close()
+
+        # Widen the window between the check and the commit
+        with patch("rental.views.record_rental_returned", side_effect=lambda rental: time.sleep(0.2)):
+            threads = [threading.Thread(target=worker) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sum(result is None for result in results), 1)
+        self.assertEqual(CheckoutRequest.objects.filter(rental=self.rental).count(), 1)
@@ -1,18 +1,51 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
 from datetime import date, timedelta
 from decimal import Decimal
+from unittest import skipUnless
 from unittest.mock import ANY, MagicMock, patch
 
-from django.test import TestCase
+import httpx
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 
 from car.models import Car
-from payment.models import Payment
+from core.tests.utils import FakeHTTPServer, benchmark
+from payment.models import CheckoutRequest, Payment, StripeEvent
 from payment.services import PaymentServiceError
 from rental.models import Rental
+from user.authentication import RefreshToken
 from user.models import User
 
 
+class FakeStripeServer(FakeHTTPServer):
+    """
+    Local HTTP server imitating Stripe's Checkout Session API, answering after `delay` seconds.
+    """
+
+    def __init__(self, delay: float = 0):
+        super().__init__({"POST /v1/checkout/sessions": self.create_session}, delay=delay)
+        self.sessions = 0
+
+    def create_session(self, request):
+        with self.lock:
+            self.sessions += 1
+            session_id = f"cs_test_{self.sessions}"
+
+        return 200, {
+            "id": session_id,
+            "object": "checkout.session",
+            "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+        }
+
+
 class BasePaymentViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(email="testuser@example.com", password="testpass")
@@ -38,7 +71,7 @@ class BasePaymentViewTest(TestCase):
 
 
 class TestCreateRentalPaymentAPIView(BasePaymentViewTest):
-    @patch("payment.views.create_stripe_payment_for_rental")
+    @patch("payment.views.acreate_stripe_payment_for_rental")
     def test_calls_service_and_returns_payment_data(self, mock_service):
         """Tests that the endpoint calls the service and returns correct payment data."""
         mock_payment = MagicMock()
@@ -62,7 +95,7 @@ class TestCreateRentalPaymentAPIView(BasePaymentViewTest):
         assert response.data["session_url"] == mock_payment.session_url
         assert response.data["money_to_pay"] == "300.00"
 
-    @patch("payment.views.create_stripe_payment_for_rental")
+    @patch("payment.views.acreate_stripe_payment_for_rental")
     def test_service_error_returns_502(self, mock_service):
         """Tests that PaymentServiceError from service is converted into 502 Bad Gateway."""
         mock_service.side_effect = PaymentServiceError("Stripe API connection failed")
@@ -73,6 +106,26 @@ class TestCreateRentalPaymentAPIView(BasePaymentViewTest):
         assert response.status_code == 502
         assert "Stripe API connection failed" in response.data["detail"]
 
+    def test_creates_session_through_stripe_api(self):
+        """Tests consecutive checkouts against a Stripe API server, each request running in its own event loop."""
+        other_rental = Rental.objects.create(
+            user=self.user,
+            car=self.car,
+            start_date=date.today() + timedelta(days=5),
+            end_date=date.today() + timedelta(days=6),
+        )
+
+        with FakeStripeServer() as stripe_server:
+            with override_settings(STRIPE_API_BASE=stripe_server.url, STRIPE_SECRET_KEY="sk_test_123"):
+                responses = [
+                    self.client.post(reverse("payment:create-rental-payment", kwargs={"rental_id": rental.id}))
+                    for rental in (self.rental, other_rental)
+                ]
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert responses[1].data["session_url"] == "https://checkout.stripe.com/c/pay/cs_test_2"
+        assert Payment.objects.get(rental=other_rental).session_id == "cs_test_2"
+
 
 class TestPaymentSuccessAPIView(BasePaymentViewTest):
     def test_missing_session_id_returns_400(self):
@@ -116,16 +169,24 @@ class TestPaymentCancelAPIView(BasePaymentViewTest):
 
 
 class TestStripeWebhookAPIView(BasePaymentViewTest):
-    @patch("payment.views.complete_rental_if_all_payments_paid")
-    @patch("payment.views.notify_successful_payment.delay")
-    @patch("payment.views.stripe.Webhook.construct_event")
-    def test_checkout_session_completed_marks_payment_paid(
-        self,
-        mock_construct_event,
-        mock_notify,
-        mock_complete_rental,
-    ):
-        """Tests processing of a valid Stripe webhook event."""
+    EVENT = {
+        "id": "evt_123",
+        "type": "checkout.session.completed",
+        "created": 1760000000,
+        "data": {"object": {"id": "sess_123"}},
+    }
+
+    def _post_event(self, mock_construct_event, event=None):
+        event = event or self.EVENT
+        mock_construct_event.return_value = event
+
+        url = reverse("payment:stripe-webhook")
+        return self.client.post(url, data=event, HTTP_STRIPE_SIGNATURE="test", format="json")
+
+    @patch("payment.views.handle_stripe_events.delay")
+    @patch("stripe.Webhook.construct_event")
+    def test_webhook_stores_event_and_returns_immediately(self, mock_construct_event, mock_enqueue):
+        """Tests that a valid event is persisted and queued without touching payments inline."""
         payment = Payment.objects.create(
             rental=self.rental,
             type=Payment.Type.RENTAL,
@@ -134,23 +195,192 @@ class TestStripeWebhookAPIView(BasePaymentViewTest):
             money_to_pay=Decimal("300.00"),
         )
 
-        mock_construct_event.return_value = {
-            "type": "checkout.session.completed",
-            "data": {"object": {"id": "sess_123"}},
-        }
+        response = self._post_event(mock_construct_event)
 
-        url = reverse("payment:stripe-webhook")
-        self.client.post(url, data={}, HTTP_STRIPE_SIGNATURE="test", format="json")
+        assert response.status_code == 200
+        stripe_event = StripeEvent.objects.get(event_id="evt_123")
+        assert stripe_event.status == StripeEvent.Status.PENDING
+        assert stripe_event.payload["data"]["object"]["id"] == "sess_123"
+        mock_enqueue.assert_called_once_with([stripe_event.id])
 
         payment.refresh_from_db()
+        assert payment.status == Payment.Status.PENDING
 
-        assert payment.status == Payment.Status.PAID
-        mock_notify.assert_called_once_with(payment.id)
-        mock_complete_rental.assert_called_once_with(payment)
+    @patch("payment.views.handle_stripe_events.delay")
+    @patch("stripe.Webhook.construct_event")
+    def test_redelivered_event_is_deduplicated(self, mock_construct_event, mock_enqueue):
+        """Tests that Stripe retries of the same event are stored and queued only once."""
+        self._post_event(mock_construct_event)
+        response = self._post_event(mock_construct_event)
+
+        assert response.status_code == 200
+        assert StripeEvent.objects.count() == 1
+        mock_enqueue.assert_called_once()
+
+    @patch("stripe.Webhook.construct_event")
+    def test_invalid_signature_returns_400(self, mock_construct_event):
+        """Tests that events failing signature verification are rejected and not stored."""
+        mock_construct_event.side_effect = ValueError("bad payload")
 
-    @patch("payment.views.stripe.Webhook.construct_event", side_effect=ValueError("Invalid payload"))
-    def test_invalid_webhook_signature_returns_400(self, _):
-        """Tests that invalid Stripe signature returns 400 Bad Request."""
         url = reverse("payment:stripe-webhook")
-        response = self.client.post(url, data={}, HTTP_STRIPE_SIGNATURE="invalid", format="json")
+        response = self.client.post(url, data={}, HTTP_STRIPE_SIGNATURE="bad", format="json")
+
         assert response.status_code == 400
+        assert not StripeEvent.objects.exists()
+
+
+class TestCheckoutRequestStatusAPIView(BasePaymentViewTest):
+    def _create_checkout_request(self, rental):
+        return CheckoutRequest.objects.create(
+            rental=rental,
+            type=Payment.Type.RENTAL,
+            money_to_pay=Decimal("300.00"),
+            success_url="http://testserver/success/",
+            cancel_url="http://testserver/cancel/",
+        )
+
+    def test_pending_request_has_no_session_url(self):
+        """Tests that a queued request reports its status without a payment link."""
+        checkout_request = self._create_checkout_request(self.rental)
+
+        url = reverse("payment:checkout-request-status", kwargs={"pk": checkout_request.id})
+        response = self.client.get(url)
+
+        assert response.status_code == 200
+        assert response.data["status"] == CheckoutRequest.Status.PENDING
+        assert response.data["session_url"] is None
+
+    def test_done_request_returns_session_url(self):
+        """Tests that a processed request exposes the Stripe session URL."""
+        checkout_request = self._create_checkout_request(self.rental)
+        checkout_request.payment = Payment.objects.create(
+            rental=self.rental,
+            type=Payment.Type.RENTAL,
+            session_id="sess_123",
+            session_url="http://stripe.test",
+            money_to_pay=Decimal("300.00"),
+        )
+        checkout_request.status = CheckoutRequest.Status.DONE
+        checkout_request.save()
+
+        url = reverse("payment:checkout-request-status", kwargs={"pk": checkout_request.id})
+        response = self.client.get(url)
+
+        assert response.status_code == 200
+        assert response.data["session_url"] == "http://stripe.test"
+
+    def test_other_users_request_returns_404(self):
+        """Tests that users cannot poll checkout requests of other users."""
+        other_user = User.objects.create_user(email="other@example.com", password="testpass")
+        other_rental = Rental.objects.create(
+            user=other_user,
+            car=self.car,
+            start_date=date.today() + timedelta(days=5),
+            end_date=date.today() + timedelta(days=6),
+        )
+        checkout_request = self._create_checkout_request(other_rental)
+
+        url = reverse("payment:checkout-request-status", kwargs={"pk": checkout_request.id})
+        response = self.client.get(url)
+
+        assert response.status_code == 404
+
+
+@benchmark
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+class CheckoutConcurrencyBenchmark(TransactionTestCase):
+    """
+    Checkouts per second for a burst of concurrent payment requests while Stripe takes
+    STRIPE_DELAY seconds to answer, with the same number of worker processes: sync
+    gunicorn workers (the previous deployment) against uvicorn workers serving the
+    async view.
+    """
+
+    WORKERS = 2
+    CONCURRENCY = 20
+    STRIPE_DELAY = 0.5
+
+    def setUp(self):
+        user = User.objects.create_user(email="bench@test.com", password="password123")
+        car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, fuel_type="GAS", daily_rate=50, inventory=1
+        )
+        rentals = Rental.objects.bulk_create(
+            Rental(user=user, car=car, start_date=date.today(), end_date=date.today() + timedelta(days=2))
+            for _ in range(2 * self.CONCURRENCY)
+        )
+        self.rental_ids = [rental.id for rental in rentals]
+        self.token = str(RefreshToken.for_user(user).access_token)
+
+    def _checkouts_per_second(self, rental_ids, *gunicorn_args) -> float:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        db = connection.settings_dict
+        with FakeStripeServer(delay=self.STRIPE_DELAY) as stripe_server:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", *gunicorn_args, "--bind", f"127.0.0.1:{port}"]
+                + ["--workers", str(self.WORKERS)],
+                cwd=settings.BASE_DIR,
+                env={
+                    **os.environ,
+                    "POSTGRES_DB": db["NAME"],
+                    "POSTGRES_USER": db["USER"] or "",
+                    "POSTGRES_PASSWORD": db["PASSWORD"] or "",
+                    "POSTGRES_HOST": db["HOST"] or "",
+                    "POSTGRES_PORT": str(db["PORT"] or ""),
+                    # Async requests keep their pooled connection until they finish
+                    "DB_CONNECTION_MODE": "pool",
+                    "DB_POOL_MAX_SIZE": str(self.CONCURRENCY),
+                    "STRIPE_API_BASE": stripe_server.url,
+                    "STRIPE_SECRET_KEY": "sk_test_benchmark",
+                    "THROTTLE_RATE_PAYMENT": "10000/min",
+                },
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                return asyncio.run(self._burst(port, rental_ids))
+            finally:
+                server.terminate()
+                server.wait()
+
+    async def _burst(self, port, rental_ids) -> float:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", headers={"Authorize": f"Bearer {self.token}"}, timeout=60
+        ) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    (await client.get("/api/cars/")).raise_for_status()
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise
+                    await asyncio.sleep(0.1)
+
+            started = time.perf_counter()
+            responses = await asyncio.gather(
+                *(
+                    client.post(reverse("payment:create-rental-payment", kwargs={"rental_id": rental_id}))
+                    for rental_id in rental_ids
+                )
+            )
+            elapsed = time.perf_counter() - started
+
+        for response in responses:
+            response.raise_for_status()
+        return len(rental_ids) / elapsed
+
+    def test_async_workers_serve_concurrent_checkouts(self):
+        sync = self._checkouts_per_second(self.rental_ids[: self.CONCURRENCY], "config.wsgi:application")
+        uvicorn = self._checkouts_per_second(
+            self.rental_ids[self.CONCURRENCY :],
+            "config.asgi:application",
+            "--worker-class",
+            "uvicorn_worker.UvicornWorker",
+        )
+
+        report = f"sync: {sync:.1f}/s, uvicorn: {uvicorn:.1f}/s"
+        self.assertGreater(uvicorn, 2 * sync, report)
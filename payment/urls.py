@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    CheckoutRequestStatusAPIView,
     CreateRentalPaymentAPIView,
     PaymentCancelAPIView,
     PaymentSuccessAPIView,
@@ -18,6 +19,11 @@ urlpatterns = [
     path("success/", PaymentSuccessAPIView.as_view(), name="success"),
     path("cancel/", PaymentCancelAPIView.as_view(), name="cancel"),
     path("rental/<int:rental_id>/payment/", CreateRentalPaymentAPIView.as_view(), name="create-rental-payment"),
+    path(
+        "checkout-requests/<int:pk>/",
+        CheckoutRequestStatusAPIView.as_view(),
+        name="checkout-request-status",
+    ),
     path("", include(router.urls)),
 ]
 
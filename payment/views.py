@@ -1,37 +1,47 @@
-import stripe
+import json
+import logging
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.utils import extend_schema, extend_schema_view
+from kombu.exceptions import OperationalError
 from rest_framework import mixins, status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from notifications.tasks import notify_successful_payment
-from payment.models import Payment
-from payment.serializers import PaymentDetailSerializer, PaymentListSerializer
+from core.aio import AsyncAPIView
+from core.idempotency import idempotent
+from payment.models import CheckoutRequest, Payment
+from payment.serializers import CheckoutRequestSerializer, PaymentDetailSerializer, PaymentListSerializer
 from payment.services import (
     PaymentServiceError,
-    complete_rental_if_all_payments_paid,
-    create_stripe_payment_for_rental,
+    acreate_stripe_payment_for_rental,
+    astore_stripe_event,
+    get_stripe,
 )
+from payment.tasks import handle_stripe_events
 from rental.models import Rental
 
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 WEBHOOK_SECRET = settings.STRIPE_WEBHOOK_SECRET
 
+logger = logging.getLogger(__name__)
+
 
 @method_decorator(csrf_exempt, name="dispatch")
-class StripeWebhookAPIView(APIView):
+class StripeWebhookAPIView(AsyncAPIView):
     """
     Stripe webhook endpoint.
 
-    Receives events from Stripe and processes completed checkout sessions.
-    When a payment is successfully completed, marks the corresponding
-    Payment as PAID and completes the Rental if all related payments are settled.
+    Verifies the signature, stores the raw event (deduplicated by Stripe event ID)
+    and acknowledges it immediately. Events are processed asynchronously by a Celery
+    worker, which marks payments as PAID and completes rentals when all payments are settled.
+
+    Async: under ASGI a burst of webhooks does not tie up a worker per delivery.
     """
 
     permission_classes = []
@@ -40,18 +50,20 @@ class StripeWebhookAPIView(APIView):
         summary="Stripe webhook",
         description=(
             "Receives Stripe webhook events. "
-            "Handles `checkout.session.completed` events to mark payments as PAID "
+            "Verified events are stored and acknowledged with 200; "
+            "`checkout.session.completed` events are processed in the background to mark payments as PAID "
             "and complete the related rental if applicable."
         ),
         responses={200: None, 400: None},
     )
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         """
-        Validates the webhook signature and processes the event.
+        Validates the webhook signature and stores the event for processing.
         Returns 200 OK on success or 400 Bad Request if validation fails.
         """
         payload = request.body
         sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
+        stripe = get_stripe()
 
         try:
             event = stripe.Webhook.construct_event(
@@ -62,16 +74,14 @@ class StripeWebhookAPIView(APIView):
         except (ValueError, stripe.error.SignatureVerificationError):
             return Response({"detail": "Invalid webhook signature or payload"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if event["type"] == "checkout.session.completed":
-            session = event["data"]["object"]
-            payment = Payment.objects.filter(session_id=session["id"]).first()
+        stripe_event, created = await astore_stripe_event(event=event, payload=json.loads(payload))
 
-            if payment and payment.status != Payment.Status.PAID:
-                payment.status = Payment.Status.PAID
-                payment.save(update_fields=["status"])
-
-                notify_successful_payment.delay(payment.id)
-                complete_rental_if_all_payments_paid(payment)
+        if created:
+            try:
+                # Publishing to the broker blocks, so it runs in a thread
+                await sync_to_async(handle_stripe_events.delay)([stripe_event.id])
+            except OperationalError:
+                logger.exception("Failed to publish Stripe event %s; the relay will pick it up", stripe_event.event_id)
 
         return Response(status=status.HTTP_200_OK)
 
@@ -135,15 +145,17 @@ class PaymentCancelAPIView(APIView):
         )
 
 
-class CreateRentalPaymentAPIView(APIView):
+class CreateRentalPaymentAPIView(AsyncAPIView):
     """
     Create rental payment endpoint.
 
     Creates a Stripe Checkout session for a rental payment
     and returns the payment details along with the session URL.
+    Async, so waiting on Stripe does not hold a worker.
     """
 
     permission_classes = [IsAuthenticated]
+    throttle_scope = "payment"
 
     @extend_schema(
         summary="Create rental payment",
@@ -153,15 +165,16 @@ class CreateRentalPaymentAPIView(APIView):
         ),
         responses={200: None, 401: None, 404: None, 502: None},
     )
-    def post(self, request, rental_id):
+    @idempotent
+    async def post(self, request, rental_id):
         """
         Generates a new payment session for the specified rental ID.
         Handles Stripe errors gracefully and returns appropriate HTTP status codes.
         """
-        rental = get_object_or_404(Rental, id=rental_id)
+        rental = await aget_object_or_404(Rental.objects.select_related("car"), id=rental_id)
 
         try:
-            payment = create_stripe_payment_for_rental(
+            payment = await acreate_stripe_payment_for_rental(
                 rental=rental,
                 payment_type=Payment.Type.RENTAL,
                 request=request,
@@ -180,6 +193,37 @@ class CreateRentalPaymentAPIView(APIView):
         )
 
 
+class CheckoutRequestStatusAPIView(APIView):
+    """
+    Checkout request status endpoint.
+
+    Lets clients poll a queued Stripe Checkout session (returned by the car return endpoint)
+    until its payment link is ready.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Get checkout request status",
+        description=(
+            "Returns the processing status of a queued Stripe Checkout session. "
+            "Once `status` is `DONE`, `session_url` contains the payment link."
+        ),
+        responses={200: CheckoutRequestSerializer, 401: None, 404: None},
+    )
+    def get(self, request, pk):
+        """
+        Returns the checkout request if it belongs to the user (staff can see all).
+        """
+        queryset = CheckoutRequest.objects.select_related("payment")
+        if not request.user.is_staff:
+            queryset = queryset.filter(rental__user=request.user)
+
+        checkout_request = get_object_or_404(queryset, pk=pk)
+
+        return Response(CheckoutRequestSerializer(checkout_request).data, status=status.HTTP_200_OK)
+
+
 @extend_schema_view(
     list=extend_schema(
         summary="List all payments",
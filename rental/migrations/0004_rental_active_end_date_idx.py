@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0002_car_image'),
+        ('rental', '0003_alter_rental_car_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('actual_return_date__isnull', True), ('status', 'BOOKED')), fields=['end_date'], name='rental_active_end_date_idx'),
+        ),
+    ]
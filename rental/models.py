@@ -43,6 +43,11 @@ class Rental(models.Model):
         indexes = [
             models.Index(fields=["car", "start_date", "end_date"]),
             models.Index(fields=["status"]),
+            models.Index(
+                fields=["end_date"],
+                condition=models.Q(status="BOOKED", actual_return_date__isnull=True),
+                name="rental_active_end_date_idx",
+            ),
         ]
 
     def __str__(self) -> str:
@@ -0,0 +1,21 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsCorporateOrAdmin(BasePermission):
+    """
+    Custom permission for batch booking.
+
+    - Corporate customers (is_corporate=True): Allowed
+    - Admins: Allowed
+    - Regular users and guests: No access
+    """
+
+    def has_permission(self, request, view):
+        """
+        Check global permissions for the request.
+        """
+        return bool(
+            request.user
+            and request.user.is_authenticated
+            and (getattr(request.user, "is_corporate", False) or request.user.is_staff)
+        )
@@ -1,12 +1,18 @@
+from collections import Counter
 from typing import Any
 
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
 from rest_framework import serializers
 
+from car.models import Car
 from car.serializers import (
     CarDetailSerializer,
     CarListSerializer,
 )
+from notifications.tasks import record_new_rental_batch, schedule_overdue_check
 from payment.models import Payment
 
 from .models import Rental
@@ -100,12 +106,108 @@ class RentalCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data: dict[str, Any]) -> Rental:
         """
         Creates a rental instance with the current user and BOOKED status.
+        The rental and its outbox notification are written in one transaction.
         """
-        rental = Rental.objects.create(user=self.context["request"].user, status=Rental.Status.BOOKED, **validated_data)
+        with transaction.atomic():
+            rental = Rental.objects.create(
+                user=self.context["request"].user, status=Rental.Status.BOOKED, **validated_data
+            )
 
         return rental
 
 
+class RentalBatchCreateSerializer(serializers.Serializer):
+    """
+    Serializer for booking several cars for the same period in one request.
+
+    A car ID may be repeated to book several units of the same model.
+    Availability for all requested cars is checked with one grouped query
+    while the cars are locked, and rentals are inserted with bulk_create.
+    """
+
+    cars = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.RENTAL_BATCH_MAX_CARS,
+    )
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        """
+        Validates pending payments, dates and that all requested cars exist.
+        """
+        user = self.context["request"].user
+
+        if Payment.objects.filter(rental__user=user, status=Payment.Status.PENDING).exists():
+            raise serializers.ValidationError("You have pending payments! Please pay them first.")
+
+        if attrs["start_date"] > attrs["end_date"]:
+            raise serializers.ValidationError({"end_date": "End date must be after start date."})
+
+        if attrs["start_date"] < timezone.now().date():
+            raise serializers.ValidationError({"start_date": "Start date cannot be in the past."})
+
+        requested = Counter(attrs["cars"])
+        existing_ids = set(Car.objects.filter(id__in=requested).values_list("id", flat=True))
+        missing_ids = sorted(set(requested) - existing_ids)
+
+        if missing_ids:
+            raise serializers.ValidationError({"cars": f"Cars not found: {missing_ids}."})
+
+        attrs["requested"] = requested
+        return attrs
+
+    def create(self, validated_data: dict[str, Any]) -> list[Rental]:
+        """
+        Locks the requested cars in ID order, re-checks availability
+        and creates all rentals in a single transaction.
+        """
+        user = self.context["request"].user
+        requested = validated_data["requested"]
+        start_date = validated_data["start_date"]
+        end_date = validated_data["end_date"]
+
+        with transaction.atomic():
+            cars = {car.id: car for car in Car.objects.select_for_update().filter(id__in=requested).order_by("id")}
+
+            booked = dict(
+                Rental.objects.filter(car_id__in=requested, status=Rental.Status.BOOKED)
+                .filter(Q(start_date__lte=end_date) & Q(end_date__gte=start_date))
+                .values("car_id")
+                .annotate(booked_count=Count("id"))
+                .values_list("car_id", "booked_count")
+            )
+
+            unavailable = [
+                car_id
+                for car_id, quantity in requested.items()
+                if booked.get(car_id, 0) + quantity > cars[car_id].inventory
+            ]
+            if unavailable:
+                raise serializers.ValidationError(
+                    {"cars": f"No cars available for selected dates: {sorted(unavailable)}."}
+                )
+
+            rentals = Rental.objects.bulk_create(
+                [
+                    Rental(
+                        user=user,
+                        car=cars[car_id],
+                        start_date=start_date,
+                        end_date=end_date,
+                        status=Rental.Status.BOOKED,
+                    )
+                    for car_id in validated_data["cars"]
+                ]
+            )
+
+            record_new_rental_batch(rentals)
+            transaction.on_commit(lambda: schedule_overdue_check(end_date))
+
+        return rentals
+
+
 class RentalReturnSerializer(serializers.Serializer):
     """
     Empty serializer used for Swagger documentation for return/cancel actions
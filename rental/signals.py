@@ -3,18 +3,31 @@ from django.db.models.base import ModelBase
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from notifications.tasks import notify_new_rental
+from notifications.tasks import record_new_rental, schedule_overdue_check
 from rental.models import Rental
 
 
 @receiver(post_save, sender=Rental)
 def send_new_rental_notification(sender: ModelBase, instance: Rental, created: bool, **kwargs) -> None:
     """
-    Signal receiver that triggers a Celery task to send a notification
+    Signal receiver that records a notification in the outbox
     when a new Rental is created.
 
-    Wrapped in transaction.on_commit to ensure the DB record exists
-    before the worker tries to process it.
+    Runs in the same transaction as the insert, so the notification is
+    written if and only if the rental is.
     """
     if created:
-        transaction.on_commit(lambda: notify_new_rental.delay(instance.id))
+        record_new_rental(instance)
+
+
+@receiver(post_save, sender=Rental)
+def schedule_rental_overdue_check(sender: ModelBase, instance: Rental, **kwargs) -> None:
+    """
+    Signal receiver that schedules the overdue check for the rental's end date
+    when an active rental is created or saved (e.g. its end date is extended).
+
+    Scheduling is deduplicated per end date, so repeated saves are cheap.
+    """
+    if instance.status == Rental.Status.BOOKED and instance.actual_return_date is None:
+        end_date = instance.end_date
+        transaction.on_commit(lambda: schedule_overdue_check(end_date))
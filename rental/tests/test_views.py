@@ -3,13 +3,29 @@ from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from car.models import Car
+from notifications.models import Notification
+from payment.models import CheckoutRequest, Payment
+from payment.services import process_checkout_requests
 from rental.models import Rental
+from rental.views import RentalViewSet
+from user.authentication import RefreshToken
+
+
+def fake_stripe_session(**kwargs):
+    """Returns a fake Stripe session whose URL ends with the payment type."""
+    payment_type = kwargs["line_items"][0]["price_data"]["product_data"]["name"].split(" — ")[-1]
+    session = MagicMock()
+    session.id = f"sess_{payment_type}"
+    session.url = f"http://stripe.com/{payment_type}"
+    return session
 
 
 class RentalViewSetTestCase(APITestCase):
@@ -146,17 +162,27 @@ class TestAuthenticatedRentalAccess(RentalViewSetTestCase):
         self.assertEqual(Rental.objects.count(), 2)
         self.assertEqual(Rental.objects.last().user, self.user)
 
-    @patch("rental.views.create_stripe_payment_for_rental")
-    @patch("rental.views.notify_rental_returned.delay")
-    def test_return_car_success(self, mock_notify, mock_create_payment):
+    def test_create_rental_retry_with_idempotency_key(self):
+        """Tests that retrying a booking with the same Idempotency-Key creates only one rental."""
+        data = {
+            "car": self.car.id,
+            "start_date": self.next_week,
+            "end_date": self.next_week + timedelta(days=2),
+        }
+        first = self.client.post(self.list_url, data, HTTP_IDEMPOTENCY_KEY="booking-retry-1")
+        second = self.client.post(self.list_url, data, HTTP_IDEMPOTENCY_KEY="booking-retry-1")
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertEqual(Rental.objects.count(), 2)
+
+    @patch("rental.views.create_checkout_sessions.delay", side_effect=process_checkout_requests)
+    @patch("stripe.checkout.Session.create", side_effect=fake_stripe_session)
+    def test_return_car_success(self, mock_session, mock_publish):
         """
         Tests the standard return flow (on time).
         Expects a payment link for the rental cost to be generated.
         """
-        mock_payment = MagicMock()
-        mock_payment.session_url = "http://stripe.com/test_session"
-        mock_create_payment.return_value = mock_payment
-
         response = self.client.post(self.return_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -166,10 +192,13 @@ class TestAuthenticatedRentalAccess(RentalViewSetTestCase):
         self.assertEqual(self.rental.actual_return_date, timezone.now().date())
         self.assertNotEqual(self.rental.status, Rental.Status.COMPLETED)
 
-        self.assertEqual(response.data["rental_payment_url"], "http://stripe.com/test_session")
+        self.assertEqual(response.data["rental_payment_url"], "http://stripe.com/RENTAL")
+        mock_session.assert_called_once()
+        self.assertTrue(Notification.objects.filter(dedupe_key=f"rental.returned:{self.rental.id}").exists())
 
-    @patch("rental.views.create_stripe_payment_for_rental")
-    def test_return_car_overdue(self, mock_create_payment):
+    @patch("rental.views.create_checkout_sessions.delay", side_effect=process_checkout_requests)
+    @patch("stripe.checkout.Session.create", side_effect=fake_stripe_session)
+    def test_return_car_overdue(self, mock_session, mock_publish):
         """
         Tests returning a car late.
         Expects two payment links: one for rental, one for overdue fee.
@@ -178,22 +207,55 @@ class TestAuthenticatedRentalAccess(RentalViewSetTestCase):
         self.rental.end_date = self.today - timedelta(days=1)
         self.rental.save()
 
-        mock_payment_rental = MagicMock()
-        mock_payment_rental.session_url = "http://stripe.com/rental"
-        mock_payment_fine = MagicMock()
-        mock_payment_fine.session_url = "http://stripe.com/fine"
-
-        mock_create_payment.side_effect = [mock_payment_rental, mock_payment_fine]
-
         response = self.client.post(self.return_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn("overdue_payment_url", response.data)
+        self.assertEqual(response.data["rental_payment_url"], "http://stripe.com/RENTAL")
+        self.assertEqual(response.data["overdue_payment_url"], "http://stripe.com/OVERDUE_FEE")
+        self.assertEqual(mock_session.call_count, 2)
         self.rental.refresh_from_db()
         self.assertEqual(self.rental.status, Rental.Status.OVERDUE)
 
-    @patch("rental.views.notify_rental_cancelled.delay")
-    def test_cancel_rental_free(self, mock_notify):
+    @override_settings(PAYMENT_OUTBOX_WAIT_TIMEOUT=0)
+    @patch("rental.views.create_checkout_sessions.delay")
+    def test_return_car_pending_outbox_returns_202(self, mock_publish):
+        """
+        Tests that the return is committed and a pollable status is returned
+        when the worker has not created the Stripe sessions yet.
+        """
+        response = self.client.post(self.return_url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.rental.refresh_from_db()
+        self.assertEqual(self.rental.actual_return_date, self.today)
+
+        checkout_request = CheckoutRequest.objects.get(rental=self.rental)
+        self.assertEqual(checkout_request.type, Payment.Type.RENTAL)
+        self.assertEqual(checkout_request.status, CheckoutRequest.Status.PENDING)
+        mock_publish.assert_called_once_with([checkout_request.id])
+
+        status_url = response.data["checkout_requests"][0]["status_url"]
+        self.assertTrue(status_url.endswith(f"/checkout-requests/{checkout_request.id}/"))
+
+    @override_settings(PAYMENT_OUTBOX_WAIT_TIMEOUT=0)
+    @patch("rental.views.create_checkout_sessions.delay")
+    def test_return_car_twice_returns_400(self, mock_publish):
+        """Tests that a returned rental awaiting payment cannot be returned again."""
+        self.client.post(self.return_url)
+        response = self.client.post(self.return_url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(CheckoutRequest.objects.filter(rental=self.rental).count(), 1)
+
+    def test_return_rechecks_the_locked_rental(self):
+        """Tests that a return registered after the view's check queues no second payment."""
+        request = RequestFactory().post(self.return_url)
+        RentalViewSet._register_return(self.rental.id, request)
+
+        self.assertIsNone(RentalViewSet._register_return(self.rental.id, request))
+        self.assertEqual(CheckoutRequest.objects.filter(rental=self.rental).count(), 1)
+
+    def test_cancel_rental_free(self):
         """
         Tests cancelling a rental > 24 hours before start.
         Expects immediate cancellation without fees.
@@ -208,6 +270,7 @@ class TestAuthenticatedRentalAccess(RentalViewSetTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.rental.refresh_from_db()
         self.assertEqual(self.rental.status, Rental.Status.CANCELLED)
+        self.assertTrue(Notification.objects.filter(dedupe_key=f"rental.cancelled:{self.rental.id}").exists())
 
     @patch("rental.views.create_stripe_payment_for_rental")
     def test_cancel_rental_late_fee(self, mock_create_payment):
@@ -231,6 +294,30 @@ class TestAuthenticatedRentalAccess(RentalViewSetTestCase):
         self.assertEqual(self.rental.status, Rental.Status.BOOKED)
 
 
+class TestTokenAuthenticatedRentalAccess(RentalViewSetTestCase):
+    """
+    Tests for users authenticated with a real access token, so request.user is the
+    user built by CachedJWTAuthentication rather than a database instance.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZE=f"Bearer {token}")
+
+    def test_create_rental_notifies_the_user_email(self):
+        """Tests that the new rental notifications carry the user's email."""
+        data = {"car": self.car.id, "start_date": self.next_week, "end_date": self.next_week + timedelta(days=2)}
+
+        response = self.client.post(self.list_url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        notifications = Notification.objects.filter(event="rental.created", data__rental_id=response.data["id"])
+        self.assertIn("User: user@test.com", notifications.get(channel="telegram").text)
+        self.assertEqual(notifications.get(channel="email").recipient, "user@test.com")
+
+
 class TestAdminRentalAccess(RentalViewSetTestCase):
     """
     Tests for admin users.
@@ -272,3 +359,82 @@ class TestAdminRentalAccess(RentalViewSetTestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["user"], self.other_user.id)
+
+
+class TestBatchRentalBooking(RentalViewSetTestCase):
+    """
+    Tests for the batch booking endpoint used by corporate customers.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.batch_url = reverse("rental:rental-batch-create")
+        self.corporate = get_user_model().objects.create_user(
+            email="corp@test.com",
+            password="testpassword123",
+            is_corporate=True,
+        )
+        self.second_car = Car.objects.create(
+            brand="Honda",
+            model="Civic",
+            year=2021,
+            daily_rate=Decimal("80.00"),
+            inventory=1,
+        )
+        self.client.force_authenticate(user=self.corporate)
+
+    def _payload(self, cars):
+        """Builds a batch payload for next week."""
+        return {"cars": cars, "start_date": self.next_week, "end_date": self.next_week + timedelta(days=2)}
+
+    def test_regular_user_forbidden(self):
+        """Tests that non-corporate users cannot use batch booking."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.batch_url, self._payload([self.car.id]), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @patch("notifications.tasks.dispatch.send_notifications.apply_async")
+    def test_batch_creates_all_rentals_with_one_notification(self, mock_dispatch):
+        """Tests that a batch books every car (beyond the 3 rental limit) and notifies once."""
+        cars = [self.car.id] * 4 + [self.second_car.id]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.batch_url, self._payload(cars), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Rental.objects.filter(user=self.corporate).count(), 5)
+
+        rental_ids = [rental["id"] for rental in response.data]
+        self.assertFalse(Notification.objects.filter(event="rental.created", data__rental_id__in=rental_ids).exists())
+        notification = Notification.objects.get(event="rental.batch_created", channel="telegram")
+        self.assertCountEqual(notification.data["rental_ids"], rental_ids)
+
+    def test_batch_is_all_or_nothing_when_a_car_is_unavailable(self):
+        """Tests that one unavailable car rejects the whole batch."""
+        cars = [self.car.id, self.second_car.id, self.second_car.id]
+        response = self.client.post(self.batch_url, self._payload(cars), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.second_car.id), str(response.data["cars"]))
+        self.assertFalse(Rental.objects.filter(user=self.corporate).exists())
+
+    def test_batch_counts_existing_bookings(self):
+        """Tests that availability takes overlapping BOOKED rentals into account."""
+        Rental.objects.create(
+            user=self.other_user,
+            car=self.second_car,
+            start_date=self.next_week,
+            end_date=self.next_week + timedelta(days=1),
+        )
+        response = self.client.post(self.batch_url, self._payload([self.second_car.id]), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_unknown_car_returns_400(self):
+        """Tests that unknown car IDs are reported."""
+        response = self.client.post(self.batch_url, self._payload([self.car.id, 999999]), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("999999", str(response.data["cars"]))
@@ -1,5 +1,11 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
 from django.db.models import QuerySet
+from django.shortcuts import aget_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import (
@@ -7,20 +13,29 @@ from drf_spectacular.utils import (
     OpenApiResponse,
     extend_schema,
 )
+from kombu.exceptions import OperationalError
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 
-from notifications.tasks.rental_cancelled import notify_rental_cancelled
-from notifications.tasks.rental_returned import notify_rental_returned
-from payment.models import Payment
-from payment.services import create_stripe_payment_for_rental
+from core.aio import AsyncViewMixin
+from core.idempotency import idempotent
+from notifications.tasks import record_rental_cancelled, record_rental_returned
+from payment.models import CheckoutRequest, Payment
+from payment.services import (
+    await_checkout_requests,
+    create_stripe_payment_for_rental,
+    enqueue_checkout_request,
+)
+from payment.tasks import create_checkout_sessions
 
 from .filters import RentalFilter
 from .models import Rental
+from .permissions import IsCorporateOrAdmin
 from .serializers import (
+    RentalBatchCreateSerializer,
     RentalCreateSerializer,
     RentalDetailSerializer,
     RentalListSerializer,
@@ -28,7 +43,11 @@ from .serializers import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 class RentalViewSet(
+    AsyncViewMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -40,12 +59,19 @@ class RentalViewSet(
     Provides capabilities to:
     - List and Retrieve rentals (filtered by user ownership).
     - Create new rentals with validation.
-    - Return cars (generating payments).
+    - Book several cars at once (corporate customers).
+    - Return cars (generating payments; async, see `return_car`).
     - Cancel rentals (calculating fees based on 24h rule).
     """
 
     queryset = Rental.objects.select_related("car", "user")
     permission_classes = (IsAuthenticated,)
+    throttle_scopes = {
+        "create": "booking",
+        "batch_create": "booking",
+        "return_car": "payment",
+        "cancel_rental": "payment",
+    }
 
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RentalFilter
@@ -76,12 +102,51 @@ class RentalViewSet(
             return RentalDetailSerializer
         if self.action == "create":
             return RentalCreateSerializer
+        if self.action == "batch_create":
+            return RentalBatchCreateSerializer
 
         if self.action in ["return_car", "cancel_rental"]:
             return RentalReturnSerializer
 
         return RentalListSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """
+        Creates a rental. Supports the `Idempotency-Key` header so client retries
+        replay the original response instead of booking twice.
+        """
+        return super().create(request, *args, **kwargs)
+
+    @extend_schema(
+        summary="Book several cars at once",
+        description="""
+            Books a list of cars for the same period (corporate customers and admins only).
+
+            Logic:
+            1. Checks that the user has no pending payments.
+            2. Locks the requested cars and validates availability for all of them in one query.
+            3. Creates all rentals in a single transaction (all or nothing).
+            4. Sends one aggregated notification for the whole batch.
+
+            Repeat a car ID to book several units of the same model.
+            The per-user limit of 3 active rentals does not apply to batch bookings.
+            """,
+        request=RentalBatchCreateSerializer,
+        responses={201: RentalListSerializer(many=True)},
+    )
+    @action(detail=False, methods=["POST"], url_path="batch", permission_classes=[IsCorporateOrAdmin])
+    @idempotent
+    def batch_create(self, request):
+        """
+        Action to create rentals for several cars in one request.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rentals = serializer.save()
+
+        return Response(RentalListSerializer(rentals, many=True).data, status=status.HTTP_201_CREATED)
+
     @extend_schema(
         summary="Return a rented car",
         description="""
@@ -89,10 +154,14 @@ class RentalViewSet(
 
             Logic:
             1. Sets `actual_return_date` to today.
-            2. Generates a Stripe Payment session for the base rental cost.
-            3. If the return is **late** (after `end_date`), creates an additional `OVERDUE_FEE` payment.
+            2. Queues a Stripe Payment session for the base rental cost.
+            3. If the return is **late** (after `end_date`), queues an additional `OVERDUE_FEE` payment.
             4. Triggers a notification task.
 
+            Stripe sessions are created by a background worker (both fees concurrently).
+            The endpoint waits briefly for the payment links; if they are not ready in time it
+            answers `202` with status URLs to poll.
+
             Note: The rental status does not change to COMPLETED immediately. It waits for the Stripe Webhook to confirm payment.
             """,
         request=None,
@@ -115,47 +184,133 @@ class RentalViewSet(
                     },
                 ),
             ],
+            202: OpenApiExample(
+                "Payment links pending",
+                value={
+                    "message": "Return registered. Payment links are being prepared.",
+                    "checkout_requests": [
+                        {
+                            "id": 1,
+                            "type": "RENTAL",
+                            "status": "PENDING",
+                            "status_url": "http://localhost:8000/api/payment/checkout-requests/1/",
+                        }
+                    ],
+                },
+            ),
             400: OpenApiExample("Error", value={"error": "Rental is not active"}),
+            502: OpenApiResponse(description="Stripe session could not be created"),
         },
     )
     @action(detail=True, methods=["POST"], url_path="return")
-    def return_car(self, request, pk=None):
+    @idempotent
+    async def return_car(self, request, pk=None):
         """
         Action to return a car.
-        Calculates total cost and handles overdue logic inside an atomic transaction.
+        Writes the return and the payments to create inside a short atomic transaction;
+        Stripe sessions are created by a worker outside of it. Async, so waiting for the
+        payment links does not hold a worker.
         """
-        rental = self.get_object()
+        rental = await aget_object_or_404(self.get_queryset(), pk=pk)
+        self.check_object_permissions(request, rental)
 
-        if rental.status not in [Rental.Status.BOOKED, Rental.Status.OVERDUE]:
+        if not self._is_returnable(rental):
             return Response({"error": "Rental is not active"}, status=status.HTTP_400_BAD_REQUEST)
 
-        with transaction.atomic():
-            rental.actual_return_date = timezone.now().date()
-            rental.save()
+        # Transactions and publishing to the broker are blocking, so they run in a thread
+        registered = await sync_to_async(self._register_return)(rental.id, request)
+        if registered is None:
+            return Response({"error": "Rental is not active"}, status=status.HTTP_400_BAD_REQUEST)
 
-            payment_rental = create_stripe_payment_for_rental(
-                rental=rental, payment_type=Payment.Type.RENTAL, request=request
-            )
+        checkout_requests, is_late = registered
+        request_ids = [checkout_request.id for checkout_request in checkout_requests]
 
-            response_data = {
-                "message": "Return registered. Please pay the invoice.",
-                "rental_payment_url": payment_rental.session_url,
-            }
+        try:
+            await sync_to_async(create_checkout_sessions.delay)(request_ids)
+        except OperationalError:
+            logger.exception("Failed to publish checkout requests %s; the outbox relay will pick them up", request_ids)
+
+        checkout_requests = await await_checkout_requests(request_ids, timeout=settings.PAYMENT_OUTBOX_WAIT_TIMEOUT)
+
+        return self._build_return_response(request, checkout_requests, is_late=is_late)
+
+    @staticmethod
+    def _is_returnable(rental: Rental) -> bool:
+        return rental.status in [Rental.Status.BOOKED, Rental.Status.OVERDUE] and rental.actual_return_date is None
+
+    @classmethod
+    def _register_return(cls, rental_id: int, request) -> tuple[list[CheckoutRequest], bool] | None:
+        """
+        Saves the return date (and OVERDUE status if late) and queues the payments
+        in one transaction. Returns the outbox rows and whether the return is late,
+        or None if the rental is no longer active.
+
+        The rental is locked and checked again, so concurrent returns (e.g. with
+        different Idempotency-Keys) cannot queue the payments twice.
+        """
+        with transaction.atomic():
+            rental = Rental.objects.select_for_update(of=("self",)).select_related("car", "user").get(id=rental_id)
+            if not cls._is_returnable(rental):
+                return None
+
+            rental.actual_return_date = timezone.now().date()
+            is_late = rental.actual_return_date > rental.end_date
 
-            if rental.actual_return_date > rental.end_date:
+            if is_late:
                 rental.status = Rental.Status.OVERDUE
-                rental.save()
+            rental.save()
 
-                payment_overdue = create_stripe_payment_for_rental(
-                    rental=rental, payment_type=Payment.Type.OVERDUE_FEE, request=request
+            checkout_requests = [
+                enqueue_checkout_request(rental=rental, payment_type=Payment.Type.RENTAL, request=request)
+            ]
+            if is_late:
+                checkout_requests.append(
+                    enqueue_checkout_request(rental=rental, payment_type=Payment.Type.OVERDUE_FEE, request=request)
                 )
 
-                response_data["message"] = "Car returned late. Please pay rental and overdue fee."
-                response_data["overdue_payment_url"] = payment_overdue.session_url
+            record_rental_returned(rental)
+
+        return checkout_requests, is_late
 
-            transaction.on_commit(lambda: notify_rental_returned.delay(rental.id))
+    @staticmethod
+    def _build_return_response(request, checkout_requests, *, is_late: bool) -> Response:
+        """
+        Builds the return response from the current state of the checkout requests:
+        payment links when all are ready, 502 on failure, 202 with status URLs otherwise.
+        """
+        failed = [item for item in checkout_requests if item.status == CheckoutRequest.Status.FAILED]
+        if failed:
+            return Response({"detail": failed[0].error}, status=status.HTTP_502_BAD_GATEWAY)
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        if all(item.status == CheckoutRequest.Status.DONE for item in checkout_requests):
+            payment_urls = {item.type: item.payment.session_url for item in checkout_requests}
+            response_data = {
+                "message": "Return registered. Please pay the invoice.",
+                "rental_payment_url": payment_urls[Payment.Type.RENTAL],
+            }
+            if is_late:
+                response_data["message"] = "Car returned late. Please pay rental and overdue fee."
+                response_data["overdue_payment_url"] = payment_urls[Payment.Type.OVERDUE_FEE]
+
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        return Response(
+            {
+                "message": "Return registered. Payment links are being prepared.",
+                "checkout_requests": [
+                    {
+                        "id": item.id,
+                        "type": item.type,
+                        "status": item.status,
+                        "status_url": request.build_absolute_uri(
+                            reverse("payment:checkout-request-status", args=[item.id])
+                        ),
+                    }
+                    for item in checkout_requests
+                ],
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
 
     @extend_schema(
         summary="Cancel a rental",
@@ -213,9 +368,9 @@ class RentalViewSet(
                 status=status.HTTP_200_OK,
             )
 
-        rental.status = Rental.Status.CANCELLED
-        rental.save()
-
-        transaction.on_commit(lambda: notify_rental_cancelled.delay(rental.id))
+        with transaction.atomic():
+            rental.status = Rental.Status.CANCELLED
+            rental.save()
+            record_rental_cancelled(rental)
 
         return Response({"message": "Rental cancelled successfully"}, status=status.HTTP_200_OK)
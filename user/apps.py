@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = "user"
+
+    def ready(self) -> None:
+        """Import signals when the app is ready."""
+        import user.signals  # noqa
@@ -0,0 +1,85 @@
+from functools import partial
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.cache import get_or_set
+
+
+# User fields copied into tokens, enough to authenticate without the database
+USER_CLAIMS = ("email", "is_staff", "is_active", "is_corporate")
+
+# User fields CachedJWTAuthentication keeps: the ones authentication and permissions check,
+# and the email, which notifications about objects created with request.user are sent to
+CACHED_USER_FIELDS = ("email", "is_active", "is_staff", "is_corporate")
+
+
+def user_cache_tag(user_id) -> str:
+    return f"user:{user_id}"
+
+
+class RefreshToken(tokens.RefreshToken):
+    """RefreshToken carrying USER_CLAIMS; access tokens created from it copy them."""
+
+    @classmethod
+    def for_user(cls, user) -> "RefreshToken":
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving the user from the cache instead of loading it on every request.
+
+    Only the user's ID and CACHED_USER_FIELDS are cached, never the password hash, for
+    JWT_USER_CACHE_TIMEOUT seconds under the ID and the token's password hash claim (the
+    token version); they are dropped when the user is saved or deleted. Requests get an
+    unsaved user built from them; views needing the full profile load it themselves.
+
+    With JWT_STATELESS_AUTH the user is built from the token claims without any lookup,
+    so changes such as deactivation only apply to tokens issued afterwards.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        if settings.JWT_STATELESS_AUTH and all(claim in validated_token for claim in USER_CLAIMS):
+            return self.get_stateless_user(user_id, validated_token)
+
+        version = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM, "")
+        fields = get_or_set(
+            f"auth-user:{user_id}:{version}",
+            partial(self._load_user_fields, validated_token),
+            settings.JWT_USER_CACHE_TIMEOUT,
+            tags=[user_cache_tag(user_id)],
+        )
+        return self._build_user(user_id, fields)
+
+    def _load_user_fields(self, validated_token) -> dict:
+        """Loads and checks the user (active, token not revoked) and returns the fields to cache."""
+        user = super().get_user(validated_token)
+        return {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+
+    def get_stateless_user(self, user_id, validated_token):
+        """Returns an unsaved user instance with the token's ID and USER_CLAIMS."""
+        user = self._build_user(user_id, {claim: validated_token[claim] for claim in USER_CLAIMS})
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+    def _build_user(self, user_id, fields: dict):
+        id_field = self.user_model._meta.get_field(api_settings.USER_ID_FIELD)
+        user = self.user_model(**{id_field.attname: id_field.to_python(user_id)}, **fields)
+        user._state.adding = False
+        return user
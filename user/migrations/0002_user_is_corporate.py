@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_corporate',
+            field=models.BooleanField(default=False, help_text='Designates whether the user can book several cars in one batch.', verbose_name='corporate customer'),
+        ),
+    ]
@@ -13,6 +13,11 @@ class User(AbstractUser):
 
     username = None
     email = models.EmailField(_("email address"), unique=True)
+    is_corporate = models.BooleanField(
+        _("corporate customer"),
+        default=False,
+        help_text=_("Designates whether the user can book several cars in one batch."),
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
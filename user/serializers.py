@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+
+from user.authentication import RefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -26,3 +29,9 @@ class UserSerializer(serializers.ModelSerializer):
             user.set_password(password)
             user.save()
         return user
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Issues token pairs carrying the user claims read by CachedJWTAuthentication."""
+
+    token_class = RefreshToken
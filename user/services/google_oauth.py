@@ -1,26 +1,117 @@
+import asyncio
+import functools
+import logging
+import re
+import threading
+import time
 from urllib.parse import unquote, urlencode
 
 import httpx
+import jwt
 from django.conf import settings
 
+from core.aio import per_event_loop
+
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleJWKS:
+    """
+    In-process cache of Google's ID token signing keys.
+
+    Keys are kept for the max-age Google sends with them. Once expired they are still
+    used while a background thread refetches them, so logins never wait for the refresh;
+    only a cold cache or an unknown key ID (after a key rotation) fetches inline, at most
+    once per `min_refresh_interval` seconds.
+    """
+
+    def __init__(self, client: httpx.Client, url: str, *, default_max_age: int = 3600, min_refresh_interval: int = 60):
+        self.client = client
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.keys: dict[str, jwt.PyJWK] = {}
+        self.expires_at = 0.0
+        self.fetched_at = -min_refresh_interval
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self) -> None:
+        """Fetches the key set unless it was fetched less than `min_refresh_interval` seconds ago."""
+        with self._lock:
+            if time.monotonic() - self.fetched_at < self.min_refresh_interval:
+                return
+
+            response = self.client.get(self.url)
+            response.raise_for_status()
+
+            max_age = MAX_AGE.search(response.headers.get("Cache-Control", ""))
+            self.keys = {key.key_id: key for key in jwt.PyJWKSet.from_dict(response.json()).keys}
+            self.fetched_at = time.monotonic()
+            self.expires_at = self.fetched_at + (int(max_age[1]) if max_age else self.default_max_age)
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except httpx.HTTPError:
+            logger.warning("Failed to refresh Google JWKS", exc_info=True)
+        finally:
+            self._refreshing = False
+
+    def cached_key(self, kid: str) -> jwt.PyJWK | None:
+        """Returns the key if cached, starting a background refresh if the key set has expired."""
+        if time.monotonic() >= self.expires_at and self.keys and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh_in_background, name="google-jwks", daemon=True).start()
+        return self.keys.get(kid)
+
+    def get_key(self, kid: str) -> jwt.PyJWK:
+        """Returns the key, fetching the key set first if it is not cached."""
+        key = self.cached_key(kid)
+        if key is None:
+            self.refresh()
+            key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid}")
+        return key
+
 
 class GoogleOAuth:
     """
     Service class for handling Google OAuth2 flow.
+
+    Requests share pooled keep-alive connections with strict timeouts. The ID token
+    returned with the access token is verified locally against Google's cached signing
+    keys, so the user info request is only needed when Google sends no ID token.
     """
 
     def __init__(self):
         """
-        Initializes the GoogleOAuth instance with client credentials
-        and endpoints for authorization, token exchange, and user info.
+        Initializes the GoogleOAuth instance with client credentials,
+        endpoints and the pooled HTTP clients.
         """
         self.client_id = settings.GOOGLE_CLIENT_ID
         self.client_secret = settings.GOOGLE_CLIENT_SECRET
         self.redirect_uri = settings.GOOGLE_REDIRECT_URI
 
         self.authorization_endpoint = "https://accounts.google.com/o/oauth2/v2/auth"
-        self.token_endpoint = "https://oauth2.googleapis.com/token"
-        self.userinfo_endpoint = "https://www.googleapis.com/oauth2/v2/userinfo"
+        self.token_endpoint = settings.GOOGLE_OAUTH_TOKEN_URL
+        self.userinfo_endpoint = settings.GOOGLE_OAUTH_USERINFO_URL
+
+        timeout = httpx.Timeout(settings.GOOGLE_OAUTH_TIMEOUT, connect=2.0)
+        limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        self.client = httpx.Client(timeout=timeout, limits=limits)
+        self._async_client = per_event_loop(lambda: httpx.AsyncClient(timeout=timeout, limits=limits))
+        self.jwks = GoogleJWKS(self.client, settings.GOOGLE_OAUTH_JWKS_URL)
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """The pooled async client of the running event loop."""
+        return self._async_client()
 
     def get_authorization_url(self) -> str:
         """
@@ -39,10 +130,51 @@ class GoogleOAuth:
         }
         return f"{self.authorization_endpoint}?{urlencode(params)}"
 
+    def _token_request(self, code: str) -> dict:
+        return {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "code": unquote(code),
+            "grant_type": "authorization_code",
+            "redirect_uri": self.redirect_uri,
+        }
+
+    def _verify_id_token(self, id_token: str, key: jwt.PyJWK) -> dict:
+        """Checks the ID token's signature, audience, issuer and expiry, and returns its claims."""
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=["RS256"],
+                audience=self.client_id,
+                issuer=GOOGLE_ISSUERS,
+                leeway=30,
+            )
+        except jwt.PyJWTError as e:
+            raise ValueError({"error": "Invalid ID token", "details": str(e)}) from e
+
+        if not claims.get("email_verified"):
+            raise ValueError({"error": "Google account email is not verified"})
+
+        return claims
+
+    @staticmethod
+    def _key_id(id_token: str) -> str:
+        try:
+            return jwt.get_unverified_header(id_token)["kid"]
+        except (jwt.PyJWTError, KeyError) as e:
+            raise ValueError({"error": "Invalid ID token", "details": str(e)}) from e
+
+    @staticmethod
+    def _check_token_response(token_resp: httpx.Response) -> dict:
+        if token_resp.status_code != 200:
+            raise ValueError({"error": "Failed to obtain token", "details": token_resp.json()})
+        return token_resp.json()
+
     def exchange_code_for_user_data(self, code: str) -> dict:
         """
-        Exchanges an authorization code for an access token and retrieves
-        the user's profile data from Google.
+        Exchanges an authorization code for tokens and returns the user's
+        profile data from the verified ID token.
 
         Args:
             code (str): The authorization code received from the Google callback.
@@ -51,36 +183,56 @@ class GoogleOAuth:
             dict: A dictionary containing user info (email, name, picture, etc.).
 
         Raises:
-            ValueError: If the token exchange fails or user data cannot be retrieved.
+            ValueError: If the token exchange fails, the ID token is invalid
+            or user data cannot be retrieved.
         """
-        code = unquote(code)
-
-        token_resp = httpx.post(
-            self.token_endpoint,
-            data={
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": self.redirect_uri,
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
+        try:
+            tokens = self._check_token_response(self.client.post(self.token_endpoint, data=self._token_request(code)))
 
-        if token_resp.status_code != 200:
-            raise ValueError({"error": "Failed to obtain token", "details": token_resp.json()})
+            if "id_token" not in tokens:
+                user_resp = self.client.get(
+                    self.userinfo_endpoint, headers={"Authorization": f"Bearer {tokens.get('access_token')}"}
+                )
+                if user_resp.status_code != 200:
+                    raise ValueError({"error": "Failed to obtain user data"})
+                return user_resp.json()
 
-        access_token = token_resp.json().get("access_token")
+            key = self.jwks.get_key(self._key_id(tokens["id_token"]))
+        except (httpx.HTTPError, jwt.InvalidKeyError) as e:
+            raise ValueError({"error": "Google OAuth request failed", "details": str(e)}) from e
 
-        user_resp = httpx.get(
-            self.userinfo_endpoint,
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
+        return self._verify_id_token(tokens["id_token"], key)
 
-        if user_resp.status_code != 200:
-            raise ValueError({"error": "Failed to obtain user data"})
+    async def aexchange_code_for_user_data(self, code: str) -> dict:
+        """
+        Async variant of `exchange_code_for_user_data` for ASGI deployments.
+
+        Signing keys come from the same cache; a cold cache is filled in a thread.
+        """
+        try:
+            tokens = self._check_token_response(
+                await self.async_client.post(self.token_endpoint, data=self._token_request(code))
+            )
+
+            if "id_token" not in tokens:
+                user_resp = await self.async_client.get(
+                    self.userinfo_endpoint, headers={"Authorization": f"Bearer {tokens.get('access_token')}"}
+                )
+                if user_resp.status_code != 200:
+                    raise ValueError({"error": "Failed to obtain user data"})
+                return user_resp.json()
 
-        return user_resp.json()
+            kid = self._key_id(tokens["id_token"])
+            key = self.jwks.cached_key(kid) or await asyncio.to_thread(self.jwks.get_key, kid)
+        except (httpx.HTTPError, jwt.InvalidKeyError) as e:
+            raise ValueError({"error": "Google OAuth request failed", "details": str(e)}) from e
 
+        return self._verify_id_token(tokens["id_token"], key)
 
-google_oauth = GoogleOAuth()
+
+@functools.cache
+def get_google_oauth() -> GoogleOAuth:
+    """
+    Returns the shared GoogleOAuth client, created on first use.
+    """
+    return GoogleOAuth()
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.base import ModelBase
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_tags
+from user.authentication import user_cache_tag
+from user.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender: ModelBase, instance: User, **kwargs) -> None:
+    """
+    Signal receiver that drops the user cached by CachedJWTAuthentication
+    when it is saved (e.g. a password change or deactivation) or deleted.
+
+    Runs after commit, so a concurrent request cannot re-cache the old row.
+    """
+    tag = user_cache_tag(instance.pk)
+    transaction.on_commit(lambda: invalidate_tags(tag))
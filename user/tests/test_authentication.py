@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from user.authentication import CachedJWTAuthentication, RefreshToken
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """
+    Tests resolving JWT users from the cache, its invalidation and the stateless mode.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="user@test.com", password="password123")
+
+    def _authenticate(self, token=None):
+        token = token or RefreshToken.for_user(self.user).access_token
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZE=f"Bearer {token}")
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def _save(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+    def test_tokens_carry_user_claims(self):
+        token = RefreshToken.for_user(self.user).access_token
+
+        self.assertEqual(token["email"], "user@test.com")
+        self.assertFalse(token["is_staff"])
+        self.assertTrue(token["is_active"])
+        self.assertFalse(token["is_corporate"])
+
+    def test_user_is_loaded_once(self):
+        """The first request loads the user; later ones are served from the cache."""
+        with self.assertNumQueries(1):
+            self._authenticate()
+        with self.assertNumQueries(0):
+            user = self._authenticate()
+
+        self.assertEqual(user, self.user)
+
+    def test_cache_holds_no_password_hash(self):
+        """Only the email and the flags checked by authentication and permissions are cached and set on the user."""
+        self.user.is_corporate = True
+        self.user.save()
+        token = RefreshToken.for_user(self.user).access_token
+
+        self._authenticate(token)
+        with self.assertNumQueries(0):
+            user = self._authenticate(token)
+
+        cached = cache.get(f"auth-user:{self.user.pk}:{token['hash_password']}")["value"]
+        self.assertEqual(cached, {"email": "user@test.com", "is_active": True, "is_staff": False, "is_corporate": True})
+        self.assertEqual((user.pk, user.email, user.is_corporate), (self.user.pk, "user@test.com", True))
+        self.assertEqual(user.password, "")
+
+    def test_save_invalidates_cached_user(self):
+        self._authenticate()
+        self.user.is_staff = True
+        self._save(self.user)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self._authenticate().is_staff)
+
+    def test_deactivated_user_is_rejected(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self._authenticate(token)
+        self.user.is_active = False
+        self._save(self.user)
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(token)
+
+    def test_password_change_revokes_tokens(self):
+        """Old tokens carry the previous token version and are no longer accepted."""
+        token = RefreshToken.for_user(self.user).access_token
+        self._authenticate(token)
+
+        self.user.set_password("new-password")
+        self._save(self.user)
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(token)
+        self.assertEqual(self._authenticate(), self.user)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_reads_token_claims(self):
+        """The user is built from the claims without a database query."""
+        self.user.is_staff = True
+        self.user.save()
+
+        with self.assertNumQueries(0):
+            user = self._authenticate()
+
+        self.assertEqual(user, self.user)
+        self.assertTrue(user.is_staff)
+        self.assertEqual(user.email, "user@test.com")
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_rejects_inactive_claim(self):
+        token = RefreshToken.for_user(self.user).access_token
+        token["is_active"] = False
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(token)
@@ -1,56 +1,218 @@
-import unittest
-from unittest.mock import Mock, patch
+import asyncio
+import time
 
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase, override_settings
+
+from core.tests.utils import FakeHTTPServer
 from user.services.google_oauth import GoogleOAuth
 
 
-class TestGoogleOAuth(unittest.TestCase):
-    """Unit tests for the GoogleOAuth class."""
+CLIENT_ID = "client-id.apps.googleusercontent.com"
+
+
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class FakeGoogleServer(FakeHTTPServer):
+    """
+    Local HTTP server imitating Google's token, user info and JWKS endpoints.
+
+    The token endpoint returns an ID token for `claims` signed with the `signing_kid` key
+    (or none if `id_token` is False); `responses` maps a path to a (status, body)
+    pair answered instead.
+    """
+
+    def __init__(self):
+        super().__init__(
+            {
+                "POST /token": self._unless_overridden(self.token),
+                "GET /userinfo": self._unless_overridden(
+                    lambda request: (200, {"email": "info@example.com", "given_name": "Info"})
+                ),
+                "GET /certs": self._unless_overridden(
+                    lambda request: (200, self.jwks(), [("Cache-Control", "public, max-age=3600")])
+                ),
+            }
+        )
+        self.responses = {}
+        self.keys = {"key-1": rsa_key()}
+        self.signing_kid = "key-1"
+        self.id_token = True
+        self.claims = {"email": "test@example.com", "email_verified": True, "given_name": "Test", "family_name": "User"}
+
+    def _unless_overridden(self, route):
+        return lambda request: self.responses.get(request.path) or route(request)
+
+    def token(self, request):
+        tokens = {"access_token": "access", "token_type": "Bearer"}
+        if self.id_token:
+            tokens["id_token"] = self.sign()
+        return 200, tokens
 
-    def setUp(self):
-        """Set up a GoogleOAuth instance and dummy code for tests."""
-        self.google = GoogleOAuth()
-        self.dummy_code = "dummy_code"
+    def sign(self, key=None, **overrides) -> str:
+        now = int(time.time())
+        claims = {"iss": "https://accounts.google.com", "aud": CLIENT_ID, "iat": now, "exp": now + 3600}
+        return jwt.encode(
+            {**claims, **self.claims, **overrides},
+            key or self.keys[self.signing_kid],
+            algorithm="RS256",
+            headers={"kid": self.signing_kid},
+        )
+
+    def jwks(self) -> dict:
+        keys = []
+        for kid, key in self.keys.items():
+            jwk = jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+            keys.append({**jwk, "kid": kid, "alg": "RS256", "use": "sig"})
+        return {"keys": keys}
+
+    def __enter__(self):
+        super().__enter__()
+        self.settings = override_settings(
+            GOOGLE_CLIENT_ID=CLIENT_ID,
+            GOOGLE_OAUTH_TOKEN_URL=f"{self.url}/token",
+            GOOGLE_OAUTH_USERINFO_URL=f"{self.url}/userinfo",
+            GOOGLE_OAUTH_JWKS_URL=f"{self.url}/certs",
+        )
+        self.settings.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.settings.disable()
+        super().__exit__(*exc)
+
+
+class TestGoogleOAuth(SimpleTestCase):
+    """Unit tests for the GoogleOAuth class against a local fake Google server."""
 
     def test_get_authorization_url(self):
         """Test that the authorization URL is correctly generated."""
-        url = self.google.get_authorization_url()
+        google = GoogleOAuth()
+        url = google.get_authorization_url()
         self.assertTrue(url.startswith("https://accounts.google.com/o/oauth2/v2/auth"))
-        self.assertIn(f"client_id={self.google.client_id}", url)
+        self.assertIn(f"client_id={google.client_id}", url)
         self.assertIn("redirect_uri=", url)
         self.assertIn("response_type=code", url)
         self.assertIn("scope=openid+email+profile", url)
 
-    @patch("user.services.google_oauth.httpx.get")
-    @patch("user.services.google_oauth.httpx.post")
-    def test_exchange_code_for_user_data_success(self, mock_post, mock_get):
-        """Test successful exchange of code for user data."""
-        mock_post.return_value = Mock(status_code=200, json=lambda: {"access_token": "fake_token"})
-        mock_get.return_value = Mock(
-            status_code=200, json=lambda: {"email": "test@example.com", "given_name": "Test", "family_name": "User"}
-        )
-
-        user_info = self.google.exchange_code_for_user_data(self.dummy_code)
+    def test_exchange_code_verifies_id_token(self):
+        """User data comes from the verified ID token without a user info request."""
+        with FakeGoogleServer() as server:
+            user_info = GoogleOAuth().exchange_code_for_user_data("dummy%2Fcode")
 
         self.assertEqual(user_info["email"], "test@example.com")
         self.assertEqual(user_info["given_name"], "Test")
         self.assertEqual(user_info["family_name"], "User")
+        self.assertEqual(server.paths(), ["/token", "/certs"])
+        self.assertEqual(server.requests[0].form()["code"], ["dummy/code"])
+
+    def test_connections_and_keys_are_reused(self):
+        """Later logins reuse the pooled connection and the cached signing keys."""
+        with FakeGoogleServer() as server:
+            google = GoogleOAuth()
+            for _ in range(3):
+                google.exchange_code_for_user_data("dummy_code")
 
-    @patch("user.services.google_oauth.httpx.post")
-    def test_exchange_code_for_user_data_token_failure(self, mock_post):
+        self.assertEqual(server.paths(), ["/token", "/certs", "/token", "/token"])
+        self.assertEqual(len({request.client_port for request in server.requests}), 1)
+
+    def test_falls_back_to_userinfo_without_id_token(self):
+        with FakeGoogleServer() as server:
+            server.id_token = False
+            user_info = GoogleOAuth().exchange_code_for_user_data("dummy_code")
+
+        self.assertEqual(user_info["email"], "info@example.com")
+        self.assertEqual(server.paths(), ["/token", "/userinfo"])
+
+    def test_exchange_code_for_user_data_token_failure(self):
         """Test that a failed token exchange raises ValueError."""
-        mock_post.return_value = Mock(status_code=400, json=lambda: {"error": "invalid_grant"})
-        with self.assertRaises(ValueError) as context:
-            self.google.exchange_code_for_user_data(self.dummy_code)
+        with FakeGoogleServer() as server:
+            server.responses["/token"] = (400, {"error": "invalid_grant"})
+            with self.assertRaises(ValueError) as context:
+                GoogleOAuth().exchange_code_for_user_data("dummy_code")
+
         self.assertIn("Failed to obtain token", str(context.exception))
 
-    @patch("user.services.google_oauth.httpx.get")
-    @patch("user.services.google_oauth.httpx.post")
-    def test_exchange_code_for_user_data_userinfo_failure(self, mock_post, mock_get):
+    def test_exchange_code_for_user_data_userinfo_failure(self):
         """Test that a failed user info request raises ValueError."""
-        mock_post.return_value = Mock(status_code=200, json=lambda: {"access_token": "fake_token"})
-        mock_get.return_value = Mock(status_code=400, json=lambda: {"error": "bad_request"})
+        with FakeGoogleServer() as server:
+            server.id_token = False
+            server.responses["/userinfo"] = (400, {"error": "bad_request"})
+            with self.assertRaises(ValueError) as context:
+                GoogleOAuth().exchange_code_for_user_data("dummy_code")
 
-        with self.assertRaises(ValueError) as context:
-            self.google.exchange_code_for_user_data(self.dummy_code)
         self.assertIn("Failed to obtain user data", str(context.exception))
+
+    def test_rejects_forged_or_foreign_id_tokens(self):
+        """ID tokens signed with another key, for another client or with an unverified email are rejected."""
+        cases = {
+            "forged": lambda server: server.sign(key=rsa_key()),
+            "audience": lambda server: server.sign(aud="other-client"),
+            "issuer": lambda server: server.sign(iss="https://evil.example.com"),
+            "unverified": lambda server: server.sign(email_verified=False),
+        }
+
+        for name, id_token in cases.items():
+            with self.subTest(name), FakeGoogleServer() as server:
+                google = GoogleOAuth()
+                google.jwks.refresh()
+                server.responses["/token"] = (200, {"access_token": "access", "id_token": id_token(server)})
+
+                with self.assertRaises(ValueError):
+                    google.exchange_code_for_user_data("dummy_code")
+
+    def test_unknown_key_refetches_jwks(self):
+        """A token signed with a rotated key refreshes the cached key set."""
+        with FakeGoogleServer() as server:
+            google = GoogleOAuth()
+            google.jwks.min_refresh_interval = 0
+            google.exchange_code_for_user_data("dummy_code")
+
+            server.keys["key-2"] = rsa_key()
+            server.signing_kid = "key-2"
+            google.exchange_code_for_user_data("dummy_code")
+
+        self.assertEqual(server.paths().count("/certs"), 2)
+
+    def test_expired_keys_refresh_in_background(self):
+        """Expired keys are still used while they are refetched."""
+        with FakeGoogleServer() as server:
+            google = GoogleOAuth()
+            google.jwks.min_refresh_interval = 0
+            google.exchange_code_for_user_data("dummy_code")
+            google.jwks.expires_at = 0
+
+            google.exchange_code_for_user_data("dummy_code")
+            deadline = time.monotonic() + 5
+            while google.jwks.expires_at == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(server.paths()[:3], ["/token", "/certs", "/token"])
+        self.assertEqual(server.paths().count("/certs"), 2)
+        self.assertGreater(google.jwks.expires_at, time.monotonic())
+
+    def test_slow_google_times_out(self):
+        with FakeGoogleServer() as server:
+            server.delay = 0.5
+            with override_settings(GOOGLE_OAUTH_TIMEOUT=0.2), self.assertRaises(ValueError) as context:
+                GoogleOAuth().exchange_code_for_user_data("dummy_code")
+
+        self.assertIn("Google OAuth request failed", str(context.exception))
+
+    def test_async_exchange(self):
+        """The async variant verifies the ID token the same way."""
+
+        async def run(google):
+            try:
+                return await asyncio.gather(*(google.aexchange_code_for_user_data("dummy_code") for _ in range(3)))
+            finally:
+                await google.async_client.aclose()
+
+        with FakeGoogleServer() as server:
+            results = asyncio.run(run(GoogleOAuth()))
+
+        self.assertEqual([result["email"] for result in results], ["test@example.com"] * 3)
+        self.assertEqual(server.paths().count("/certs"), 1)
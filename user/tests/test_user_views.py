@@ -23,7 +23,7 @@ class GoogleAuthViewsTests(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertIn("auth_url", res.data)
 
-    @patch("user.services.google_oauth.GoogleOAuth.exchange_code_for_user_data")
+    @patch("user.services.google_oauth.GoogleOAuth.aexchange_code_for_user_data")
     @patch("django.contrib.auth.get_user_model")
     def test_google_exchange_code_success(self, mock_get_user_model, mock_exchange):
         """Test POST exchanges code and returns JWT."""
@@ -47,7 +47,7 @@ class GoogleAuthViewsTests(unittest.TestCase):
         self.assertEqual(res.status_code, 400)
         self.assertIn("error", res.data)
 
-    @patch("user.services.google_oauth.GoogleOAuth.exchange_code_for_user_data")
+    @patch("user.services.google_oauth.GoogleOAuth.aexchange_code_for_user_data")
     def test_google_exchange_code_failure(self, mock_exchange):
         """Test POST with failing exchange returns 400."""
         mock_exchange.side_effect = ValueError({"error": "Failed"})
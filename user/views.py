@@ -5,15 +5,22 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.aio import AsyncAPIView
+from user.authentication import RefreshToken
 from user.serializers import UserSerializer
-from user.services.google_oauth import google_oauth
 
 
 User = get_user_model()
 
 
+def get_google_oauth():
+    """Returns the shared Google OAuth client; its module (and httpx) is imported on first use."""
+    from user.services.google_oauth import get_google_oauth
+
+    return get_google_oauth()
+
+
 @extend_schema_view(
     post=extend_schema(
         description="Endpoint for registering a new user in the system.", responses={201: UserSerializer}
@@ -58,7 +65,7 @@ class GoogleAuthRedirectView(APIView):
 
     def get(self, request):
         """Handle GET request to fetch auth URL"""
-        return Response({"auth_url": google_oauth.get_authorization_url()})
+        return Response({"auth_url": get_google_oauth().get_authorization_url()})
 
 
 @extend_schema(
@@ -97,25 +104,26 @@ class GoogleAuthRedirectView(APIView):
         ),
     ],
 )
-class GoogleAuthExchangeCodeView(APIView):
-    """Exchange Google code for JWT and login/create user"""
+class GoogleAuthExchangeCodeView(AsyncAPIView):
+    """Exchange Google code for JWT and login/create user (async: waits on Google without holding a worker)"""
 
     permission_classes = (AllowAny,)
     authentication_classes = ()
+    throttle_scope = "oauth"
 
-    def post(self, request):
+    async def post(self, request):
         """Handle POST request to exchange code and return tokens"""
         code = request.data.get("code")
         if not code:
             return Response({"error": "NO code provided"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            user_info = google_oauth.exchange_code_for_user_data(code)
+            user_info = await get_google_oauth().aexchange_code_for_user_data(code)
         except ValueError as e:
             return Response(e.args[0], status=status.HTTP_400_BAD_REQUEST)
 
         email = user_info.get("email")
-        user, created = User.objects.get_or_create(
+        user, created = await User.objects.aget_or_create(
             email=email,
             defaults={
                 "first_name": user_info.get("given_name", ""),
@@ -125,7 +133,7 @@ class GoogleAuthExchangeCodeView(APIView):
 
         if created:
             user.set_unusable_password()
-            user.save()
+            await user.asave()
 
         refresh = RefreshToken.for_user(user)
         return Response(